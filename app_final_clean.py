@@ -11,6 +11,16 @@ from datetime import datetime
 import logging
 import os
 from bson import ObjectId
+from recommender.client import RecommendationClient
+from database.cart import add_cart_item, remove_cart_item, get_cart_summary, ensure_cart_summaries
+from database.catalog_cache import CatalogCache
+from database.checkout import CheckoutService, InsufficientStockError
+from database.health import DatabaseHealthMonitor
+from database.mongo_indexes import ensure_indexes
+from database.orders import find_order_page, get_order_summary, normalize_legacy_orders
+from database.rollups import increment_stats, ensure_stats, get_stats
+from database.stats import SingleFlightCache, compute_catalog_stats, compute_best_sellers
+from database.pagination import clamp_page_size, find_page, card_fields
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -24,29 +34,87 @@ app.secret_key = 'ecommerce_ai_secret_key_2025_professional'
 app.config['MONGO_URI'] = 'mongodb://localhost:27017/ecommerce-python'
 mongo = PyMongo(app)
 
+# Serveur local de recommandations (python -m recommender.server)
+recommendation_client = RecommendationClient(socket_path=os.environ.get('RECOMMENDER_SOCKET'))
+
+# Santé de MongoDB surveillée en tâche de fond (aucun ping dans les requêtes)
+health_monitor = DatabaseHealthMonitor(mongo, interval=5.0, timeout=1.0)
+health_monitor.start()
+
+# Catalogue en mémoire, rechargé quand l'administration en change la version
+catalog_cache = CatalogCache(mongo, health_monitor=health_monitor)
+
+# Statistiques du catalogue (une agrégation $facet, recalculée au plus toutes les 30 s)
+catalog_stats = SingleFlightCache(lambda: compute_catalog_stats(mongo.db), ttl=30.0)
+
+# Meilleures ventes, repli des recommandations (recalculées au plus toutes les 5 min)
+best_sellers = SingleFlightCache(lambda: compute_best_sellers(mongo.db), ttl=300.0)
+
+# Validation des commandes (transaction : stock, commande et panier)
+checkout_service = CheckoutService(mongo)
+
+def prepare_database():
+    """Prépare MongoDB au démarrage, quel que soit le point d'entrée (python app.py, run.py, WSGI)."""
+    if not health_monitor.is_healthy():
+        # Base injoignable : pas d'attente, l'application démarre en mode dégradé
+        logger.warning("MongoDB indisponible, démarrage sans préparation de la base")
+        return
+    
+    # Index des requêtes fréquentes (idempotent)
+    try:
+        ensure_indexes(mongo.db)
+    except Exception:
+        logger.warning("Démarrage sans vérification des index MongoDB")
+    
+    # Articles des commandes antérieures au schéma compact (idempotent)
+    try:
+        normalize_legacy_orders(mongo.db)
+    except Exception:
+        logger.warning("Démarrage sans normalisation des commandes")
+    
+    # Compteurs du tableau de bord (créés s'ils manquent, jamais écrasés)
+    try:
+        ensure_stats(mongo.db)
+    except Exception:
+        logger.warning("Démarrage sans création des compteurs du tableau de bord")
+    
+    # Résumés des paniers antérieurs (jamais écrasés s'ils existent)
+    try:
+        ensure_cart_summaries(mongo.db)
+    except Exception:
+        logger.warning("Démarrage sans création des résumés de panier")
+
+prepare_database()
+
 def test_mongodb_connection():
-    """Test de connexion MongoDB."""
+    """État de la connexion MongoDB (dernier ping du moniteur, sans requête)."""
+    return health_monitor.is_healthy()
+
+def get_products():
+    """Récupère tous les produits actifs (cache du catalogue)."""
     try:
-        mongo.db.command('ping')
-        return True
+        return catalog_cache.snapshot().active_products
     except Exception as e:
-        logger.error(f"Erreur connexion MongoDB: {e}")
-        return False
+        logger.error(f"Erreur chargement produits: {e}")
+        return []
 
-def get_products():
-    """Récupère tous les produits actifs."""
+def notify_product_availability(product_ids):
+    """Transmet au serveur de recommandations la disponibilité (actif et en stock) de produits."""
     try:
-        products_collection = mongo.db.product
-        products = list(products_collection.find({'is_active': True}))
-        
-        # Conversion des ObjectId en string
+        # Un produit supprimé du catalogue n'est plus disponible
+        availability = {str(product_id): False for product_id in product_ids}
+        products = mongo.db.product.find(
+            {'_id': {'$in': [ObjectId(product_id) for product_id in availability]}},
+            {'is_active': 1, 'stock_quantity': 1}
+        )
         for product in products:
-            product['id'] = str(product['_id'])
+            availability[str(product['_id'])] = bool(product.get('is_active')) and product.get('stock_quantity', 0) > 0
         
-        return products
+        recommendation_client.update_availability([
+            {'product_id': product_id, 'available': available} for product_id, available in availability.items()
+        ])
     except Exception as e:
-        logger.error(f"Erreur chargement produits: {e}")
-        return []
+        logger.error(f"Erreur mise à jour disponibilité produits: {e}")
 
 def create_sample_data():
     """Crée les données d'exemple si elles n'existent pas."""
@@ -308,6 +376,8 @@ def create_sample_data():
             ]
             
             mongo.db.product.insert_many(products_data)
+            increment_stats(mongo.db, products=len(products_data))
+            catalog_cache.bump_version()
             logger.info("Produits d'exemple créés")
         
         # Vérification des utilisateurs
@@ -330,6 +400,7 @@ def create_sample_data():
             ]
             
             mongo.db.users.insert_many(users_data)
+            increment_stats(mongo.db, users=len(users_data))
             logger.info("Utilisateurs d'exemple créés")
             
     except Exception as e:
@@ -340,25 +411,47 @@ def create_sample_data():
 def index():
     """Page d'accueil."""
     try:
-        # Test de connexion
-        if not test_mongodb_connection():
-            flash('Erreur de connexion à la base de données', 'error')
-            return render_template('index.html', products=[], recommendations=[])
-        
-        # Récupération des produits
-        products = get_products()
+        # État de la base : MongoDB injoignable, catalogue servi depuis le cache (mode dégradé)
+        database_available = test_mongodb_connection()
+        if not database_available:
+            if not catalog_cache.loaded:
+                flash('Erreur de connexion à la base de données', 'error')
+                return render_template('index.html', products=[], recommendations=[])
+            flash('Service dégradé : le catalogue affiché peut ne pas être à jour', 'warning')
+        
+        # Récupération des produits (une seule vérification de version par requête)
+        catalog = catalog_cache.snapshot()
+        products = catalog.active_products
         
         # Si aucun produit, créer des données d'exemple
-        if not products:
+        if not products and database_available:
             create_sample_data()
-            products = get_products()
+            catalog = catalog_cache.snapshot()
+            products = catalog.active_products
+        
+        # Page courante du catalogue (jeton invalide : retour à la première page)
+        page_token = request.args.get('page_token')
+        page_size = clamp_page_size(request.args.get('limit'))
+        try:
+            page_products, next_page_token = catalog.page(page_token, page_size)
+        except ValueError:
+            page_token = None
+            page_products, next_page_token = catalog.page(None, page_size)
         
         # Recommandations pour utilisateur connecté
         recommendations = []
         if 'user_id' in session and products:
-            recommendations = products[:4]
-        
-        return render_template('index.html', products=products, recommendations=recommendations)
+            recommended_ids = recommendation_client.get_recommendations(session['user_id'], limit=4, page='home')
+            recommendations = catalog.get_many(recommended_ids)
+            if not recommendations:
+                # Serveur de recommandations indisponible : repli sur les meilleures ventes
+                try:
+                    recommendations = catalog.get_many(best_sellers.get())[:4]
+                except Exception as e:
+                    logger.warning(f"Meilleures ventes indisponibles: {e}")
+        
+        return render_template('index.html', products=page_products, recommendations=recommendations,
+                               page_token=page_token, next_page_token=next_page_token)
         
     except Exception as e:
         logger.error(f"Erreur page accueil: {e}")
@@ -412,6 +505,7 @@ def register():
         }
         
         mongo.db.users.insert_one(user_data)
+        increment_stats(mongo.db, users=1)
         flash('Inscription réussie ! Vous pouvez maintenant vous connecter', 'success')
         return redirect(url_for('login'))
     
@@ -428,14 +522,18 @@ def logout():
 def product_detail(product_id):
     """Détail d'un produit."""
     try:
-        product = mongo.db.product.find_one({'_id': ObjectId(product_id)})
+        catalog = catalog_cache.snapshot()
+        product = catalog.get(product_id)
         
         if not product:
             flash('Produit non trouvé', 'error')
             return redirect(url_for('index'))
         
-        product['id'] = str(product['_id'])
-        return render_template('product.html', product=product)
+        # Produits fréquemment achetés avec celui-ci
+        together_ids = recommendation_client.get_bought_together(product['id'], limit=4)
+        bought_together = catalog.get_many(together_ids)
+        
+        return render_template('product.html', product=product, bought_together=bought_together)
         
     except Exception as e:
         logger.error(f"Erreur détail produit: {e}")
@@ -449,38 +547,17 @@ def add_to_cart(product_id):
         return jsonify({'success': False, 'message': 'Vous devez être connecté'}), 401
     
     try:
-        product = mongo.db.product.find_one({'_id': ObjectId(product_id)})
+        product = catalog_cache.snapshot().get(product_id)
         
         if not product:
             return jsonify({'success': False, 'message': 'Produit non trouvé'}), 404
         
-        # Vérification du stock
+        # Vérification du stock (catalogue en cache)
         if product['stock_quantity'] <= 0:
             return jsonify({'success': False, 'message': 'Produit en rupture de stock'}), 400
         
-        # Vérifier si le produit est déjà dans le panier
-        existing_item = mongo.db.cart.find_one({
-            'user_id': session['user_id'],
-            'product_id': product_id
-        })
-        
-        if existing_item:
-            # Augmenter la quantité
-            mongo.db.cart.update_one(
-                {'_id': existing_item['_id']},
-                {'$inc': {'quantity': 1}}
-            )
-        else:
-            # Ajouter un nouvel article
-            cart_item = {
-                'user_id': session['user_id'],
-                'product_id': product_id,
-                'product_name': product['name'],
-                'price': product['price'],
-                'quantity': 1,
-                'added_at': datetime.utcnow()
-            }
-            mongo.db.cart.insert_one(cart_item)
+        # Ajout ou incrément de la ligne en une seule écriture (upsert atomique)
+        add_cart_item(mongo.db, session['user_id'], product)
         
         return jsonify({
             'success': True, 
@@ -520,7 +597,7 @@ def remove_from_cart(cart_item_id):
         return redirect(url_for('login'))
     
     try:
-        mongo.db.cart.delete_one({'_id': ObjectId(cart_item_id), 'user_id': session['user_id']})
+        remove_cart_item(mongo.db, session['user_id'], cart_item_id)
         flash('Article supprimé du panier', 'success')
     except Exception as e:
         logger.error(f"Erreur suppression panier: {e}")
@@ -536,31 +613,32 @@ def checkout():
         return redirect(url_for('login'))
     
     try:
-        cart_items = list(mongo.db.cart.find({'user_id': session['user_id']}))
+        # Décrément conditionnel du stock, commande et vidage du panier en une transaction
+        purchase = checkout_service.place_order(session['user_id'])
         
-        if not cart_items:
+        if purchase is None:
             flash('Votre panier est vide', 'warning')
             return redirect(url_for('cart'))
         
-        # Création de la commande
-        total = sum(item['price'] * item['quantity'] for item in cart_items)
-        
-        purchase_data = {
-            'user_id': session['user_id'],
-            'items': cart_items,
-            'total': total,
-            'status': 'completed',
-            'created_at': datetime.utcnow()
-        }
+        cart_items = purchase['items']
         
-        mongo.db.purchases.insert_one(purchase_data)
+        # Produits épuisés par la commande retirés des recommandations
+        notify_product_availability({item['product_id'] for item in cart_items})
         
-        # Vider le panier
-        mongo.db.cart.delete_many({'user_id': session['user_id']})
+        # Mise à jour immédiate du profil de recommandation
+        recommendation_client.record_interaction(session['user_id'], [
+            {'product_id': item['product_id'], 'quantity': item['quantity']} for item in cart_items
+        ])
         
         flash('Commande finalisée avec succès !', 'success')
         return redirect(url_for('index'))
         
+    except InsufficientStockError as e:
+        products = catalog_cache.snapshot().get_many(e.product_ids, active_only=False)
+        names = ', '.join(product['name'] for product in products) or 'certains produits'
+        flash(f'Stock insuffisant pour : {names}. Votre panier n\'a pas été modifié.', 'warning')
+        return redirect(url_for('cart'))
+        
     except Exception as e:
         logger.error(f"Erreur checkout: {e}")
         flash('Erreur lors de la finalisation de la commande', 'error')
@@ -574,40 +652,10 @@ def recommendations():
             flash('Vous devez être connecté pour voir les statistiques', 'warning')
             return redirect(url_for('login'))
         
-        # Récupération des données pour les statistiques
-        products_collection = mongo.db.product
-        users_collection = mongo.db.users
-        
-        # Statistiques générales
-        total_products = products_collection.count_documents({})
-        active_products = products_collection.count_documents({'is_active': True})
-        total_users = users_collection.count_documents({})
-        
-        # Produits les plus populaires (par stock)
-        popular_products = list(products_collection.find({}).sort('stock_quantity', -1).limit(5))
-        
-        # Catégories
-        categories = products_collection.distinct('category')
-        
-        # Statistiques par catégorie
-        category_stats = []
-        for category in categories:
-            count = products_collection.count_documents({'category': category})
-            category_stats.append({
-                'name': category,
-                'count': count
-            })
-        
-        # Produits récents
-        recent_products = list(products_collection.find({}).sort('created_at', -1).limit(3))
-        
-        return render_template('recommendations.html', 
-                         total_products=total_products,
-                         active_products=active_products,
-                         total_users=total_users,
-                         popular_products=popular_products,
-                         category_stats=category_stats,
-                         recent_products=recent_products)
+        # Compteurs, catégories, produits populaires et récents (cache partagé)
+        stats = catalog_stats.get()
+        
+        return render_template('recommendations.html', **stats)
         
     except Exception as e:
         logger.error(f"Erreur page recommandations: {e}")
@@ -622,18 +670,20 @@ def purchase_history():
         return redirect(url_for('login'))
     
     try:
-        # Récupération des achats avec conversion des ObjectId
-        purchases = list(mongo.db.purchases.find({'user_id': session['user_id']}).sort('created_at', -1))
+        # Page courante de l'historique (jeton invalide : retour à la première page)
+        page_token = request.args.get('page_token')
+        page_size = clamp_page_size(request.args.get('limit'), default=10)
+        try:
+            purchases, next_page_token = find_order_page(mongo.db, session['user_id'], page_token, page_size)
+        except ValueError:
+            page_token = None
+            purchases, next_page_token = find_order_page(mongo.db, session['user_id'], None, page_size)
         
-        # Conversion des ObjectId en string pour chaque achat
-        for purchase in purchases:
-            purchase['id'] = str(purchase['_id'])
-            # Conversion des ObjectId des items
-            for item in purchase.get('items', []):
-                if '_id' in item:
-                    item['id'] = str(item['_id'])
+        # Nombre de commandes et montant cumulé (résumé maintenu au checkout)
+        order_summary = get_order_summary(mongo.db, session['user_id'])
         
-        return render_template('purchase_history.html', purchases=purchases)
+        return render_template('purchase_history.html', purchases=purchases, order_summary=order_summary,
+                               page_token=page_token, next_page_token=next_page_token)
         
     except Exception as e:
         logger.error(f"Erreur historique: {e}")
@@ -647,12 +697,52 @@ def cart_count():
         return jsonify({'count': 0})
     
     try:
-        count = mongo.db.cart.count_documents({'user_id': session['user_id']})
-        return jsonify({'count': count})
+        return jsonify({'count': get_cart_summary(mongo.db, session['user_id'])['count']})
     except Exception as e:
         logger.error(f"Erreur compteur panier: {e}")
         return jsonify({'count': 0})
 
+@app.route('/api/cart/summary')
+def cart_summary():
+    """API du résumé du panier (nombre de lignes, total, version) avec ETag."""
+    if 'user_id' not in session:
+        return jsonify({'count': 0, 'total': 0.0, 'version': 0})
+    
+    try:
+        summary = get_cart_summary(mongo.db, session['user_id'])
+        response = jsonify(summary)
+        # Le navigateur revalide à chaque appel : 304 tant que la version ne change pas
+        response.set_etag(f"{session['user_id']}-{summary['version']}")
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Erreur résumé panier: {e}")
+        return jsonify({'count': 0, 'total': 0.0, 'version': 0}), 500
+
+@app.route('/api/products')
+def api_products():
+    """API paginée du catalogue (mêmes jetons de page que la page d'accueil)."""
+    try:
+        products, next_page_token = catalog_cache.snapshot().page(
+            request.args.get('page_token'), clamp_page_size(request.args.get('limit'))
+        )
+        return jsonify({
+            'products': [card_fields(product) for product in products],
+            'next_page_token': next_page_token
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erreur API produits: {e}")
+        return jsonify({'error': 'Erreur lors du chargement des produits'}), 500
+
+@app.route('/api/health')
+def api_health():
+    """État de la base (moniteur en tâche de fond) et du cache du catalogue."""
+    status = health_monitor.status()
+    status['catalog_loaded'] = catalog_cache.loaded
+    return jsonify(status), 200 if status['healthy'] else 503
+
 # Routes d'administration
 @app.route('/admin')
 def admin_dashboard():
@@ -662,24 +752,25 @@ def admin_dashboard():
         return redirect(url_for('index'))
     
     try:
-        # Statistiques générales
-        total_products = mongo.db.product.count_documents({})
-        total_users = mongo.db.users.count_documents({})
-        total_orders = mongo.db.purchases.count_documents({})
-        
-        # Produits récents
-        recent_products = list(mongo.db.product.find({}).sort('created_at', -1).limit(5))
-        
-        # Utilisateurs récents
-        recent_users = list(mongo.db.users.find({}).sort('created_at', -1).limit(5))
-        
-        # Commandes récentes
-        recent_orders = list(mongo.db.purchases.find({}).sort('created_at', -1).limit(5))
+        # Compteurs maintenus à l'écriture (un document lu par _id)
+        stats = get_stats(mongo.db)
+        
+        # Listes récentes lues par les index sur created_at
+        recent_products = list(mongo.db.product.find(
+            {}, {'name': 1, 'category': 1, 'price': 1, 'is_active': 1}
+        ).sort('created_at', -1).limit(5))
+        recent_users = list(mongo.db.users.find(
+            {}, {'username': 1, 'email': 1, 'is_admin': 1}
+        ).sort('created_at', -1).limit(5))
+        recent_orders = list(mongo.db.purchases.find(
+            {}, {'total': 1, 'status': 1, 'created_at': 1}
+        ).sort('created_at', -1).limit(5))
         
         return render_template('admin/dashboard.html',
-                             total_products=total_products,
-                             total_users=total_users,
-                             total_orders=total_orders,
+                             total_products=stats['products'],
+                             total_users=stats['users'],
+                             total_orders=stats['orders'],
+                             total_revenue=stats['revenue'],
                              recent_products=recent_products,
                              recent_users=recent_users,
                              recent_orders=recent_orders)
@@ -697,11 +788,14 @@ def admin_products():
         return redirect(url_for('index'))
     
     try:
-        products = list(mongo.db.product.find({}).sort('created_at', -1))
-        for product in products:
-            product['id'] = str(product['_id'])
+        # Page courante, champs des cartes produit uniquement
+        page_token = request.args.get('page_token')
+        products, next_page_token = find_page(
+            mongo.db.product, {}, page_token, clamp_page_size(request.args.get('limit'), default=20)
+        )
         
-        return render_template('admin/products.html', products=products)
+        return render_template('admin/products.html', products=products,
+                               page_token=page_token, next_page_token=next_page_token)
         
     except Exception as e:
         logger.error(f"Erreur gestion produits: {e}")
@@ -729,6 +823,8 @@ def admin_add_product():
             }
             
             mongo.db.product.insert_one(product_data)
+            increment_stats(mongo.db, products=1)
+            catalog_cache.bump_version()
             flash('Produit ajouté avec succès !', 'success')
             return redirect(url_for('admin_products'))
             
@@ -766,6 +862,8 @@ def admin_edit_product(product_id):
                 {'_id': ObjectId(product_id)},
                 {'$set': update_data}
             )
+            catalog_cache.bump_version()
+            notify_product_availability([product_id])
             flash('Produit modifié avec succès !', 'success')
             return redirect(url_for('admin_products'))
         
@@ -785,7 +883,11 @@ def admin_delete_product(product_id):
         return redirect(url_for('index'))
     
     try:
-        mongo.db.product.delete_one({'_id': ObjectId(product_id)})
+        result = mongo.db.product.delete_one({'_id': ObjectId(product_id)})
+        if result.deleted_count:
+            increment_stats(mongo.db, products=-1)
+        catalog_cache.bump_version()
+        notify_product_availability([product_id])
         flash('Produit supprimé avec succès !', 'success')
     except Exception as e:
         logger.error(f"Erreur suppression produit: {e}")
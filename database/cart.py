@@ -0,0 +1,284 @@
+"""
+Opérations atomiques sur le panier MongoDB.
+
+Une ligne de panier est unique par (user_id, product_id), garanti par un
+index unique. L'ajout au panier est un seul upsert : `$inc` sur la quantité
+et `$setOnInsert` pour les champs du produit. Aucune lecture préalable, et
+aucun doublon même en cas de clics concurrents.
+
+Un résumé par utilisateur (collection `cart_summary` : nombre de lignes,
+total, version) est maintenu par `$inc` à chaque ajout, suppression et
+commande, pour servir le compteur du panier sans relire les lignes. Le
+`$inc` crée le résumé s'il n'existe pas encore : toute ligne écrite par
+l'application y est comptée une fois et une seule, sans recalcul concurrent
+des écritures. Les résumés des paniers antérieurs sont créés au démarrage
+depuis leurs lignes (`ensure_cart_summaries`), par un upsert qui n'écrit
+que si le résumé est absent (`$setOnInsert`).
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from bson import ObjectId
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Collection des résumés de panier (un document par utilisateur, _id = user_id)
+CART_SUMMARY_COLLECTION = 'cart_summary'
+
+
+def _cart_totals_pipeline(match: Dict) -> list:
+    """
+    Pipeline de calcul des résumés (nombre de lignes, total) par utilisateur.
+    """
+    return [
+        {'$match': match},
+        {'$group': {
+            '_id': '$user_id',
+            'count': {'$sum': 1},
+            'total': {'$sum': {'$multiply': ['$price', '$quantity']}}
+        }}
+    ]
+
+
+def rebuild_cart_summary(mongo_db, user_id: str, session=None) -> Dict:
+    """
+    Recalcule le résumé du panier d'un utilisateur depuis ses lignes (sans l'écrire).
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+        session: Session MongoDB optionnelle
+
+    Returns:
+        Dict: {'count', 'total', 'version'} (version 0 : résumé non enregistré)
+    """
+    totals = list(mongo_db.cart.aggregate(_cart_totals_pipeline({'user_id': user_id}), session=session))
+    if not totals:
+        return {'count': 0, 'total': 0.0, 'version': 0}
+    return {'count': totals[0]['count'], 'total': totals[0]['total'], 'version': 0}
+
+
+def ensure_cart_summaries(mongo_db, batch_size: int = 500) -> int:
+    """
+    Crée les résumés manquants des paniers existants (migration idempotente, au démarrage).
+
+    Chaque résumé est écrit par un upsert `$setOnInsert` : un résumé déjà
+    créé (par un ajout au panier concurrent) n'est jamais écrasé.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        batch_size (int): Nombre de résumés écrits par bulk_write
+
+    Returns:
+        int: Nombre de résumés créés
+    """
+    try:
+        summaries = mongo_db[CART_SUMMARY_COLLECTION]
+        created = 0
+        operations = []
+        for totals in mongo_db.cart.aggregate(_cart_totals_pipeline({})):
+            operations.append(UpdateOne(
+                {'_id': totals['_id']},
+                {'$setOnInsert': {'count': totals['count'], 'total': totals['total'], 'version': 1}},
+                upsert=True
+            ))
+            if len(operations) >= batch_size:
+                created += summaries.bulk_write(operations, ordered=False).upserted_count
+                operations = []
+        if operations:
+            created += summaries.bulk_write(operations, ordered=False).upserted_count
+
+        if created:
+            logger.info(f"Résumés de panier créés: {created}")
+        return created
+    except Exception as e:
+        logger.error(f"Erreur lors de la création des résumés de panier: {e}")
+        raise
+
+
+def _apply_to_summary(mongo_db, user_id: str, count: int, amount: float, session=None):
+    """
+    Répercute une modification du panier sur le résumé (créé par le même $inc s'il n'existe pas).
+    """
+    mongo_db[CART_SUMMARY_COLLECTION].update_one(
+        {'_id': user_id},
+        {'$inc': {'count': count, 'total': amount, 'version': 1}},
+        upsert=True,
+        session=session
+    )
+
+
+def get_cart_summary(mongo_db, user_id: str) -> Dict:
+    """
+    Retourne le résumé du panier d'un utilisateur.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+
+    Returns:
+        Dict: {'count', 'total', 'version'}
+    """
+    summary = mongo_db[CART_SUMMARY_COLLECTION].find_one({'_id': user_id})
+    if summary is None:
+        # Panier jamais modifié par l'application depuis la migration : calculé sans écriture
+        summary = rebuild_cart_summary(mongo_db, user_id)
+    return {
+        'count': summary['count'],
+        # Le total est cumulé par $inc : arrondi des erreurs de virgule flottante
+        'total': round(summary['total'], 2),
+        'version': summary['version']
+    }
+
+
+def reset_cart_summary(mongo_db, user_id: str, session=None):
+    """
+    Remet à zéro le résumé du panier après le vidage du panier (commande).
+    """
+    mongo_db[CART_SUMMARY_COLLECTION].update_one(
+        {'_id': user_id},
+        {'$set': {'count': 0, 'total': 0.0}, '$inc': {'version': 1}},
+        upsert=True,
+        session=session
+    )
+
+
+def remove_checked_out_lines(mongo_db, user_id: str, cart_items: List[Dict], session=None):
+    """
+    Retire du panier les lignes lues au moment de la commande, et elles seules (un bulk_write).
+
+    Une ligne ajoutée après la lecture reste dans le panier ; une ligne dont la
+    quantité a augmenté entre-temps est diminuée de la quantité commandée au
+    lieu d'être supprimée. Le résumé est diminué de ce qui a été retiré.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+        cart_items (List[Dict]): Lignes lues et commandées
+        session: Session MongoDB optionnelle (transaction en cours)
+    """
+    # Filtres exclusifs, dans l'ordre : suppression si la quantité n'a pas changé, sinon décrément
+    operations = []
+    for item in cart_items:
+        operations.append(DeleteOne({'_id': item['_id'], 'quantity': item['quantity']}))
+        operations.append(UpdateOne(
+            {'_id': item['_id'], 'quantity': {'$gt': item['quantity']}},
+            {'$inc': {'quantity': -item['quantity']}}
+        ))
+    result = mongo_db.cart.bulk_write(operations, ordered=True, session=session)
+
+    if result.deleted_count + result.matched_count == len(cart_items):
+        amount = sum(item['price'] * item['quantity'] for item in cart_items)
+        _apply_to_summary(mongo_db, user_id, -result.deleted_count, -amount, session=session)
+    else:
+        # Ligne retirée entre-temps par l'utilisateur (déjà déduite du résumé) : résumé recalculé
+        summary = rebuild_cart_summary(mongo_db, user_id, session=session)
+        mongo_db[CART_SUMMARY_COLLECTION].update_one(
+            {'_id': user_id},
+            {'$set': {'count': summary['count'], 'total': summary['total']}, '$inc': {'version': 1}},
+            upsert=True,
+            session=session
+        )
+
+
+def add_cart_item(mongo_db, user_id: str, product: Dict, quantity: int = 1):
+    """
+    Ajoute un produit au panier (un upsert) et met à jour son résumé.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+        product (Dict): Produit (catalogue en cache, avec 'id', 'name' et 'price')
+        quantity (int): Quantité ajoutée
+
+    Returns:
+        Optional[Dict]: Ligne avant l'ajout, None si elle vient d'être créée
+    """
+    cart_collection = mongo_db.cart
+    query = {'user_id': user_id, 'product_id': product['id']}
+    update = {
+        '$inc': {'quantity': quantity},
+        '$setOnInsert': {
+            'product_name': product['name'],
+            'price': product['price'],
+            'added_at': datetime.utcnow()
+        }
+    }
+    try:
+        previous = cart_collection.find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # Deux upserts concurrents ont tenté l'insertion : la ligne existe désormais
+        previous = cart_collection.find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+
+    # Le prix de la ligne est celui de sa création ($setOnInsert)
+    if previous is None:
+        _apply_to_summary(mongo_db, user_id, 1, product['price'] * quantity)
+    else:
+        _apply_to_summary(mongo_db, user_id, 0, previous['price'] * quantity)
+    return previous
+
+
+def remove_cart_item(mongo_db, user_id: str, cart_item_id: str) -> Optional[Dict]:
+    """
+    Supprime une ligne du panier et met à jour son résumé.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+        cart_item_id (str): ID de la ligne de panier
+
+    Returns:
+        Optional[Dict]: Ligne supprimée, None si elle n'existait pas
+    """
+    item = mongo_db.cart.find_one_and_delete({'_id': ObjectId(cart_item_id), 'user_id': user_id})
+    if item is not None:
+        _apply_to_summary(mongo_db, user_id, -1, -item['price'] * item['quantity'])
+    return item
+
+
+def merge_duplicate_cart_lines(cart_collection) -> int:
+    """
+    Fusionne les lignes en double d'un même produit (avant création de l'index unique).
+
+    Args:
+        cart_collection: Collection MongoDB du panier
+
+    Returns:
+        int: Nombre de lignes supprimées
+    """
+    try:
+        duplicates = cart_collection.aggregate([
+            {'$sort': {'added_at': 1}},
+            {'$group': {
+                '_id': {'user_id': '$user_id', 'product_id': '$product_id'},
+                'ids': {'$push': '$_id'},
+                'quantity': {'$sum': '$quantity'},
+                'count': {'$sum': 1}
+            }},
+            {'$match': {'count': {'$gt': 1}}}
+        ])
+
+        removed = 0
+        for duplicate in duplicates:
+            keep, *others = duplicate['ids']
+            cart_collection.update_one({'_id': keep}, {'$set': {'quantity': duplicate['quantity']}})
+            removed += cart_collection.delete_many({'_id': {'$in': others}}).deleted_count
+
+        if removed:
+            logger.info(f"Lignes de panier en double fusionnées: {removed}")
+        return removed
+    except Exception as e:
+        logger.error(f"Erreur lors de la fusion des lignes de panier: {e}")
+        raise
@@ -0,0 +1,196 @@
+"""
+Test de charge de l'ajout au panier concurrent.
+
+Plusieurs threads ajoutent simultanément les mêmes produits aux paniers des
+mêmes utilisateurs, dans une base MongoDB dédiée (supprimée à la fin). Le
+script vérifie :
+- une seule ligne de panier par (utilisateur, produit) ;
+- une quantité égale au nombre de clics ;
+- un résumé de panier (nombre de lignes, total) cohérent avec les lignes ;
+- deux commandes d'écriture MongoDB par clic (ligne et résumé), sans lecture.
+
+Avec --missing-summaries, les utilisateurs n'ont pas de résumé au départ :
+la moitié ont des lignes de panier antérieures (migrées par
+ensure_cart_summaries, comme au démarrage de l'application), les autres
+n'ont ni ligne ni résumé et leurs premiers clics concurrents le créent.
+
+Usage:
+    python -m database.cart_stress --mongo-uri mongodb://localhost:27017 --threads 32 --clicks 50
+    python -m database.cart_stress --mongo-uri mongodb://localhost:27017 --missing-summaries
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import sys
+import time
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import MongoClient, monitoring
+
+from database.cart import CART_SUMMARY_COLLECTION, add_cart_item, reset_cart_summary, ensure_cart_summaries
+from database.mongo_indexes import REQUIRED_INDEXES
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Compte les commandes MongoDB envoyées sur une base.
+    """
+
+    def __init__(self, database: str):
+        self.database = database
+        self.commands = Counter()
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.database_name == self.database:
+            with self._lock:
+                self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def run_stress(mongo_uri: str, database: str, threads: int, clicks: int,
+               users: int, products: int, missing_summaries: bool = False) -> Dict:
+    """
+    Lance les clics concurrents et vérifie l'état final du panier.
+
+    Args:
+        mongo_uri (str): URI du serveur MongoDB
+        database (str): Base temporaire (supprimée avant et après le test)
+        threads (int): Nombre de threads
+        clicks (int): Nombre de clics par thread
+        users (int): Nombre d'utilisateurs
+        products (int): Nombre de produits
+        missing_summaries (bool): Démarrer sans résumés de panier (paniers antérieurs et nouveaux)
+
+    Returns:
+        Dict: Résultats et liste des erreurs détectées
+    """
+    counter = CommandCounter(database)
+    client = MongoClient(mongo_uri, event_listeners=[counter], serverSelectionTimeoutMS=5000)
+    try:
+        client.drop_database(database)
+        mongo_db = client[database]
+        cart = mongo_db.cart
+        cart.create_indexes(REQUIRED_INDEXES['cart'])
+
+        catalog = [{'id': f'product-{i}', 'name': f'Produit {i}', 'price': 10.0 + i} for i in range(products)]
+        clicks_done = Counter()
+        if missing_summaries:
+            # Un utilisateur sur deux a un panier antérieur sans résumé, migré comme au démarrage
+            for user in range(0, users, 2):
+                for product in catalog:
+                    cart.insert_one({'user_id': f'user-{user}', 'product_id': product['id'],
+                                     'product_name': product['name'], 'price': product['price'], 'quantity': 2})
+                    clicks_done[(f'user-{user}', product['id'])] += 2
+            ensure_cart_summaries(mongo_db)
+        else:
+            # Résumés créés d'avance
+            for user in range(users):
+                reset_cart_summary(mongo_db, f'user-{user}')
+        clicks_lock = threading.Lock()
+
+        def worker(thread_index: int):
+            # Tous les threads se partagent les mêmes couples (utilisateur, produit)
+            for click in range(clicks):
+                user_id = f'user-{(thread_index + click) % users}'
+                product = catalog[click % products]
+                add_cart_item(mongo_db, user_id, product)
+                with clicks_lock:
+                    clicks_done[(user_id, product['id'])] += 1
+
+        counter.commands.clear()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+        commands = dict(counter.commands)
+
+        errors = []
+        lines = list(cart.find({}))
+        quantities = Counter()
+        for line in lines:
+            quantities[(line['user_id'], line['product_id'])] += line['quantity']
+        duplicates = len(lines) - len(quantities)
+        if duplicates:
+            errors.append(f"{duplicates} ligne(s) de panier en double")
+        if quantities != clicks_done:
+            errors.append("Quantités différentes du nombre de clics")
+
+        summaries = list(mongo_db[CART_SUMMARY_COLLECTION].find({}))
+        missing = {line['user_id'] for line in lines} - {summary['_id'] for summary in summaries}
+        if missing:
+            errors.append(f"Résumé du panier absent pour {', '.join(sorted(missing))}")
+        for summary in summaries:
+            user_lines = [line for line in lines if line['user_id'] == summary['_id']]
+            expected_total = sum(line['price'] * line['quantity'] for line in user_lines)
+            if summary['count'] != len(user_lines) or abs(summary['total'] - expected_total) > 1e-6:
+                errors.append(f"Résumé du panier incohérent pour {summary['_id']}")
+
+        total_clicks = threads * clicks
+        writes = commands.get('findAndModify', 0) + commands.get('update', 0) + commands.get('insert', 0)
+        if writes != 2 * total_clicks:
+            errors.append(f"{writes} écritures pour {total_clicks} clics")
+        reads = commands.get('find', 0)
+        if reads:
+            errors.append(f"{reads} lecture(s) pendant les ajouts")
+
+        return {
+            'clicks': total_clicks,
+            'cart_lines': len(lines),
+            'commands': commands,
+            'clicks_per_second': round(total_clicks / elapsed, 1) if elapsed > 0 else None,
+            'errors': errors
+        }
+    finally:
+        client.drop_database(database)
+        client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Point d'entrée en ligne de commande.
+    """
+    parser = argparse.ArgumentParser(description="Test de charge de l'ajout au panier")
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017', help='URI MongoDB')
+    parser.add_argument('--database', default='ecommerce_cart_stress', help='Base temporaire du test')
+    parser.add_argument('--threads', type=int, default=32, help='Nombre de threads')
+    parser.add_argument('--clicks', type=int, default=50, help='Clics par thread')
+    parser.add_argument('--users', type=int, default=4, help="Nombre d'utilisateurs")
+    parser.add_argument('--products', type=int, default=3, help='Nombre de produits')
+    parser.add_argument('--missing-summaries', action='store_true',
+                        help='Démarrer sans résumés de panier (chemin de création du résumé)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    result = run_stress(args.mongo_uri, args.database, args.threads, args.clicks, args.users, args.products,
+                        missing_summaries=args.missing_summaries)
+    logger.info(f"{result['clicks']} clics, {result['cart_lines']} lignes de panier, "
+                f"commandes: {result['commands']}, {result['clicks_per_second']} clics/s")
+
+    if result['errors']:
+        for error in result['errors']:
+            logger.error(error)
+        sys.exit(1)
+    logger.info("Ajout au panier atomique: aucune anomalie")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Cache en mémoire du catalogue produits MongoDB.
+
+Le catalogue complet (produits convertis, index par ID) est chargé une
+fois par processus puis servi depuis la mémoire. Chaque requête ne lit
+que le numéro de version du catalogue (un document, recherche par _id) ;
+les routes d'administration incrémentent ce numéro après chaque
+modification, ce qui provoque le rechargement au prochain accès. Si le
+moniteur de santé signale MongoDB injoignable, le dernier catalogue chargé
+est servi sans aucune requête (mode dégradé).
+
+Les produits en cache sont partagés entre les requêtes : ils ne doivent
+pas être modifiés par les appelants.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from typing import List, Dict, Tuple, Optional
+
+from database.pagination import DEFAULT_PAGE_SIZE, sort_key, encode_page_token, decode_page_token
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Document portant la version du catalogue
+CATALOG_VERSION_ID = 'catalog'
+
+
+class CatalogSnapshot:
+    """
+    Version figée du catalogue.
+
+    Attributs:
+        version (int): Version du catalogue chargée
+        active_products (List[Dict]): Produits actifs, du plus récent au plus ancien
+        products_by_id (Dict[str, Dict]): Tous les produits, par ID (chaîne)
+    """
+
+    __slots__ = ('version', 'active_products', 'products_by_id', '_ascending_keys')
+
+    def __init__(self, version: int, products: List[Dict]):
+        self.version = version
+        self.products_by_id = {product['id']: product for product in products}
+        self.active_products = sorted(
+            (product for product in products if product.get('is_active')), key=sort_key, reverse=True
+        )
+        # Clés de pagination croissantes, pour la recherche dichotomique
+        self._ascending_keys = [sort_key(product) for product in reversed(self.active_products)]
+
+    def page(self, page_token: Optional[str] = None,
+             page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Retourne une page de produits actifs (mêmes jetons que database.pagination.find_page).
+
+        Args:
+            page_token (Optional[str]): Jeton de la page précédente (None = première page)
+            page_size (int): Nombre de produits par page
+
+        Returns:
+            Tuple[List[Dict], Optional[str]]: Produits et jeton de la page suivante
+        """
+        start = 0
+        if page_token:
+            # Produits de clé supérieure ou égale au jeton : déjà affichés
+            keys = self._ascending_keys
+            start = len(keys) - bisect_left(keys, decode_page_token(page_token))
+
+        products = self.active_products[start:start + page_size]
+        has_next = start + page_size < len(self.active_products)
+        return products, encode_page_token(products[-1]) if has_next and products else None
+
+    def get(self, product_id) -> Optional[Dict]:
+        """
+        Retourne un produit par son ID, None s'il est inconnu.
+        """
+        return self.products_by_id.get(str(product_id))
+
+    def get_many(self, product_ids: List, active_only: bool = True) -> List[Dict]:
+        """
+        Retourne les produits connus d'une liste d'IDs, dans l'ordre de la liste.
+        """
+        products = (self.products_by_id.get(str(product_id)) for product_id in product_ids)
+        return [product for product in products
+                if product is not None and (product.get('is_active') or not active_only)]
+
+
+class CatalogCache:
+    """
+    Cache du catalogue invalidé par numéro de version.
+    """
+
+    def __init__(self, mongo, meta_collection: str = 'catalog_meta', health_monitor=None):
+        """
+        Initialise le cache (le catalogue est chargé au premier accès).
+
+        Args:
+            mongo: Extension PyMongo de l'application
+            meta_collection (str): Collection portant le numéro de version
+            health_monitor (Optional[DatabaseHealthMonitor]): Moniteur de la connexion MongoDB
+        """
+        self._mongo = mongo
+        self.meta_collection = meta_collection
+        self.health_monitor = health_monitor
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Indique si un catalogue a déjà été chargé.
+        """
+        return self._snapshot is not None
+
+    def current_version(self) -> int:
+        """
+        Lit le numéro de version du catalogue (0 si jamais incrémenté).
+        """
+        document = self._mongo.db[self.meta_collection].find_one({'_id': CATALOG_VERSION_ID}, {'version': 1})
+        return document.get('version', 0) if document else 0
+
+    def bump_version(self) -> int:
+        """
+        Incrémente la version du catalogue après une modification des produits.
+
+        Returns:
+            int: Nouvelle version
+        """
+        try:
+            document = self._mongo.db[self.meta_collection].find_one_and_update(
+                {'_id': CATALOG_VERSION_ID},
+                {'$inc': {'version': 1}},
+                upsert=True,
+                return_document=True
+            )
+            return document['version']
+        except Exception as e:
+            logger.error(f"Erreur incrémentation version catalogue: {e}")
+            raise
+
+    def _load(self, version: int) -> CatalogSnapshot:
+        products = list(self._mongo.db.product.find({}))
+        for product in products:
+            product['id'] = str(product['_id'])
+        logger.info(f"Catalogue version {version} chargé en mémoire: {len(products)} produits")
+        return CatalogSnapshot(version, products)
+
+    def snapshot(self) -> CatalogSnapshot:
+        """
+        Retourne le catalogue à jour, rechargé uniquement si sa version a changé.
+
+        En cas d'erreur de lecture de la version, ou si MongoDB est signalé
+        injoignable, le dernier catalogue chargé continue d'être servi.
+
+        Returns:
+            CatalogSnapshot: Catalogue courant
+
+        Raises:
+            ConnectionError: MongoDB injoignable et aucun catalogue en cache
+        """
+        snapshot = self._snapshot
+        if self.health_monitor is not None and not self.health_monitor.is_healthy():
+            if snapshot is None:
+                raise ConnectionError("MongoDB injoignable et catalogue non chargé")
+            return snapshot
+
+        try:
+            version = self.current_version()
+        except Exception as e:
+            if snapshot is not None:
+                logger.error(f"Erreur lecture version catalogue, cache conservé: {e}")
+                return snapshot
+            raise
+
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._load(version)
+                self._snapshot = snapshot
+            return snapshot
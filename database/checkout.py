@@ -0,0 +1,204 @@
+"""
+Finalisation transactionnelle des commandes MongoDB.
+
+Une commande est validée en un nombre constant d'allers-retours, quelle
+que soit la taille du panier :
+1. lecture du panier ;
+2. un `bulk_write` de décréments conditionnels du stock
+   (`stock_quantity >= quantité`) pour tous les articles ;
+3. insertion de la commande ;
+4. suppression des lignes de panier lues à l'étape 1 (pas de celles ajoutées
+   depuis) et mise à jour de son résumé ;
+5. incrément des compteurs du tableau de bord (commandes, chiffre d'affaires)
+   et du résumé des commandes de l'utilisateur.
+
+Les articles de la commande sont enregistrés au schéma compact
+(database/orders.py), sans les champs techniques des lignes de panier.
+
+Ces étapes s'exécutent dans une transaction multi-documents : si un article
+n'a plus assez de stock, la transaction est annulée et aucun stock n'est
+décrémenté. Les transactions exigent un replica set (éventuellement à un
+seul nœud) ; sur un serveur autonome, les articles sont décrémentés un par
+un et les décréments déjà appliqués sont compensés en cas d'échec, y compris
+si l'insertion de la commande ou la suppression du panier échoue.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from database.cart import remove_checked_out_lines
+from database.orders import ORDER_SCHEMA_VERSION, order_item, record_order
+from database.rollups import increment_stats
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Code d'erreur MongoDB d'une transaction refusée par un serveur autonome
+ILLEGAL_OPERATION = 20
+
+
+class InsufficientStockError(Exception):
+    """
+    Stock insuffisant (ou produit indisponible) pour au moins un article du panier.
+
+    Attributs:
+        product_ids (List[str]): Produits en cause
+    """
+
+    def __init__(self, product_ids: List[str]):
+        self.product_ids = product_ids
+        super().__init__(f"Stock insuffisant pour les produits: {', '.join(product_ids)}")
+
+
+class CheckoutService:
+    """
+    Validation atomique d'un panier en commande.
+    """
+
+    def __init__(self, mongo):
+        """
+        Initialise le service.
+
+        Args:
+            mongo: Extension PyMongo de l'application
+        """
+        self._mongo = mongo
+        self.transactions_supported: Optional[bool] = None
+
+    @staticmethod
+    def _stock_filter(item: Dict) -> Dict:
+        return {
+            '_id': ObjectId(item['product_id']),
+            'is_active': True,
+            'stock_quantity': {'$gte': item['quantity']}
+        }
+
+    def _missing_stock(self, cart_items: List[Dict], session=None) -> List[str]:
+        """
+        Identifie les articles dont le stock ne couvre pas la quantité demandée (chemin d'échec).
+        """
+        products = {
+            str(product['_id']): product
+            for product in self._mongo.db.product.find(
+                {'_id': {'$in': [ObjectId(item['product_id']) for item in cart_items]}},
+                {'is_active': 1, 'stock_quantity': 1},
+                session=session
+            )
+        }
+        missing = []
+        for item in cart_items:
+            product = products.get(item['product_id'])
+            if not product or not product.get('is_active') or product.get('stock_quantity', 0) < item['quantity']:
+                missing.append(item['product_id'])
+        return missing
+
+    def _purchase(self, user_id: str, cart_items: List[Dict]) -> Dict:
+        return {
+            'user_id': user_id,
+            'items': [order_item(item) for item in cart_items],
+            'schema_version': ORDER_SCHEMA_VERSION,
+            'total': sum(item['price'] * item['quantity'] for item in cart_items),
+            'status': 'completed',
+            'created_at': datetime.utcnow()
+        }
+
+    def _place_in_transaction(self, session, user_id: str) -> Optional[Dict]:
+        db = self._mongo.db
+        cart_items = list(db.cart.find({'user_id': user_id}, session=session))
+        if not cart_items:
+            return None
+
+        result = db.product.bulk_write(
+            [UpdateOne(self._stock_filter(item), {'$inc': {'stock_quantity': -item['quantity']}})
+             for item in cart_items],
+            ordered=False,
+            session=session
+        )
+        if result.matched_count != len(cart_items):
+            # Levée dans la transaction : with_transaction l'annule avant de la propager
+            raise InsufficientStockError(self._missing_stock(cart_items, session))
+
+        purchase = self._purchase(user_id, cart_items)
+        db.purchases.insert_one(purchase, session=session)
+        remove_checked_out_lines(db, user_id, cart_items, session=session)
+        increment_stats(db, session=session, orders=1, revenue=purchase['total'])
+        record_order(db, purchase, session=session)
+        return purchase
+
+    def _restore_stock(self, decremented: List[Dict]):
+        """
+        Compense les décréments de stock déjà appliqués (chemin sans transaction).
+        """
+        if decremented:
+            self._mongo.db.product.bulk_write(
+                [UpdateOne({'_id': ObjectId(done['product_id'])}, {'$inc': {'stock_quantity': done['quantity']}})
+                 for done in decremented],
+                ordered=False
+            )
+
+    def _place_without_transaction(self, user_id: str) -> Optional[Dict]:
+        db = self._mongo.db
+        cart_items = list(db.cart.find({'user_id': user_id}))
+        if not cart_items:
+            return None
+
+        decremented = []
+        for item in cart_items:
+            result = db.product.update_one(self._stock_filter(item), {'$inc': {'stock_quantity': -item['quantity']}})
+            if result.matched_count == 0:
+                self._restore_stock(decremented)
+                raise InsufficientStockError(self._missing_stock(cart_items))
+            decremented.append(item)
+
+        purchase = self._purchase(user_id, cart_items)
+        try:
+            db.purchases.insert_one(purchase)
+            remove_checked_out_lines(db, user_id, cart_items)
+        except Exception as e:
+            # Commande non enregistrée ou panier non vidé : commande retirée et stock rendu
+            logger.error(f"Erreur lors de l'enregistrement de la commande, compensation: {e}")
+            if '_id' in purchase:
+                db.purchases.delete_one({'_id': purchase['_id']})
+            self._restore_stock(decremented)
+            raise
+        increment_stats(db, orders=1, revenue=purchase['total'])
+        record_order(db, purchase)
+        return purchase
+
+    def place_order(self, user_id: str) -> Optional[Dict]:
+        """
+        Transforme le panier d'un utilisateur en commande et décrémente le stock.
+
+        Args:
+            user_id (str): ID de l'utilisateur
+
+        Returns:
+            Optional[Dict]: Commande créée, None si le panier est vide
+
+        Raises:
+            InsufficientStockError: Stock insuffisant, rien n'a été modifié
+        """
+        if self.transactions_supported is not False:
+            try:
+                with self._mongo.cx.start_session() as session:
+                    purchase = session.with_transaction(
+                        lambda s: self._place_in_transaction(s, user_id)
+                    )
+                self.transactions_supported = True
+                return purchase
+            except OperationFailure as e:
+                if e.code != ILLEGAL_OPERATION:
+                    raise
+                logger.warning(f"Transactions MongoDB indisponibles (serveur autonome), "
+                               f"checkout avec compensation: {e}")
+                self.transactions_supported = False
+
+        return self._place_without_transaction(user_id)
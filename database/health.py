@@ -0,0 +1,121 @@
+"""
+Surveillance de la disponibilité de MongoDB en tâche de fond.
+
+Un thread dédié, démarré avec l'application, envoie un `ping` à intervalle
+régulier et mémorise l'état de la connexion et sa latence. Chaque ping est
+borné par un délai court (sélection du serveur comprise) : une base
+injoignable est détectée en une seconde, pas après les 30 s par défaut du
+driver. Les routes consultent cet état en mémoire
+au lieu d'interroger la base avant chaque traitement ; quand MongoDB est
+injoignable, le catalogue est servi depuis le cache (mode dégradé).
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+import pymongo
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+
+class DatabaseHealthMonitor:
+    """
+    Moniteur de santé de la connexion MongoDB.
+
+    Attributs:
+        healthy (Optional[bool]): Résultat du dernier ping (None avant le premier)
+        latency_ms (Optional[float]): Latence du dernier ping réussi
+        last_check (Optional[float]): Date (epoch) du dernier ping
+        last_error (Optional[str]): Message de la dernière erreur
+        consecutive_failures (int): Nombre d'échecs consécutifs
+    """
+
+    def __init__(self, mongo, interval: float = 5.0, timeout: float = 1.0):
+        """
+        Initialise le moniteur (le thread démarre avec start, appelé à l'initialisation de l'application).
+
+        Args:
+            mongo: Extension PyMongo de l'application
+            interval (float): Intervalle entre deux pings en secondes
+            timeout (float): Délai maximal d'un ping en secondes, sélection du serveur comprise
+        """
+        self._mongo = mongo
+        self.interval = interval
+        self.timeout = timeout
+        self.healthy: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.last_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def check(self) -> bool:
+        """
+        Envoie un ping à MongoDB et met à jour l'état.
+
+        Returns:
+            bool: True si la base a répondu
+        """
+        start = time.perf_counter()
+        try:
+            # Délai par opération : borne aussi la sélection du serveur (serverSelectionTimeoutMS)
+            with pymongo.timeout(self.timeout):
+                self._mongo.db.command('ping')
+            self.latency_ms = round((time.perf_counter() - start) * 1000, 3)
+            if self.healthy is False:
+                logger.info("Connexion MongoDB rétablie")
+            self.healthy = True
+            self.consecutive_failures = 0
+            self.last_error = None
+        except Exception as e:
+            if self.healthy is not False:
+                logger.error(f"Erreur connexion MongoDB, passage en mode dégradé: {e}")
+            self.healthy = False
+            self.consecutive_failures += 1
+            self.last_error = str(e)
+        finally:
+            self.last_check = time.time()
+        return self.healthy
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def start(self):
+        """
+        Effectue le premier ping puis démarre le thread de surveillance (sans effet s'il tourne déjà).
+        """
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self.healthy is None:
+                    self.check()
+                self._thread = threading.Thread(target=self._run, name='mongodb-health', daemon=True)
+                self._thread.start()
+
+    def is_healthy(self) -> bool:
+        """
+        Retourne l'état connu de la base, sans requête (le moniteur est démarré si besoin).
+        """
+        if self._thread is None:
+            self.start()
+        return bool(self.healthy)
+
+    def status(self) -> Dict:
+        """
+        Retourne l'état du moniteur, sérialisable en JSON.
+        """
+        return {
+            'healthy': self.is_healthy(),
+            'latency_ms': self.latency_ms,
+            'last_check': self.last_check,
+            'last_error': self.last_error,
+            'consecutive_failures': self.consecutive_failures
+        }
@@ -0,0 +1,190 @@
+"""
+Index MongoDB des requêtes fréquentes de l'application.
+
+Tous les index nécessaires sont déclarés ici et créés de façon idempotente
+au démarrage de l'application (ou par ce script lors d'une migration). La
+vérification `--check` exécute `explain()` sur chaque requête fréquente et
+échoue si l'une d'elles parcourt une collection entière (COLLSCAN) ou trie
+ses résultats en mémoire (SORT).
+
+Usage:
+    python -m database.mongo_indexes --mongo-uri mongodb://localhost:27017/ecommerce-python
+    python -m database.mongo_indexes --mongo-uri mongodb://localhost:27017/ecommerce-python --check
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import sys
+import logging
+import argparse
+from typing import List, Dict, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from database.cart import merge_duplicate_cart_lines
+from database.orders import LEGACY_ORDERS_FILTER
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Index requis, par collection
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    'product': [
+        # Catalogue actif et pagination par clé (created_at, _id)
+        IndexModel([('is_active', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+                   name='is_active_created_at_id'),
+        IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)], name='created_at_id'),
+        IndexModel([('category', ASCENDING)], name='category'),
+        IndexModel([('stock_quantity', DESCENDING)], name='stock_quantity')
+    ],
+    'cart': [
+        # Panier d'un utilisateur ; une seule ligne par produit (upsert atomique)
+        IndexModel([('user_id', ASCENDING), ('product_id', ASCENDING)], name='user_id_product_id', unique=True)
+    ],
+    'purchases': [
+        # Historique d'un utilisateur, du plus récent au plus ancien (pagination par clé)
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+                   name='user_id_created_at_id'),
+        IndexModel([('created_at', DESCENDING)], name='created_at'),
+        # Commandes à migrer au schéma compact (champ absent = null dans l'index)
+        IndexModel([('schema_version', ASCENDING)], name='schema_version')
+    ],
+    'users': [
+        IndexModel([('username', ASCENDING)], name='username'),
+        IndexModel([('email', ASCENDING)], name='email'),
+        IndexModel([('created_at', DESCENDING)], name='created_at')
+    ]
+}
+
+# Requêtes fréquentes vérifiées par explain() (valeurs d'exemple)
+HOT_QUERIES: List[Dict] = [
+    {'collection': 'cart', 'filter': {'user_id': 'u'}},
+    {'collection': 'cart', 'filter': {'user_id': 'u', 'product_id': 'p'}},
+    {'collection': 'purchases', 'filter': {'user_id': 'u'}, 'sort': [('created_at', DESCENDING), ('_id', DESCENDING)]},
+    {'collection': 'purchases', 'filter': {}, 'sort': [('created_at', DESCENDING)]},
+    {'collection': 'purchases', 'filter': LEGACY_ORDERS_FILTER},
+    {'collection': 'product', 'filter': {'is_active': True}},
+    {'collection': 'product', 'filter': {'category': 'c'}},
+    {'collection': 'product', 'filter': {}, 'sort': [('created_at', DESCENDING), ('_id', DESCENDING)]},
+    {'collection': 'product', 'filter': {}, 'sort': [('created_at', DESCENDING)]},
+    {'collection': 'product', 'filter': {}, 'sort': [('stock_quantity', DESCENDING)]},
+    {'collection': 'users', 'filter': {'username': 'u'}},
+    {'collection': 'users', 'filter': {'email': 'e'}},
+    {'collection': 'users', 'filter': {}, 'sort': [('created_at', DESCENDING)]}
+]
+
+# Étapes de plan interdites pour une requête fréquente
+FORBIDDEN_STAGES = ('COLLSCAN', 'SORT')
+
+
+def ensure_indexes(mongo_db) -> List[str]:
+    """
+    Crée les index requis (sans effet pour ceux qui existent déjà).
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+
+    Returns:
+        List[str]: Noms des index garantis
+    """
+    try:
+        # L'index unique du panier échouerait sur des lignes en double existantes
+        merge_duplicate_cart_lines(mongo_db.cart)
+
+        names = []
+        for collection, indexes in REQUIRED_INDEXES.items():
+            names.extend(mongo_db[collection].create_indexes(indexes))
+        logger.info(f"Index MongoDB vérifiés: {len(names)}")
+        return names
+    except Exception as e:
+        logger.error(f"Erreur lors de la création des index MongoDB: {e}")
+        raise
+
+
+def _plan_stages(plan) -> List[str]:
+    """
+    Liste les étapes d'un plan d'exécution (formats classique et SBE).
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+def check_index_coverage(mongo_db) -> List[str]:
+    """
+    Vérifie par explain() que chaque requête fréquente utilise un index.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+
+    Returns:
+        List[str]: Requêtes couvertes
+
+    Raises:
+        RuntimeError: Au moins une requête fréquente n'est pas couverte par un index
+    """
+    covered = []
+    failures = []
+    for query in HOT_QUERIES:
+        cursor = mongo_db[query['collection']].find(query['filter'])
+        if query.get('sort'):
+            cursor = cursor.sort(query['sort'])
+
+        winning_plan = cursor.explain()['queryPlanner']['winningPlan']
+        stages = _plan_stages(winning_plan)
+        description = f"{query['collection']}.find({query['filter']}).sort({query.get('sort')})"
+
+        forbidden = [stage for stage in stages if stage in FORBIDDEN_STAGES]
+        if forbidden:
+            failures.append(f"{description}: {', '.join(forbidden)}")
+        else:
+            covered.append(description)
+
+    if failures:
+        for failure in failures:
+            logger.error(f"Requête sans index: {failure}")
+        raise RuntimeError(f"{len(failures)} requête(s) fréquente(s) sans index: " + '; '.join(failures))
+
+    logger.info(f"{len(covered)} requêtes fréquentes couvertes par un index")
+    return covered
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Point d'entrée en ligne de commande : création puis vérification optionnelle des index.
+    """
+    parser = argparse.ArgumentParser(description='Création des index MongoDB')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/ecommerce-python', help='URI MongoDB')
+    parser.add_argument('--check', action='store_true', help='Vérifier la couverture des requêtes par explain()')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from pymongo import MongoClient
+
+    client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        mongo_db = client.get_default_database()
+        ensure_indexes(mongo_db)
+        if args.check:
+            check_index_coverage(mongo_db)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
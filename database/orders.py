@@ -0,0 +1,195 @@
+"""
+Commandes MongoDB : schéma compact des articles et résumé par utilisateur.
+
+Les articles d'une commande sont normalisés à l'écriture (checkout) au
+schéma compact {product_id, product_name, price, quantity} : l'historique
+les affiche tels quels, sans correction par requête. Un résumé par
+utilisateur (collection `order_summary` : nombre de commandes, montant
+cumulé, date de la dernière commande) est maintenu par `$inc` à chaque
+commande ; l'historique est servi par pages (pagination par clé) et par
+projection, quel que soit le nombre de commandes de l'utilisateur.
+
+Chaque commande porte la version de schéma de ses articles (`schema_version`,
+indexé) : la migration des commandes antérieures ne lit que celles qui ne
+sont pas encore à la version courante, et ne fait rien une fois passée.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import logging
+from typing import List, Dict, Tuple, Optional
+
+from pymongo import UpdateOne, ReturnDocument
+
+from database.pagination import find_page
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Collection des résumés de commandes (un document par utilisateur, _id = user_id)
+ORDER_SUMMARY_COLLECTION = 'order_summary'
+
+# Champs d'une commande lus par l'historique
+HISTORY_PROJECTION = {'items': 1, 'total': 1, 'status': 1, 'created_at': 1}
+
+# Taille de page de l'historique
+HISTORY_PAGE_SIZE = 10
+
+# Version du schéma compact des articles (champ schema_version des commandes)
+ORDER_SCHEMA_VERSION = 1
+
+# Commandes à migrer : non marquées (champ absent) ou marquées d'une version antérieure
+LEGACY_ORDERS_FILTER = {'$or': [
+    {'schema_version': None},
+    {'schema_version': {'$lt': ORDER_SCHEMA_VERSION}}
+]}
+
+
+def order_item(item: Dict) -> Dict:
+    """
+    Normalise un article (ligne de panier ou article existant) au schéma compact.
+
+    Args:
+        item (Dict): Article à normaliser
+
+    Returns:
+        Dict: {'product_id', 'product_name', 'price', 'quantity'}
+    """
+    return {
+        'product_id': str(item.get('product_id', '')),
+        'product_name': item.get('product_name') or 'Produit inconnu',
+        'price': item.get('price') or 0,
+        'quantity': item.get('quantity') or 1
+    }
+
+
+def rebuild_order_summary(mongo_db, user_id: str, session=None) -> Dict:
+    """
+    Recalcule le résumé des commandes d'un utilisateur depuis ses commandes.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+        session: Session MongoDB optionnelle
+
+    Returns:
+        Dict: Résumé à jour
+    """
+    totals = list(mongo_db.purchases.aggregate([
+        {'$match': {'user_id': user_id}},
+        {'$group': {
+            '_id': None,
+            'order_count': {'$sum': 1},
+            'lifetime_spend': {'$sum': '$total'},
+            'last_order_at': {'$max': '$created_at'}
+        }}
+    ], session=session))
+    values = {key: value for key, value in totals[0].items() if key != '_id'} if totals else {
+        'order_count': 0, 'lifetime_spend': 0.0, 'last_order_at': None
+    }
+
+    return mongo_db[ORDER_SUMMARY_COLLECTION].find_one_and_update(
+        {'_id': user_id},
+        {'$set': values},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+
+
+def record_order(mongo_db, purchase: Dict, session=None):
+    """
+    Répercute une commande insérée sur le résumé de son utilisateur.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        purchase (Dict): Commande insérée
+        session: Session MongoDB optionnelle (transaction en cours)
+    """
+    result = mongo_db[ORDER_SUMMARY_COLLECTION].update_one(
+        {'_id': purchase['user_id']},
+        {'$inc': {'order_count': 1, 'lifetime_spend': purchase['total']},
+         '$max': {'last_order_at': purchase['created_at']}},
+        session=session
+    )
+    if result.matched_count == 0:
+        # Premier résumé de l'utilisateur : calculé depuis ses commandes, celle-ci comprise
+        rebuild_order_summary(mongo_db, purchase['user_id'], session=session)
+
+
+def get_order_summary(mongo_db, user_id: str) -> Dict:
+    """
+    Retourne le résumé des commandes d'un utilisateur.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+
+    Returns:
+        Dict: {'order_count', 'lifetime_spend', 'last_order_at'}
+    """
+    summary = mongo_db[ORDER_SUMMARY_COLLECTION].find_one({'_id': user_id})
+    if summary is None:
+        summary = rebuild_order_summary(mongo_db, user_id)
+    return {
+        'order_count': summary['order_count'],
+        # Montant cumulé par $inc : arrondi des erreurs de virgule flottante
+        'lifetime_spend': round(summary['lifetime_spend'], 2),
+        'last_order_at': summary.get('last_order_at')
+    }
+
+
+def find_order_page(mongo_db, user_id: str, page_token: Optional[str] = None,
+                    page_size: int = HISTORY_PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Lit une page de l'historique d'un utilisateur, de la plus récente à la plus ancienne.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        user_id (str): ID de l'utilisateur
+        page_token (Optional[str]): Jeton de la page précédente (None = première page)
+        page_size (int): Nombre de commandes par page
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: Commandes et jeton de la page suivante
+    """
+    return find_page(mongo_db.purchases, {'user_id': user_id}, page_token, page_size, HISTORY_PROJECTION)
+
+
+def normalize_legacy_orders(mongo_db, batch_size: int = 500) -> int:
+    """
+    Réécrit au schéma compact les articles des commandes antérieures (migration idempotente).
+
+    Seules les commandes sans schema_version à jour sont lues (index
+    schema_version) ; chacune est marquée à la version courante, si bien
+    que les démarrages suivants n'ont plus rien à lire.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        batch_size (int): Nombre de commandes réécrites par bulk_write
+
+    Returns:
+        int: Nombre de commandes réécrites
+    """
+    try:
+        updated = 0
+        operations = []
+        for purchase in mongo_db.purchases.find(LEGACY_ORDERS_FILTER, {'items': 1}):
+            items = [order_item(item) for item in purchase.get('items') or []]
+            operations.append(UpdateOne(
+                {'_id': purchase['_id']},
+                {'$set': {'items': items, 'schema_version': ORDER_SCHEMA_VERSION}}
+            ))
+            if len(operations) >= batch_size:
+                updated += mongo_db.purchases.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += mongo_db.purchases.bulk_write(operations, ordered=False).modified_count
+
+        if updated:
+            logger.info(f"Commandes normalisées au schéma compact: {updated}")
+        return updated
+    except Exception as e:
+        logger.error(f"Erreur lors de la normalisation des commandes: {e}")
+        raise
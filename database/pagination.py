@@ -0,0 +1,136 @@
+"""
+Pagination par clé (keyset) des listes de produits.
+
+Les pages sont ordonnées par (created_at, _id) décroissants. Un jeton de
+page encode la clé du dernier produit affiché : la page suivante reprend
+strictement après cette clé, sans skip, pour un coût constant quelle que
+soit la profondeur. Les mêmes jetons servent aux pages HTML et à l'API JSON.
+Les documents sans created_at (null pour MongoDB, plus petit que toute date)
+sont servis en fin de liste, par _id décroissant.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import List, Dict, Tuple, Optional
+
+from bson import ObjectId
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Taille de page par défaut et maximale
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 100
+
+# Champs nécessaires à l'affichage d'une carte produit
+CARD_FIELDS = ('name', 'price', 'image_url', 'category', 'stock_quantity', 'is_active', 'created_at')
+CARD_PROJECTION = {field: 1 for field in CARD_FIELDS}
+
+# Tri de pagination (du plus récent au plus ancien)
+PAGE_SORT = [('created_at', -1), ('_id', -1)]
+
+
+def clamp_page_size(value, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """
+    Borne une taille de page reçue en paramètre.
+
+    Args:
+        value: Taille demandée (chaîne, entier ou None)
+        default (int): Taille si aucune valeur valide n'est fournie
+
+    Returns:
+        int: Taille entre 1 et MAX_PAGE_SIZE
+    """
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def sort_key(product: Dict) -> Tuple[datetime, ObjectId]:
+    """
+    Retourne la clé de pagination d'un produit (datetime.min sans created_at).
+    """
+    return product.get('created_at') or datetime.min, product['_id']
+
+
+def encode_page_token(product: Dict) -> str:
+    """
+    Encode la clé du dernier produit d'une page en jeton opaque (URL-safe).
+    """
+    created_at, object_id = sort_key(product)
+    payload = json.dumps([created_at.isoformat(), str(object_id)]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_page_token(token: str) -> Tuple[datetime, ObjectId]:
+    """
+    Décode un jeton de page.
+
+    Raises:
+        ValueError: Jeton invalide
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, object_id = json.loads(payload)
+        return datetime.fromisoformat(created_at), ObjectId(object_id)
+    except Exception as e:
+        raise ValueError(f"Jeton de page invalide: {token}") from e
+
+
+def find_page(collection, query: Optional[Dict] = None, page_token: Optional[str] = None,
+              page_size: int = DEFAULT_PAGE_SIZE,
+              projection: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Lit une page d'une collection MongoDB par clé (created_at, _id).
+
+    Args:
+        collection: Collection MongoDB
+        query (Optional[Dict]): Filtre de base
+        page_token (Optional[str]): Jeton de la page précédente (None = première page)
+        page_size (int): Nombre de documents par page
+        projection (Optional[Dict]): Champs lus (champs des cartes produit par défaut)
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: Documents (avec 'id') et jeton de la page suivante
+    """
+    query = dict(query or {})
+    if page_token:
+        created_at, object_id = decode_page_token(page_token)
+        if created_at == datetime.min:
+            # Dernier document sans date : suite des documents sans date
+            keyset = {'created_at': None, '_id': {'$lt': object_id}}
+        else:
+            keyset = {'$or': [
+                {'created_at': {'$lt': created_at}},
+                {'created_at': created_at, '_id': {'$lt': object_id}},
+                {'created_at': None}
+            ]}
+        # Combiné au filtre de l'appelant sans en écraser les opérateurs ($or compris)
+        query = {'$and': [query, keyset]} if query else keyset
+
+    # Un document de plus pour savoir s'il existe une page suivante
+    cursor = collection.find(query, projection or CARD_PROJECTION).sort(PAGE_SORT).limit(page_size + 1)
+    documents = list(cursor)
+    for document in documents:
+        document['id'] = str(document['_id'])
+
+    next_token = encode_page_token(documents[page_size - 1]) if len(documents) > page_size else None
+    return documents[:page_size], next_token
+
+
+def card_fields(product: Dict) -> Dict:
+    """
+    Extrait les champs d'une carte produit, sérialisables en JSON.
+    """
+    card = {'id': product['id']}
+    for field in CARD_FIELDS:
+        value = product.get(field)
+        card[field] = value.isoformat() if isinstance(value, datetime) else value
+    return card
@@ -0,0 +1,175 @@
+"""
+Compteurs agrégés du tableau de bord d'administration.
+
+Un document unique de la collection `stats` porte le nombre de produits,
+d'utilisateurs et de commandes ainsi que le chiffre d'affaires. Il est
+maintenu par `$inc` au moment des écritures (inscription, commande,
+administration du catalogue) : le tableau de bord le lit en une requête
+par _id, quelle que soit la taille des collections. Les listes « récents »
+sont lues par les index sur created_at (database/mongo_indexes.py).
+
+Le document est créé depuis les collections par la première écriture ou
+lecture qui ne le trouve pas (et au démarrage de l'application), sans jamais
+écraser un document existant : les `$inc` concurrents des autres processus
+sont conservés. Après des écritures faites hors de l'application (scripts
+d'import), le recalcul complet est une commande d'administration explicite.
+
+Usage:
+    python -m database.rollups --mongo-uri mongodb://localhost:27017/ecommerce-python
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import sys
+import logging
+import argparse
+from typing import List, Dict, Optional
+
+from pymongo import ReturnDocument
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Collection et document des compteurs
+STATS_COLLECTION = 'stats'
+STATS_ID = 'global'
+
+# Compteurs maintenus
+STATS_FIELDS = ('products', 'users', 'orders', 'revenue')
+
+
+def increment_stats(mongo_db, session=None, **deltas):
+    """
+    Incrémente des compteurs (ex: increment_stats(db, orders=1, revenue=42.0)).
+
+    À appeler après l'écriture concernée : si le document n'existe pas encore,
+    il est créé depuis les collections, écriture comprise.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        session: Session MongoDB optionnelle (transaction en cours)
+        **deltas: Variation de chaque compteur de STATS_FIELDS
+    """
+    unknown = set(deltas) - set(STATS_FIELDS)
+    if unknown:
+        raise ValueError(f"Compteurs inconnus: {', '.join(sorted(unknown))}")
+
+    result = mongo_db[STATS_COLLECTION].update_one({'_id': STATS_ID}, {'$inc': deltas}, session=session)
+    if result.matched_count == 0:
+        ensure_stats(mongo_db, session=session)
+
+
+def _compute_stats(mongo_db, session=None) -> Dict:
+    """
+    Calcule les compteurs depuis les collections.
+    """
+    revenue = list(mongo_db.purchases.aggregate([
+        {'$group': {'_id': None, 'revenue': {'$sum': '$total'}}}
+    ], session=session))
+    return {
+        'products': mongo_db.product.count_documents({}, session=session),
+        'users': mongo_db.users.count_documents({}, session=session),
+        'orders': mongo_db.purchases.count_documents({}, session=session),
+        'revenue': revenue[0]['revenue'] if revenue else 0.0
+    }
+
+
+def ensure_stats(mongo_db, session=None) -> Dict:
+    """
+    Crée le document des compteurs s'il n'existe pas (sans écraser un document existant).
+
+    Appelée au démarrage de l'application : un document présent est laissé
+    tel quel, si bien que les `$inc` des autres processus ne sont pas perdus.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        session: Session MongoDB optionnelle
+
+    Returns:
+        Dict: Compteurs existants ou créés
+    """
+    try:
+        stats = mongo_db[STATS_COLLECTION].find_one({'_id': STATS_ID}, session=session)
+        if stats is not None:
+            return stats
+
+        values = _compute_stats(mongo_db, session=session)
+        logger.info(f"Compteurs du tableau de bord créés: {values}")
+        return mongo_db[STATS_COLLECTION].find_one_and_update(
+            {'_id': STATS_ID}, {'$setOnInsert': values}, upsert=True,
+            return_document=ReturnDocument.AFTER, session=session
+        )
+    except Exception as e:
+        logger.error(f"Erreur lors de la création des compteurs: {e}")
+        raise
+
+
+def rebuild_stats(mongo_db, session=None) -> Dict:
+    """
+    Recalcule les compteurs depuis les collections et remplace les valeurs existantes.
+
+    Commande d'administration (voir main) : les `$inc` concurrents faits pendant
+    le calcul sont écrasés, à lancer hors des heures de trafic.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        session: Session MongoDB optionnelle
+
+    Returns:
+        Dict: Compteurs recalculés
+    """
+    try:
+        values = _compute_stats(mongo_db, session=session)
+        logger.info(f"Compteurs du tableau de bord recalculés: {values}")
+        return mongo_db[STATS_COLLECTION].find_one_and_update(
+            {'_id': STATS_ID}, {'$set': values}, upsert=True,
+            return_document=ReturnDocument.AFTER, session=session
+        )
+    except Exception as e:
+        logger.error(f"Erreur lors du recalcul des compteurs: {e}")
+        raise
+
+
+def get_stats(mongo_db) -> Dict:
+    """
+    Lit les compteurs du tableau de bord (créés s'ils n'existent pas encore).
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+
+    Returns:
+        Dict: products, users, orders et revenue
+    """
+    stats = mongo_db[STATS_COLLECTION].find_one({'_id': STATS_ID})
+    if stats is None:
+        stats = ensure_stats(mongo_db)
+    return {field: stats[field] for field in STATS_FIELDS}
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Point d'entrée en ligne de commande : recalcul complet des compteurs.
+    """
+    parser = argparse.ArgumentParser(description='Recalcul des compteurs du tableau de bord')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/ecommerce-python', help='URI MongoDB')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from pymongo import MongoClient
+
+    client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        rebuild_stats(client.get_default_database())
+    except Exception:
+        sys.exit(1)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Statistiques du catalogue calculées par agrégation et mises en cache.
+
+Une seule agrégation `$facet` sur la collection des produits fournit en un
+aller-retour les compteurs, la répartition par catégorie et les listes de
+produits affichées par la page des statistiques. Les meilleures ventes,
+repli des recommandations quand le serveur de recommandations ne répond
+pas, sont agrégées depuis les commandes. Le résultat est mis en
+cache avec une durée de vie courte ; à expiration, un seul thread le
+recalcule (single-flight) pendant que les autres visiteurs reçoivent la
+valeur précédente, ou attendent ce calcul unique au tout premier accès.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Champs des produits listés par la page des statistiques
+STATS_PRODUCT_PROJECTION = {'name': 1, 'category': 1, 'price': 1, 'stock_quantity': 1, 'description': 1}
+
+
+class SingleFlightCache:
+    """
+    Valeur calculée à la demande, mise en cache pour une durée limitée.
+
+    Un seul calcul est en cours à un instant donné : les appels concurrents
+    partagent son résultat au lieu de relancer la requête.
+    """
+
+    def __init__(self, loader: Callable[[], Any], ttl: float = 30.0):
+        """
+        Initialise le cache (la valeur est calculée au premier accès).
+
+        Args:
+            loader (Callable[[], Any]): Fonction de calcul de la valeur
+            ttl (float): Durée de vie de la valeur en secondes
+        """
+        self._loader = loader
+        self.ttl = ttl
+        self._value: Any = None
+        self._expires_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """
+        Force le recalcul au prochain accès.
+        """
+        self._expires_at = None
+
+    def get(self) -> Any:
+        """
+        Retourne la valeur en cache, recalculée si elle a expiré.
+
+        Returns:
+            Any: Valeur calculée par le loader
+        """
+        expires_at = self._expires_at
+        if expires_at is not None and time.monotonic() < expires_at:
+            return self._value
+
+        if self._value is None:
+            # Premier accès : attente du calcul unique
+            self._lock.acquire()
+        elif not self._lock.acquire(blocking=False):
+            # Recalcul en cours dans un autre thread : valeur précédente
+            return self._value
+
+        try:
+            # Recalculée entre-temps par le thread qui détenait le verrou
+            if self._expires_at is not None and time.monotonic() < self._expires_at:
+                return self._value
+            self._value = self._loader()
+            self._expires_at = time.monotonic() + self.ttl
+            return self._value
+        finally:
+            self._lock.release()
+
+
+def compute_catalog_stats(mongo_db) -> Dict:
+    """
+    Calcule les statistiques du catalogue en une agrégation `$facet`.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+
+    Returns:
+        Dict: total_products, active_products, total_users, category_stats,
+        popular_products (5 plus gros stocks) et recent_products (3 plus récents)
+    """
+    try:
+        pipeline = [
+            {'$facet': {
+                'total': [{'$count': 'count'}],
+                'active': [{'$match': {'is_active': True}}, {'$count': 'count'}],
+                'categories': [
+                    {'$match': {'category': {'$ne': None}}},
+                    {'$group': {'_id': '$category', 'count': {'$sum': 1}}},
+                    {'$sort': {'_id': 1}}
+                ],
+                'popular': [
+                    {'$sort': {'stock_quantity': -1}},
+                    {'$limit': 5},
+                    {'$project': STATS_PRODUCT_PROJECTION}
+                ],
+                'recent': [
+                    {'$sort': {'created_at': -1}},
+                    {'$limit': 3},
+                    {'$project': STATS_PRODUCT_PROJECTION}
+                ]
+            }}
+        ]
+        facets = next(mongo_db.product.aggregate(pipeline))
+
+        return {
+            'total_products': facets['total'][0]['count'] if facets['total'] else 0,
+            'active_products': facets['active'][0]['count'] if facets['active'] else 0,
+            # Compteur tiré des métadonnées de la collection, sans parcours
+            'total_users': mongo_db.users.estimated_document_count(),
+            'category_stats': [
+                {'name': category['_id'], 'count': category['count']} for category in facets['categories']
+            ],
+            'popular_products': facets['popular'],
+            'recent_products': facets['recent']
+        }
+    except Exception as e:
+        logger.error(f"Erreur lors du calcul des statistiques du catalogue: {e}")
+        raise
+
+
+def compute_best_sellers(mongo_db, limit: int = 20) -> List[str]:
+    """
+    Calcule les produits les plus vendus (quantités cumulées des commandes).
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+        limit (int): Nombre de produits retournés
+
+    Returns:
+        List[str]: IDs des produits, du plus vendu au moins vendu
+    """
+    try:
+        pipeline = [
+            {'$unwind': '$items'},
+            {'$group': {'_id': '$items.product_id', 'sold': {'$sum': {'$ifNull': ['$items.quantity', 1]}}}},
+            {'$sort': {'sold': -1, '_id': 1}},
+            {'$limit': limit}
+        ]
+        return [str(product['_id']) for product in mongo_db.purchases.aggregate(pipeline)]
+    except Exception as e:
+        logger.error(f"Erreur lors du calcul des meilleures ventes: {e}")
+        raise
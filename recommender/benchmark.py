@@ -0,0 +1,559 @@
+"""
+Suite de benchmark du moteur de recommandation.
+
+Ce module génère des interactions synthétiques (distribution en loi de
+puissance sur les utilisateurs et les produits) puis mesure, pour le
+RecommendationEngine :
+- Le temps d'entraînement de chaque étape
+- Le pic de mémoire résidente (RSS) de chaque étape et du processus
+- La taille du modèle sauvegardé sur disque
+- Les latences p50/p99 de chaque méthode de recommandation
+- La mise à jour incrémentale de la SVD (blocs bornés, seuil de réentraînement)
+
+Les résultats sont écrits en JSON pour suivre les régressions d'une
+version à l'autre.
+
+Usage:
+    python -m recommender.benchmark --users 100000 --products 10000 --density 0.0005
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Ajout du répertoire parent au path pour les imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.recommender import RecommendationEngine
+from recommender.svd import IncrementalSVD
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Méthodes évaluées par défaut
+DEFAULT_METHODS = ['user', 'item', 'graph', 'ease', 'svd', 'segment', 'sequential', 'popular', 'hybrid']
+
+# Méthodes scorées en une seule passe par lot (micro-batching du serveur)
+BATCHED_METHODS = ['item', 'graph', 'ease', 'svd', 'hybrid']
+
+# Limites de la génération synthétique (10^6 utilisateurs x 10^5 produits)
+MAX_USERS = 1_000_000
+MAX_PRODUCTS = 100_000
+
+
+def generate_synthetic_interactions(n_users: int, n_products: int, density: float,
+                                    alpha: float = 1.1, seed: int = 42) -> pd.DataFrame:
+    """
+    Génère des interactions utilisateur-produit synthétiques.
+
+    L'activité des utilisateurs et la popularité des produits suivent une
+    loi de puissance (Zipf) : quelques utilisateurs très actifs et quelques
+    best-sellers concentrent la majorité des achats, comme en production.
+
+    Args:
+        n_users (int): Nombre d'utilisateurs (au plus 10^6)
+        n_products (int): Nombre de produits (au plus 10^5)
+        density (float): Proportion de cellules de la matrice remplies (0 < density <= 1)
+        alpha (float): Exposant de la loi de puissance
+        seed (int): Graine du générateur aléatoire
+
+    Returns:
+        pd.DataFrame: Colonnes 'user_id', 'product_id', 'quantity', 'rating', 'timestamp'
+    """
+    if not 0 < n_users <= MAX_USERS:
+        raise ValueError(f"Nombre d'utilisateurs hors limites: {n_users} (max {MAX_USERS})")
+    if not 0 < n_products <= MAX_PRODUCTS:
+        raise ValueError(f"Nombre de produits hors limites: {n_products} (max {MAX_PRODUCTS})")
+    if not 0 < density <= 1:
+        raise ValueError(f"Densité invalide: {density}")
+
+    rng = np.random.default_rng(seed)
+    n_interactions = max(1, int(round(n_users * n_products * density)))
+
+    # Poids en loi de puissance, permutés pour que les ids populaires soient dispersés
+    user_weights = np.arange(1, n_users + 1, dtype=np.float64) ** -alpha
+    user_weights /= user_weights.sum()
+    product_weights = np.arange(1, n_products + 1, dtype=np.float64) ** -alpha
+    product_weights /= product_weights.sum()
+    user_ranks = rng.permutation(n_users)
+    product_ranks = rng.permutation(n_products)
+
+    users = user_ranks[rng.choice(n_users, size=n_interactions, p=user_weights)]
+    products = product_ranks[rng.choice(n_products, size=n_interactions, p=product_weights)]
+    quantities = rng.integers(1, 4, size=n_interactions)
+
+    # Dates d'achat réparties sur les 180 derniers jours
+    now = np.datetime64(datetime.utcnow().replace(microsecond=0), 's')
+    offsets = rng.integers(0, 180 * 24 * 3600, size=n_interactions).astype('timedelta64[s]')
+
+    df = pd.DataFrame({
+        'user_id': users.astype(np.int64) + 1,
+        'product_id': products.astype(np.int64) + 1,
+        'quantity': quantities.astype(np.int64),
+        'timestamp': now - offsets
+    })
+    df['rating'] = df['quantity'].clip(upper=5)
+
+    logger.info(f"Données synthétiques générées: {len(df)} interactions "
+                f"({n_users} utilisateurs x {n_products} produits, densité {density})")
+    return df
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """
+    Retourne le pic de mémoire résidente du processus en Mo.
+
+    Returns:
+        Optional[float]: Pic RSS en Mo, None si non mesurable sur la plateforme
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sur macOS et en kilo-octets sur Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def get_current_rss_mb() -> Optional[float]:
+    """
+    Retourne la mémoire résidente actuelle du processus en Mo (Linux, /proc).
+
+    Returns:
+        Optional[float]: RSS en Mo, None si non mesurable sur la plateforme
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """
+    Échantillonne la RSS courante pendant une étape pour en mesurer le pic propre.
+
+    ru_maxrss est le pic de toute la vie du processus : après l'étape la plus
+    gourmande, toutes les suivantes rapporteraient la même valeur.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = get_current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _sample(self):
+        current = get_current_rss_mb()
+        if current is not None and (self.peak_mb is None or current > self.peak_mb):
+            self.peak_mb = current
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.start_mb is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        self._sample()
+
+
+def _time_stage(name: str, func) -> Dict:
+    """
+    Exécute une étape d'entraînement en mesurant sa durée et la mémoire.
+
+    Args:
+        name (str): Nom de l'étape
+        func: Fonction sans argument à exécuter
+
+    Returns:
+        Dict: Résultat de l'étape (statut, durée, RSS au début, pic et hausse pendant l'étape)
+    """
+    gc.collect()
+    with RssSampler() as sampler:
+        start = time.perf_counter()
+        try:
+            func()
+            status, error = 'ok', None
+        except Exception as e:
+            logger.error(f"Étape {name} en échec: {e}")
+            status, error = 'error', str(e)
+        duration = time.perf_counter() - start
+
+    measured = sampler.start_mb is not None
+    result = {
+        'status': status,
+        'seconds': round(duration, 6),
+        'rss_start_mb': round(sampler.start_mb, 3) if measured else None,
+        'peak_rss_mb': round(sampler.peak_mb, 3) if measured else None,
+        'peak_rss_delta_mb': round(sampler.peak_mb - sampler.start_mb, 3) if measured else None
+    }
+    if error:
+        result['error'] = error
+    logger.info(f"Étape {name}: {status} en {duration:.3f}s")
+    return result
+
+
+def measure_latencies(engine: RecommendationEngine, user_ids: np.ndarray, methods: List[str],
+                      limit: int = 10) -> Dict[str, Dict]:
+    """
+    Mesure la latence de chaque méthode de recommandation.
+
+    Args:
+        engine (RecommendationEngine): Moteur entraîné
+        user_ids (np.ndarray): Utilisateurs interrogés
+        methods (List[str]): Méthodes à évaluer
+        limit (int): Nombre de recommandations demandées
+
+    Returns:
+        Dict[str, Dict]: Statistiques de latence (ms) par méthode
+    """
+    # Instantané publié avant la mesure : sinon la première requête chronométrée le publie
+    if engine.model is None:
+        engine.publish()
+
+    latencies = {}
+    for method in methods:
+        samples = np.empty(len(user_ids), dtype=np.float64)
+        empty = 0
+        for i, user_id in enumerate(user_ids):
+            start = time.perf_counter()
+            recommendations = engine.get_user_recommendations(user_id, limit=limit, method=method)
+            samples[i] = (time.perf_counter() - start) * 1000
+            if not recommendations:
+                empty += 1
+
+        latencies[method] = {
+            'queries': int(len(samples)),
+            'empty_results': empty,
+            'p50_ms': round(float(np.percentile(samples, 50)), 4),
+            'p99_ms': round(float(np.percentile(samples, 99)), 4),
+            'mean_ms': round(float(samples.mean()), 4),
+            'max_ms': round(float(samples.max()), 4)
+        }
+        logger.info(f"Méthode {method}: p50={latencies[method]['p50_ms']}ms "
+                    f"p99={latencies[method]['p99_ms']}ms")
+    return latencies
+
+
+def _scoring_passes(engine: RecommendationEngine, method: str) -> int:
+    """
+    Nombre d'étapes de scoring enregistrées pour une méthode.
+    """
+    labels = (('method', method), ('stage', 'scoring'))
+    counts, _ = engine.metrics.stage_latency.collect().get(labels, ([], 0.0))
+    return int(sum(counts))
+
+
+def measure_batch_latencies(engine: RecommendationEngine, user_ids: np.ndarray, methods: List[str],
+                            limit: int = 10, batch_size: int = 32) -> Dict[str, Dict]:
+    """
+    Mesure la latence des lots coalescés et vérifie qu'un lot n'est scoré qu'une fois.
+
+    Args:
+        engine (RecommendationEngine): Moteur entraîné
+        user_ids (np.ndarray): Utilisateurs interrogés
+        methods (List[str]): Méthodes à évaluer (seules celles de BATCHED_METHODS sont mesurées)
+        limit (int): Nombre de recommandations demandées
+        batch_size (int): Nombre d'utilisateurs par lot
+
+    Returns:
+        Dict[str, Dict]: Latence (ms) par lot et nombre maximal de passes de scoring par lot
+    """
+    latencies = {}
+    batches = [list(user_ids[i:i + batch_size]) for i in range(0, len(user_ids), batch_size)]
+    for method in methods:
+        if method not in BATCHED_METHODS or not batches:
+            continue
+        samples = np.empty(len(batches), dtype=np.float64)
+        max_passes = 0
+        for i, batch in enumerate(batches):
+            before = _scoring_passes(engine, method)
+            start = time.perf_counter()
+            engine.get_batch_recommendations(batch, limit=limit, method=method)
+            samples[i] = (time.perf_counter() - start) * 1000
+            max_passes = max(max_passes, _scoring_passes(engine, method) - before)
+
+        latencies[method] = {
+            'batches': len(batches),
+            'batch_size': batch_size,
+            'scoring_passes_per_batch': max_passes,
+            'status': 'ok' if max_passes <= 1 else 'error',
+            'p50_ms': round(float(np.percentile(samples, 50)), 4),
+            'p99_ms': round(float(np.percentile(samples, 99)), 4)
+        }
+        if max_passes > 1:
+            logger.error(f"Méthode {method}: {max_passes} passes de scoring pour un seul lot")
+        logger.info(f"Lots {method}: p50={latencies[method]['p50_ms']}ms "
+                    f"p99={latencies[method]['p99_ms']}ms")
+    return latencies
+
+
+class _BlockRecordingSVD(IncrementalSVD):
+    """
+    IncrementalSVD qui relève la taille des blocs intégrés par mise à jour de Brand.
+    """
+
+    def _append_row_block(self, C, n_components: Optional[int] = None):
+        self.blocks.append(('rows', C.shape[0]))
+        super()._append_row_block(C, n_components)
+
+    def _append_column_block(self, D, n_components: Optional[int] = None):
+        self.blocks.append(('columns', D.shape[1]))
+        super()._append_column_block(D, n_components)
+
+
+def check_svd_update(df: pd.DataFrame, n_components: int = 20, chunk_size: int = 32,
+                     new_fraction: float = 0.1, seed: int = 42) -> Dict:
+    """
+    Vérifie la mise à jour incrémentale de la SVD après l'arrivée de nouveaux utilisateurs.
+
+    Sous le seuil svd_max_append_fraction, les nouveaux utilisateurs doivent être
+    intégrés par blocs d'au plus chunk_size lignes, sans réentraînement ; au-dessus,
+    update_svd_model doit réentraîner à chaud.
+
+    Args:
+        df (pd.DataFrame): Interactions synthétiques
+        n_components (int): Rang de la SVD
+        chunk_size (int): Taille des blocs de la mise à jour de Brand
+        new_fraction (float): Part des utilisateurs retenus comme nouveaux utilisateurs
+        seed (int): Graine aléatoire
+
+    Returns:
+        Dict: Blocs intégrés, réentraînements et écart aux valeurs singulières d'une SVD complète
+    """
+    rng = np.random.default_rng(seed)
+    users = df['user_id'].unique()
+    new_users = rng.choice(users, size=max(1, int(len(users) * new_fraction)), replace=False)
+    base = df[~df['user_id'].isin(new_users)]
+
+    results = {}
+    cache_dir = tempfile.mkdtemp(prefix='reco_svd_')
+    try:
+        for case, max_fraction in (('below_threshold', 2 * new_fraction), ('above_threshold', new_fraction / 2)):
+            engine = RecommendationEngine(model_cache_dir=cache_dir, n_components=n_components,
+                                          svd_max_append_fraction=max_fraction)
+            engine.load_interactions(base)
+            engine.create_user_item_matrix()
+            engine.train_svd_model()
+
+            recording = _BlockRecordingSVD.__new__(_BlockRecordingSVD)
+            recording.__dict__.update(engine.svd_model.__dict__, chunk_size=chunk_size, blocks=[])
+            engine.svd_model = recording
+
+            retrains = []
+            train_svd_model = engine.train_svd_model
+
+            def counting_train_svd_model(**kwargs):
+                retrains.append(kwargs)
+                train_svd_model(**kwargs)
+
+            engine.train_svd_model = counting_train_svd_model
+
+            engine.load_interactions(df)
+            engine.create_user_item_matrix()
+            start = time.perf_counter()
+            engine.update_svd_model()
+            duration = time.perf_counter() - start
+
+            blocks = getattr(engine.svd_model, 'blocks', [])
+            expected = case == 'below_threshold'
+            ok = (not retrains) == expected and all(size <= chunk_size for _, size in blocks) and \
+                (bool(blocks) == expected)
+            results[case] = {
+                'status': 'ok' if ok else 'error',
+                'new_users': int(len(new_users)),
+                'max_append_fraction': max_fraction,
+                'retrained': bool(retrains),
+                'blocks': len(blocks),
+                'max_block': max((size for _, size in blocks), default=0),
+                'seconds': round(duration, 6)
+            }
+
+            if expected:
+                reference = IncrementalSVD(n_components=n_components).fit(engine.interaction_matrix)
+                gap = np.abs(engine.svd_model.singular_values_[:5] - reference.singular_values_[:5])
+                results[case]['top5_singular_value_gap'] = round(
+                    float((gap / reference.singular_values_[:5]).max()), 6
+                )
+            if not ok:
+                logger.error(f"Mise à jour SVD incorrecte ({case}): {results[case]}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def run_benchmark(n_users: int = 2000, n_products: int = 500, density: float = 0.01,
+                  alpha: float = 1.1, methods: Optional[List[str]] = None,
+                  skip_stages: Optional[List[str]] = None, n_queries: int = 200,
+                  limit: int = 10, seed: int = 42, label: str = 'dev') -> Dict:
+    """
+    Exécute le benchmark complet sur un jeu de données synthétique.
+
+    Args:
+        n_users (int): Nombre d'utilisateurs synthétiques
+        n_products (int): Nombre de produits synthétiques
+        density (float): Densité de la matrice d'interactions
+        alpha (float): Exposant de la loi de puissance
+        methods (Optional[List[str]]): Méthodes dont la latence est mesurée
+        skip_stages (Optional[List[str]]): Étapes d'entraînement à ignorer
+        n_queries (int): Nombre de requêtes par méthode
+        limit (int): Nombre de recommandations par requête
+        seed (int): Graine aléatoire
+        label (str): Libellé de version enregistré dans le résultat
+
+    Returns:
+        Dict: Résultats sérialisables en JSON
+    """
+    methods = methods or DEFAULT_METHODS
+    skip_stages = set(skip_stages or [])
+
+    generation_start = time.perf_counter()
+    df = generate_synthetic_interactions(n_users, n_products, density, alpha=alpha, seed=seed)
+    generation_seconds = time.perf_counter() - generation_start
+
+    cache_dir = tempfile.mkdtemp(prefix='reco_bench_')
+    try:
+        engine = RecommendationEngine(model_cache_dir=cache_dir)
+
+        stages = [
+            ('load', lambda: engine.load_interactions(df)),
+            ('user_item_matrix', engine.create_user_item_matrix),
+            ('user_similarity', engine.compute_user_similarity),
+            ('item_similarity', engine.compute_item_similarity),
+            ('graph', engine.compute_graph_neighbors),
+            ('ease', engine.compute_ease_model),
+            ('svd', engine.train_svd_model),
+            ('segments', engine.compute_user_segments),
+            ('sequential', engine.compute_transition_matrix),
+            ('popularity', engine.compute_product_popularity),
+            ('publish', engine.publish),
+            ('save', engine.save_model)
+        ]
+
+        stage_results = {}
+        for name, func in stages:
+            if name in skip_stages:
+                stage_results[name] = {'status': 'skipped'}
+                continue
+            stage_results[name] = _time_stage(name, func)
+
+        cache_file = os.path.join(cache_dir, 'recommendation_model.pkl')
+        model_size = os.path.getsize(cache_file) if os.path.exists(cache_file) else None
+
+        rng = np.random.default_rng(seed)
+        known_users = df['user_id'].unique()
+        query_users = rng.choice(known_users, size=min(n_queries, len(known_users)), replace=False)
+        latencies = measure_latencies(engine, query_users, methods, limit=limit)
+        batch_latencies = measure_batch_latencies(engine, query_users, methods, limit=limit)
+        svd_update = check_svd_update(df, seed=seed) if 'svd_update' not in skip_stages else {'status': 'skipped'}
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    n_unique_pairs = int(df[['user_id', 'product_id']].drop_duplicates().shape[0])
+
+    return {
+        'label': label,
+        'timestamp': datetime.utcnow().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__
+        },
+        'dataset': {
+            'users': n_users,
+            'products': n_products,
+            'density': density,
+            'alpha': alpha,
+            'seed': seed,
+            'interactions': int(len(df)),
+            'unique_pairs': n_unique_pairs,
+            'active_users': int(df['user_id'].nunique()),
+            'active_products': int(df['product_id'].nunique()),
+            'generation_seconds': round(generation_seconds, 6)
+        },
+        'stages': stage_results,
+        'training_seconds': round(sum(s.get('seconds', 0) for s in stage_results.values()), 6),
+        'peak_rss_mb': get_peak_rss_mb(),
+        'model_size_bytes': model_size,
+        'latency': latencies,
+        'batch_latency': batch_latencies,
+        'svd_update': svd_update
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Point d'entrée en ligne de commande du benchmark.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark du moteur de recommandation')
+    parser.add_argument('--users', type=int, default=2000, help="Nombre d'utilisateurs")
+    parser.add_argument('--products', type=int, default=500, help='Nombre de produits')
+    parser.add_argument('--density', type=float, default=0.01, help='Densité des interactions')
+    parser.add_argument('--alpha', type=float, default=1.1, help='Exposant de la loi de puissance')
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help='Méthodes à mesurer')
+    parser.add_argument('--skip-stages', nargs='*', default=[], help="Étapes d'entraînement à ignorer")
+    parser.add_argument('--queries', type=int, default=200, help='Requêtes par méthode')
+    parser.add_argument('--limit', type=int, default=10, help='Recommandations par requête')
+    parser.add_argument('--seed', type=int, default=42, help='Graine aléatoire')
+    parser.add_argument('--label', default='dev', help='Libellé de version du résultat')
+    parser.add_argument('--output', default='bench_output.json', help='Fichier JSON de sortie')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    results = run_benchmark(
+        n_users=args.users,
+        n_products=args.products,
+        density=args.density,
+        alpha=args.alpha,
+        methods=args.methods,
+        skip_stages=args.skip_stages,
+        n_queries=args.queries,
+        limit=args.limit,
+        seed=args.seed,
+        label=args.label
+    )
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    logger.info(f"Résultats du benchmark écrits dans {args.output}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
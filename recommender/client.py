@@ -0,0 +1,153 @@
+"""
+Client du serveur local de recommandations.
+
+Utilisé par les workers Flask : aucune dépendance au moteur (pandas,
+scikit-learn) n'est importée ici. En cas d'indisponibilité du serveur, le
+client renvoie une liste vide et suspend ses appels quelques secondes
+pour ne pas ralentir les pages.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import json
+import time
+import socket
+import logging
+import http.client
+from urllib.parse import urlencode
+from typing import List, Dict, Optional
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    Connexion HTTP sur socket Unix.
+    """
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RecommendationClient:
+    """
+    Client HTTP du serveur de recommandations (localhost ou socket Unix).
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5001, socket_path: Optional[str] = None,
+                 timeout: float = 0.2, retry_after: float = 5.0):
+        """
+        Initialise le client.
+
+        Args:
+            host (str): Adresse du serveur
+            port (int): Port du serveur
+            socket_path (Optional[str]): Chemin de socket Unix (prioritaire sur host/port)
+            timeout (float): Délai maximal d'un appel en secondes
+            retry_after (float): Durée de suspension des appels après un échec
+        """
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._unavailable_until = 0.0
+
+    def _request(self, method: str, path: str, body: Optional[Dict] = None) -> Optional[Dict]:
+        if time.monotonic() < self._unavailable_until:
+            return None
+
+        if self.socket_path:
+            connection = _UnixHTTPConnection(self.socket_path, self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+        try:
+            payload = json.dumps(body).encode('utf-8') if body is not None else None
+            headers = {'Content-Type': 'application/json'} if payload is not None else {}
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            data = json.loads(response.read() or b'{}')
+            if response.status != 200:
+                logger.warning(f"Serveur de recommandations: {response.status} {data.get('error')}")
+                return None
+            return data
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            logger.error(f"Erreur de connexion au serveur de recommandations: {e}")
+            self._unavailable_until = time.monotonic() + self.retry_after
+            return None
+        finally:
+            connection.close()
+
+    def get_recommendations(self, user_id, limit: int = 5, method: str = 'hybrid',
+                            page: Optional[str] = None) -> List:
+        """
+        Récupère les recommandations d'un utilisateur.
+
+        Args:
+            user_id: ID de l'utilisateur
+            limit (int): Nombre de recommandations
+            method (str): Méthode de recommandation
+            page (Optional[str]): Page affichant les recommandations (règles métier)
+
+        Returns:
+            List: IDs des produits recommandés, vide si le serveur est indisponible
+        """
+        params = {'user_id': user_id, 'limit': limit, 'method': method}
+        if page:
+            params['page'] = page
+        query = urlencode(params)
+        data = self._request('GET', f'/recommendations?{query}')
+        return data.get('recommendations', []) if data else []
+
+    def get_bought_together(self, product_id, limit: int = 4) -> List:
+        """
+        Récupère les produits fréquemment achetés avec un produit.
+
+        Args:
+            product_id: ID du produit de référence
+            limit (int): Nombre de produits
+
+        Returns:
+            List: IDs des produits, vide si le serveur est indisponible
+        """
+        query = urlencode({'product_id': product_id, 'limit': limit})
+        data = self._request('GET', f'/bought-together?{query}')
+        return data.get('products', []) if data else []
+
+    def record_interaction(self, user_id, items: List[Dict]) -> bool:
+        """
+        Transmet un panier validé : mise à jour immédiate du profil de l'utilisateur
+        et de l'index des achats groupés.
+
+        Args:
+            user_id: ID de l'utilisateur
+            items (List[Dict]): Articles achetés ({'product_id', 'quantity'})
+
+        Returns:
+            bool: True si le serveur a pris en compte les achats
+        """
+        data = self._request('POST', '/interactions', {'user_id': user_id, 'items': items})
+        return data is not None
+
+    def update_availability(self, products: List[Dict]) -> bool:
+        """
+        Transmet la disponibilité de produits (actifs et en stock) après une
+        modification du catalogue ou un checkout.
+
+        Args:
+            products (List[Dict]): Produits ({'product_id', 'available'})
+
+        Returns:
+            bool: True si le serveur a pris en compte les changements
+        """
+        data = self._request('POST', '/availability', {'products': products})
+        return data is not None
@@ -0,0 +1,316 @@
+"""
+Index des produits fréquemment achetés ensemble.
+
+Chaque commande MongoDB (`purchases.items`) est un panier complet. Les
+paires de produits d'un même panier sont comptées dans une matrice de
+co-occurrence creuse, normalisée par le lift (ou la PMI) pour ne pas
+favoriser les best-sellers. Les K meilleurs voisins de chaque produit
+sont précalculés : une recherche « achetés ensemble » coûte O(K).
+
+Chaque checkout met l'index à jour de façon incrémentale, en O(panier²)
+pour les comptages ; seules les lignes des produits du panier sont
+reclassées, un `fit` périodique recalcule l'ensemble.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import logging
+import threading
+from typing import List, Dict, Iterable
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender.idmap import IdMap
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Mesures de normalisation disponibles
+MEASURES = ('lift', 'pmi')
+
+
+def association_scores(pair_counts: np.ndarray, counts_a: np.ndarray, counts_b: np.ndarray,
+                       n_baskets: int, measure: str = 'lift') -> np.ndarray:
+    """
+    Calcule la force d'association de paires de produits.
+
+    Args:
+        pair_counts (np.ndarray): Nombre de paniers contenant les deux produits
+        counts_a (np.ndarray): Nombre de paniers contenant le premier produit
+        counts_b (np.ndarray): Nombre de paniers contenant le second produit
+        n_baskets (int): Nombre total de paniers
+        measure (str): 'lift' (P(a,b) / P(a)P(b)) ou 'pmi' (log du lift)
+
+    Returns:
+        np.ndarray: Scores d'association
+    """
+    lift = pair_counts * float(n_baskets) / (counts_a.astype(np.float64) * counts_b)
+    if measure == 'pmi':
+        return np.log(lift)
+    return lift
+
+
+class _NeighborTable:
+    """
+    Table des voisins publiée pour les lectures (remplacée en bloc par `fit`).
+    """
+
+    __slots__ = ('product_ids', 'extra_ids', 'extra_positions', 'top_indices', 'top_scores', 'refreshed')
+
+    def __init__(self, product_ids: IdMap, top_indices: np.ndarray, top_scores: np.ndarray):
+        self.product_ids = product_ids
+        # Produits apparus depuis le dernier fit (positions après celles de product_ids)
+        self.extra_ids = []
+        self.extra_positions = {}
+        self.top_indices = top_indices
+        self.top_scores = top_scores
+        # Lignes reclassées depuis le dernier fit : position -> (voisins, scores)
+        self.refreshed = {}
+
+    def position(self, product_id) -> int:
+        position = self.product_ids.get_loc(product_id)
+        if position < 0:
+            position = self.extra_positions.get(product_id, -1)
+        return position
+
+    def ids(self, positions: np.ndarray) -> List:
+        n_base = len(self.product_ids)
+        return [
+            self.product_ids.ids[position].item() if position < n_base else self.extra_ids[position - n_base]
+            for position in positions
+        ]
+
+
+class CoPurchaseIndex:
+    """
+    Index « fréquemment achetés ensemble » construit sur les paniers de commande.
+
+    Les lectures (`bought_together`) ne prennent aucun verrou ; les écritures
+    (`fit`, `add_basket`) sont sérialisées.
+    """
+
+    def __init__(self, top_k: int = 10, min_support: int = 2, measure: str = 'lift'):
+        """
+        Initialise un index vide.
+
+        Args:
+            top_k (int): Nombre de voisins conservés par produit
+            min_support (int): Nombre minimal de paniers communs pour retenir une paire
+            measure (str): Normalisation des co-occurrences ('lift' ou 'pmi')
+        """
+        if measure not in MEASURES:
+            raise ValueError(f"Mesure d'association inconnue: {measure}")
+
+        self.top_k = top_k
+        self.min_support = min_support
+        self.measure = measure
+        self._lock = threading.Lock()
+
+        # État d'écriture : comptages de base (fit) et incréments depuis
+        self.n_baskets = 0
+        self._item_counts = np.zeros(0, dtype=np.int64)
+        self._cooccurrence = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self._delta: Dict[int, Dict[int, int]] = {}
+
+        self._table = _NeighborTable(
+            IdMap([]),
+            np.empty((0, top_k), dtype=np.int32),
+            np.empty((0, top_k), dtype=np.float32)
+        )
+
+    def fit(self, baskets: Iterable[Iterable]) -> 'CoPurchaseIndex':
+        """
+        Construit l'index à partir de l'historique complet des paniers.
+
+        Args:
+            baskets (Iterable[Iterable]): Paniers (listes d'IDs produit)
+
+        Returns:
+            CoPurchaseIndex: L'index lui-même
+        """
+        try:
+            # Un produit compte une fois par panier
+            baskets = [list(dict.fromkeys(basket)) for basket in baskets]
+            baskets = [basket for basket in baskets if basket]
+            lengths = np.fromiter((len(basket) for basket in baskets), dtype=np.int64, count=len(baskets))
+            flat = [product_id for basket in baskets for product_id in basket]
+
+            codes, product_ids = pd.factorize(pd.Series(flat, dtype=object), sort=True)
+            n_products = len(product_ids)
+
+            # Incidence paniers x produits, puis co-occurrences produits x produits
+            incidence = sparse.csr_matrix(
+                (np.ones(len(codes), dtype=np.int64), (np.repeat(np.arange(len(baskets)), lengths), codes)),
+                shape=(len(baskets), n_products)
+            )
+            cooccurrence = (incidence.T @ incidence).tocsr()
+            item_counts = cooccurrence.diagonal().astype(np.int64)
+            cooccurrence.setdiag(0)
+            cooccurrence.eliminate_zeros()
+
+            top_indices, top_scores = self._rank_all(cooccurrence, item_counts, len(baskets))
+
+            with self._lock:
+                self.n_baskets = len(baskets)
+                self._item_counts = item_counts
+                self._cooccurrence = cooccurrence
+                self._delta = {}
+                self._table = _NeighborTable(IdMap(np.asarray(product_ids)), top_indices, top_scores)
+
+            logger.info(f"Index d'achats groupés construit: {len(baskets)} paniers, {n_products} produits, "
+                        f"{cooccurrence.nnz // 2} paires")
+            return self
+
+        except Exception as e:
+            logger.error(f"Erreur lors de la construction de l'index d'achats groupés: {e}")
+            raise
+
+    def _rank_all(self, cooccurrence, item_counts: np.ndarray, n_baskets: int):
+        """
+        Classe les voisins de tous les produits en une passe vectorisée.
+        """
+        n_products = cooccurrence.shape[0]
+        top_indices = np.full((n_products, self.top_k), -1, dtype=np.int32)
+        top_scores = np.full((n_products, self.top_k), np.nan, dtype=np.float32)
+
+        rows = np.repeat(np.arange(n_products), np.diff(cooccurrence.indptr))
+        columns = cooccurrence.indices
+        counts = cooccurrence.data
+        keep = counts >= self.min_support
+        rows, columns, counts = rows[keep], columns[keep], counts[keep]
+        if len(rows) == 0:
+            return top_indices, top_scores
+
+        scores = association_scores(counts, item_counts[rows], item_counts[columns], n_baskets, self.measure)
+
+        # Tri par produit, puis score décroissant (produit voisin en départage)
+        order = np.lexsort((columns, -scores, rows))
+        rows, columns, scores = rows[order], columns[order], scores[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        selected = rank < self.top_k
+
+        top_indices[rows[selected], rank[selected]] = columns[selected]
+        top_scores[rows[selected], rank[selected]] = scores[selected]
+        return top_indices, top_scores
+
+    def _position(self, table: _NeighborTable, product_id) -> int:
+        """
+        Retourne la position d'un produit, en l'ajoutant à l'index s'il est nouveau.
+        """
+        position = table.position(product_id)
+        if position < 0:
+            position = len(table.product_ids) + len(table.extra_ids)
+            table.extra_ids.append(product_id)
+            table.extra_positions[product_id] = position
+            self._item_counts = np.append(self._item_counts, 0)
+        return position
+
+    def _refresh_row(self, table: _NeighborTable, position: int):
+        """
+        Reclasse les voisins d'un produit (comptages de base et incréments).
+        """
+        columns = np.empty(0, dtype=np.int64)
+        counts = np.empty(0, dtype=np.int64)
+        if position < self._cooccurrence.shape[0]:
+            start, end = self._cooccurrence.indptr[position], self._cooccurrence.indptr[position + 1]
+            columns = self._cooccurrence.indices[start:end].astype(np.int64)
+            counts = self._cooccurrence.data[start:end]
+
+        delta = self._delta.get(position)
+        if delta:
+            columns = np.concatenate([columns, np.fromiter(delta.keys(), dtype=np.int64, count=len(delta))])
+            counts = np.concatenate([counts, np.fromiter(delta.values(), dtype=np.int64, count=len(delta))])
+            columns, inverse = np.unique(columns, return_inverse=True)
+            counts = np.bincount(inverse, weights=counts).astype(np.int64)
+
+        keep = counts >= self.min_support
+        columns, counts = columns[keep], counts[keep]
+        scores = association_scores(
+            counts, np.full(len(columns), self._item_counts[position]), self._item_counts[columns],
+            self.n_baskets, self.measure
+        )
+
+        order = np.lexsort((columns, -scores))[:self.top_k]
+        table.refreshed[position] = (columns[order], scores[order])
+
+    def add_basket(self, basket: Iterable):
+        """
+        Intègre un panier validé (checkout) sans reconstruire l'index.
+
+        Args:
+            basket (Iterable): IDs des produits du panier
+        """
+        products = list(dict.fromkeys(product_id for product_id in basket if product_id is not None))
+        if not products:
+            return
+
+        with self._lock:
+            table = self._table
+            positions = [self._position(table, product_id) for product_id in products]
+
+            self.n_baskets += 1
+            self._item_counts[positions] += 1
+
+            # Comptage des paires du panier : O(panier²)
+            for a in positions:
+                row = self._delta.setdefault(a, {})
+                for b in positions:
+                    if a != b:
+                        row[b] = row.get(b, 0) + 1
+
+            for position in positions:
+                self._refresh_row(table, position)
+
+    def bought_together(self, product_id, limit: int = 5) -> List:
+        """
+        Retourne les produits le plus souvent achetés avec un produit donné.
+
+        Args:
+            product_id: ID du produit de référence
+            limit (int): Nombre de produits retournés (au plus top_k)
+
+        Returns:
+            List: IDs des produits, du plus au moins associé
+        """
+        table = self._table
+        position = table.position(product_id)
+        if position < 0:
+            return []
+
+        refreshed = table.refreshed.get(position)
+        if refreshed is not None:
+            neighbors = refreshed[0][:limit]
+        elif position < len(table.top_indices):
+            neighbors = table.top_indices[position, :limit]
+            neighbors = neighbors[neighbors >= 0]
+        else:
+            return []
+        return table.ids(neighbors)
+
+    def __len__(self) -> int:
+        table = self._table
+        return len(table.product_ids) + len(table.extra_ids)
+
+
+def load_baskets_from_mongo(mongo_db) -> List[List[str]]:
+    """
+    Lit les paniers de toutes les commandes MongoDB.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+
+    Returns:
+        List[List[str]]: IDs des produits de chaque commande
+    """
+    try:
+        cursor = mongo_db.purchases.find({}, {'_id': 0, 'items.product_id': 1})
+        return [
+            [str(item['product_id']) for item in purchase.get('items', []) if item.get('product_id')]
+            for purchase in cursor
+        ]
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture des paniers MongoDB: {e}")
+        raise
@@ -0,0 +1,100 @@
+"""
+Correspondance compacte entre identifiants métier et positions de matrice.
+
+Les identifiants (entiers SQL ou chaînes ObjectId MongoDB) sont stockés
+dans un tableau NumPy trié ; la recherche d'une position se fait par
+dichotomie (searchsorted), sans dictionnaire Python ni Index pandas :
+quelques octets par entité au lieu d'une centaine.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import numpy as np
+from typing import List
+
+
+class IdMap:
+    """
+    Correspondance bijective identifiant <-> position (0..n-1).
+
+    Attributs:
+        ids (np.ndarray): Identifiants dans l'ordre des positions
+    """
+
+    __slots__ = ('ids', '_sorted', '_order')
+
+    def __init__(self, ids):
+        """
+        Construit la correspondance.
+
+        Args:
+            ids: Identifiants uniques, dans l'ordre des lignes ou colonnes de la matrice
+        """
+        ids = np.asarray(ids)
+        if ids.dtype == object and all(isinstance(value, str) for value in ids):
+            # Chaînes de longueur fixe : pas d'objet Python par identifiant
+            ids = ids.astype(str)
+        self.ids = ids
+
+        if len(ids) > 1 and not (ids[1:] > ids[:-1]).all():
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            if (sorted_ids[1:] == sorted_ids[:-1]).any():
+                raise ValueError("Identifiants en double dans la correspondance")
+            self._sorted = sorted_ids
+            self._order = order
+        else:
+            # Déjà triés (cas des matrices construites par factorize) : aucune copie
+            self._sorted = ids
+            self._order = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, value) -> bool:
+        return self.get_loc(value) >= 0
+
+    def get_indexer(self, values) -> np.ndarray:
+        """
+        Retourne les positions d'une liste d'identifiants.
+
+        Args:
+            values: Identifiants recherchés
+
+        Returns:
+            np.ndarray: Positions (int64), -1 pour les identifiants inconnus
+        """
+        values = np.asarray(values)
+        missing = np.full(values.shape, -1, dtype=np.int64)
+        if len(self._sorted) == 0 or values.size == 0:
+            return missing
+
+        try:
+            positions = np.searchsorted(self._sorted, values)
+        except (TypeError, ValueError):
+            # Type d'identifiant incompatible (chaîne contre entiers)
+            return missing
+        positions = np.minimum(positions, len(self._sorted) - 1)
+        found = self._sorted[positions] == values
+        if self._order is not None:
+            positions = self._order[positions]
+        return np.where(found, positions, -1).astype(np.int64, copy=False)
+
+    def get_loc(self, value) -> int:
+        """
+        Retourne la position d'un identifiant, -1 s'il est inconnu.
+        """
+        return int(self.get_indexer([value])[0])
+
+    def take(self, positions) -> List:
+        """
+        Retourne les identifiants correspondant à des positions.
+
+        Args:
+            positions: Positions valides
+
+        Returns:
+            List: Identifiants (types Python natifs)
+        """
+        return self.ids[np.asarray(positions, dtype=np.int64)].tolist()
@@ -0,0 +1,320 @@
+"""
+Instrumentation du moteur de recommandation.
+
+Ce module fournit des histogrammes de latence et des compteurs sans
+verrou sur le chemin d'écriture : chaque thread écrit dans sa propre
+partition (shard), les partitions ne sont fusionnées qu'à l'export.
+Les mesures sont exportables en dictionnaire ou au format texte
+Prometheus pour être publiées par l'application Flask.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Tuple, Optional
+
+# Bornes des buckets de latence en secondes (50 µs à 10 s)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Sharded:
+    """
+    Base des métriques partitionnées par thread.
+
+    Chaque thread écrit uniquement dans sa partition : aucune écriture
+    concurrente sur une même cellule, donc aucun verrou nécessaire.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            self._shards.append(shard)
+        return shard
+
+
+class Histogram(_Sharded):
+    """
+    Histogramme à buckets fixes (latences en secondes).
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialise l'histogramme.
+
+        Args:
+            bounds (Tuple[float, ...]): Bornes supérieures croissantes des buckets
+        """
+        super().__init__()
+        self.bounds = tuple(bounds)
+
+    def observe(self, value: float, labels: Labels = ()):
+        """
+        Enregistre une observation.
+
+        Args:
+            value (float): Valeur observée
+            labels (Labels): Étiquettes de la série
+        """
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            # Compteurs par bucket (+Inf en dernier), puis la somme
+            cell = shard[labels] = [0] * (len(self.bounds) + 1) + [0.0]
+        cell[bisect_left(self.bounds, value)] += 1
+        cell[-1] += value
+
+    def collect(self) -> Dict[Labels, Tuple[List[int], float]]:
+        """
+        Fusionne les partitions de tous les threads.
+
+        Returns:
+            Dict[Labels, Tuple[List[int], float]]: Compteurs par bucket et somme, par série
+        """
+        merged = {}
+        for shard in list(self._shards):
+            for labels, cell in list(shard.items()):
+                counts, total = merged.get(labels, ([0] * (len(self.bounds) + 1), 0.0))
+                merged[labels] = ([a + b for a, b in zip(counts, cell[:-1])], total + cell[-1])
+        return merged
+
+    def quantile(self, counts: List[int], q: float) -> Optional[float]:
+        """
+        Estime un quantile par interpolation linéaire dans les buckets.
+
+        Args:
+            counts (List[int]): Compteurs par bucket
+            q (float): Quantile entre 0 et 1
+
+        Returns:
+            Optional[float]: Quantile estimé, None sans observation
+        """
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+
+class Counter(_Sharded):
+    """
+    Compteur monotone étiqueté.
+    """
+
+    def increment(self, labels: Labels = (), amount: int = 1):
+        """
+        Incrémente la série correspondant aux étiquettes.
+        """
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> Dict[Labels, int]:
+        """
+        Fusionne les partitions de tous les threads.
+        """
+        merged = {}
+        for shard in list(self._shards):
+            for labels, value in list(shard.items()):
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+
+class StageTimer:
+    """
+    Chronomètre des étapes d'une requête (lookup, scoring, filtering, top_n).
+
+    Chaque appel à `mark` enregistre la durée écoulée depuis la marque précédente.
+    """
+
+    __slots__ = ('metrics', 'method', 'last')
+
+    def __init__(self, metrics: 'RecommenderMetrics', method: str):
+        self.metrics = metrics
+        self.method = method
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        """
+        Clôt l'étape en cours et démarre la suivante.
+
+        Args:
+            stage (str): Nom de l'étape qui vient de se terminer
+        """
+        now = time.perf_counter()
+        self.metrics.stage_latency.observe(now - self.last, (('method', self.method), ('stage', stage)))
+        self.last = now
+
+
+class RecommenderMetrics:
+    """
+    Registre des métriques du moteur de recommandation.
+
+    Métriques collectées :
+    - recommender_request_seconds : latence totale par méthode
+    - recommender_stage_seconds : latence par méthode et par étape
+    - recommender_fallbacks_total : replis sur la popularité par méthode
+    - recommender_errors_total : exceptions interceptées par méthode
+    - recommender_cache_requests_total : accès aux caches (hit/miss)
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialise le registre.
+
+        Args:
+            bounds (Tuple[float, ...]): Bornes des buckets de latence en secondes
+        """
+        self.request_latency = Histogram(bounds)
+        self.stage_latency = Histogram(bounds)
+        self.fallbacks = Counter()
+        self.errors = Counter()
+        self.cache_requests = Counter()
+
+    def stage_timer(self, method: str) -> StageTimer:
+        """
+        Crée un chronomètre d'étapes pour une requête.
+        """
+        return StageTimer(self, method)
+
+    def observe_request(self, method: str, seconds: float):
+        """
+        Enregistre la latence totale d'une requête.
+        """
+        self.request_latency.observe(seconds, (('method', method),))
+
+    def record_fallback(self, method: str):
+        """
+        Compte un repli d'une méthode sur les recommandations populaires.
+        """
+        self.fallbacks.increment((('method', method),))
+
+    def record_error(self, method: str):
+        """
+        Compte une exception interceptée lors d'une recommandation.
+        """
+        self.errors.increment((('method', method),))
+
+    def record_cache(self, cache: str, hit: bool):
+        """
+        Compte un accès à un cache.
+        """
+        self.cache_requests.increment((('cache', cache), ('result', 'hit' if hit else 'miss')))
+
+    def _histogram_to_dict(self, histogram: Histogram) -> Dict[Labels, Dict]:
+        series = {}
+        for labels, (counts, total) in histogram.collect().items():
+            count = sum(counts)
+            series[labels] = {
+                'count': count,
+                'mean_ms': round(total / count * 1000, 4) if count else None,
+                'p50_ms': _to_ms(histogram.quantile(counts, 0.5)),
+                'p99_ms': _to_ms(histogram.quantile(counts, 0.99))
+            }
+        return series
+
+    def to_dict(self) -> Dict:
+        """
+        Exporte les métriques sous forme de dictionnaire sérialisable en JSON.
+
+        Returns:
+            Dict: Latences par méthode et étape, replis, erreurs et taux de succès des caches
+        """
+        requests = {}
+        for labels, stats in self._histogram_to_dict(self.request_latency).items():
+            requests[dict(labels)['method']] = stats
+
+        stages = {}
+        for labels, stats in self._histogram_to_dict(self.stage_latency).items():
+            label_map = dict(labels)
+            stages.setdefault(label_map['method'], {})[label_map['stage']] = stats
+
+        caches = {}
+        for labels, value in self.cache_requests.collect().items():
+            label_map = dict(labels)
+            cache = caches.setdefault(label_map['cache'], {'hit': 0, 'miss': 0})
+            cache[label_map['result']] = value
+        for cache in caches.values():
+            lookups = cache['hit'] + cache['miss']
+            cache['hit_rate'] = round(cache['hit'] / lookups, 4) if lookups else None
+
+        return {
+            'requests': requests,
+            'stages': stages,
+            'fallbacks': {dict(labels)['method']: value for labels, value in self.fallbacks.collect().items()},
+            'errors': {dict(labels)['method']: value for labels, value in self.errors.collect().items()},
+            'caches': caches
+        }
+
+    def to_prometheus(self, prefix: str = 'recommender') -> str:
+        """
+        Exporte les métriques au format texte d'exposition Prometheus.
+
+        Args:
+            prefix (str): Préfixe des noms de métriques
+
+        Returns:
+            str: Texte d'exposition
+        """
+        lines = []
+        for name, help_text, histogram in (
+            ('request_seconds', 'Latence totale des recommandations', self.request_latency),
+            ('stage_seconds', 'Latence des étapes des recommandations', self.stage_latency)
+        ):
+            metric = f'{prefix}_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for labels, (counts, total) in sorted(histogram.collect().items()):
+                cumulative = 0
+                for bound, count in zip(list(histogram.bounds) + ['+Inf'], counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else repr(float(bound))
+                    lines.append(f'{metric}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{metric}_sum{_format_labels(labels)} {total}')
+                lines.append(f'{metric}_count{_format_labels(labels)} {cumulative}')
+
+        for name, help_text, counter in (
+            ('fallbacks_total', 'Replis sur les recommandations populaires', self.fallbacks),
+            ('errors_total', 'Exceptions interceptées lors des recommandations', self.errors),
+            ('cache_requests_total', 'Accès aux caches du moteur', self.cache_requests)
+        ):
+            metric = f'{prefix}_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for labels, value in sorted(counter.collect().items()):
+                lines.append(f'{metric}{_format_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 4) if seconds is not None else None
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        key + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
@@ -14,41 +14,371 @@ Date: 2024
 import logging
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+from sklearn.cluster import MiniBatchKMeans
 from typing import List, Dict, Tuple, Optional
 import pickle
 import os
+import time
+import copy
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+from recommender.idmap import IdMap
+from recommender.svd import IncrementalSVD
+from recommender.metrics import RecommenderMetrics
+from recommender.rules import RuleSet, CompiledRules
+
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
+# Pondération par défaut des méthodes dans les recommandations hybrides
+DEFAULT_HYBRID_WEIGHTS = {'user': 0.4, 'item': 0.4, 'popular': 0.2}
+
+def top_k_neighbors(similarity, k: int, row_offset: int = 0):
+    """
+    Élague une matrice de similarité aux k voisins les plus proches de chaque ligne.
+    
+    La diagonale (similarité d'un élément avec lui-même) et les similarités
+    nulles ou négatives sont exclues.
+    
+    Args:
+        similarity: Matrice de similarité carrée (dense ou creuse), ou bloc de
+            lignes d'une telle matrice pour une matrice creuse
+        k (int): Nombre de voisins conservés par ligne
+        row_offset (int): Indice de la première ligne du bloc (position de la diagonale)
+        
+    Returns:
+        sparse.csr_matrix: Table des voisins (lignes creuses)
+    """
+    if sparse.issparse(similarity):
+        return _top_k_sparse_rows(sparse.csr_matrix(similarity), k, row_offset)
+    
+    similarity = np.array(similarity, dtype=np.float64)
+    n = similarity.shape[0]
+    np.fill_diagonal(similarity, -np.inf)
+    k = min(k, max(n - 1, 0))
+    if k == 0:
+        return sparse.csr_matrix((n, n))
+    
+    columns = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    rows = np.repeat(np.arange(n), k)
+    values = similarity[rows, columns.ravel()]
+    keep = values > 0
+    return sparse.csr_matrix((values[keep], (rows[keep], columns.ravel()[keep])), shape=(n, n))
+
+def _top_k_sparse_rows(matrix: sparse.csr_matrix, k: int, row_offset: int = 0) -> sparse.csr_matrix:
+    """
+    Conserve les k plus grandes valeurs positives de chaque ligne d'une matrice creuse.
+    
+    Le tri est vectorisé sur l'ensemble des valeurs non nulles (ligne, puis
+    valeur décroissante), sans boucle Python par ligne.
+    """
+    n_rows = matrix.shape[0]
+    rows = np.repeat(np.arange(n_rows), np.diff(matrix.indptr))
+    columns, values = matrix.indices, matrix.data
+    keep = (values > 0) & (columns != rows + row_offset)
+    rows, columns, values = rows[keep], columns[keep], values[keep]
+    
+    order = np.lexsort((columns, -values, rows))
+    rows, columns, values = rows[order], columns[order], values[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    selected = rank < k
+    return sparse.csr_matrix(
+        (values[selected], (rows[selected], columns[selected])),
+        shape=matrix.shape
+    )
+
+def _row_normalize(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    Normalise chaque ligne d'une matrice creuse pour que sa somme vaille 1.
+    """
+    row_sums = np.asarray(matrix.sum(axis=1)).ravel().astype(np.float64)
+    inverse = np.divide(1.0, row_sums, out=np.zeros_like(row_sums), where=row_sums > 0)
+    return sparse.csr_matrix(sparse.diags(inverse) @ matrix)
+
+def _max_normalize_rows(scores: np.ndarray) -> np.ndarray:
+    """
+    Divise chaque ligne de scores par son maximum, les lignes sans score positif restent nulles.
+    """
+    peaks = scores.max(axis=1, keepdims=True) if scores.shape[1] else np.zeros((len(scores), 1))
+    return np.divide(scores, peaks, out=np.zeros_like(scores), where=peaks > 0)
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Normalise chaque ligne (norme euclidienne), les lignes nulles restent nulles.
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+class LRUCache:
+    """
+    Cache LRU borné (vecteurs latents des utilisateurs projetés à la volée).
+    """
+    
+    def __init__(self, maxsize: int = 1024):
+        """
+        Initialise le cache.
+        
+        Args:
+            maxsize (int): Nombre maximal d'entrées conservées
+        """
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+    
+    def get(self, key):
+        """
+        Retourne la valeur associée à la clé (None si absente) et la marque comme récente.
+        """
+        try:
+            self._data.move_to_end(key)
+            return self._data[key]
+        except KeyError:
+            return None
+    
+    def put(self, key, value):
+        """
+        Ajoute une entrée en évinçant la moins récemment utilisée si nécessaire.
+        """
+        self._data[key] = value
+        try:
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        except KeyError:
+            # Entrée évincée entre-temps par un autre thread
+            pass
+    
+    def invalidate(self, key):
+        """
+        Supprime une entrée du cache.
+        """
+        self._data.pop(key, None)
+    
+    def clear(self):
+        """
+        Vide le cache.
+        """
+        self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+
+class AvailabilityMask:
+    """
+    Masque des produits vendables (actifs et en stock), aligné sur les positions produits d'un instantané.
+    
+    Chaque mise à jour remplace le tableau par une copie modifiée : une
+    lecture utilise toujours un masque complet, sans verrou.
+    """
+    
+    def __init__(self, product_ids: IdMap, unavailable=()):
+        """
+        Initialise le masque.
+        
+        Args:
+            product_ids (IdMap): IDs des produits de l'instantané
+            unavailable: IDs des produits non vendables
+        """
+        self.product_ids = product_ids
+        self.reset(unavailable)
+    
+    def reset(self, unavailable):
+        """
+        Reconstruit le masque à partir de l'ensemble des produits non vendables.
+        """
+        mask = np.ones(len(self.product_ids), dtype=bool)
+        positions = self.product_ids.get_indexer(list(unavailable))
+        mask[positions[positions >= 0]] = False
+        self.mask = mask
+    
+    def update(self, availability: Dict):
+        """
+        Applique des changements de disponibilité ({product_id: bool}).
+        """
+        positions = self.product_ids.get_indexer(list(availability))
+        values = np.fromiter(availability.values(), dtype=bool, count=len(availability))
+        known = positions >= 0
+        if not known.any():
+            return
+        mask = self.mask.copy()
+        mask[positions[known]] = values[known]
+        self.mask = mask
+
+
+class ModelSnapshot:
+    """
+    État immuable d'un modèle entraîné, lu par toutes les recommandations.
+
+    Un instantané n'est jamais modifié après sa création : l'entraînement
+    en construit un nouveau, publié par simple remplacement de référence.
+    Une requête lit l'instantané une fois au début et reste cohérente
+    même si un réentraînement se termine pendant son traitement.
+
+    L'état ne contient que des tableaux NumPy et des matrices creuses,
+    indexés par position ; les IDs sont résolus par les IdMap.
+
+    Attributs:
+        interaction_matrix (sparse.csr_matrix): Interactions utilisateurs x produits
+        user_ids (IdMap): IDs des utilisateurs (lignes)
+        product_ids (IdMap): IDs des produits (colonnes)
+        user_neighbors (sparse.csr_matrix): Table des voisins des utilisateurs
+        item_similarity (sparse.csr_matrix): Similarité entre produits
+        item_neighbors (sparse.csr_matrix): Table des voisins des produits
+        graph_neighbors (sparse.csr_matrix): Table des voisins par marche aléatoire (P3-alpha)
+        ease_matrix (np.ndarray): Poids produit -> produit du modèle EASE (float32)
+        svd_components (np.ndarray): Composantes SVD (rang x produits)
+        svd_matrix (np.ndarray): Vecteurs latents des utilisateurs
+        user_segments (np.ndarray): Segment de chaque utilisateur (position)
+        segment_centroids (np.ndarray): Centres des segments (vecteurs latents normalisés)
+        segment_top_products (np.ndarray): Meilleurs produits de chaque segment (positions, -1 en fin de liste)
+        transition_matrix (sparse.csr_matrix): Probabilités de transition produit -> produit suivant
+        recent_history (sparse.csr_matrix): Dernières commandes pondérées de chaque utilisateur
+        popular_products (np.ndarray): Positions des produits par popularité décroissante
+        availability (AvailabilityMask): Produits vendables, mis à jour sans republier le modèle
+        product_attributes (pd.DataFrame): Attributs des produits (règles métier), par position
+        rule_cache (LRUCache): Règles compilées par (version, page)
+    """
+
+    __slots__ = (
+        'interaction_matrix', 'user_ids', 'product_ids',
+        'user_neighbors', 'item_similarity', 'item_neighbors', 'graph_neighbors',
+        'ease_matrix', 'svd_components', 'svd_matrix', 'user_segments', 'segment_centroids',
+        'segment_top_products', 'transition_matrix', 'recent_history',
+        'popular_products', 'availability', 'product_attributes', 'fold_in_cache', 'rule_cache',
+        'created_at'
+    )
+
+    def __init__(self, fold_in_cache_size: int = 1024, **state):
+        """
+        Initialise l'instantané.
+
+        Args:
+            fold_in_cache_size (int): Taille du cache LRU des utilisateurs projetés
+            **state: Attributs du modèle (les absents valent None)
+        """
+        for name in self.__slots__:
+            object.__setattr__(self, name, state.get(name))
+        if self.availability is None:
+            object.__setattr__(self, 'availability', AvailabilityMask(self.product_ids or IdMap([])))
+        # Les vecteurs projetés et les règles compilées dépendent du modèle : un cache par instantané
+        object.__setattr__(self, 'fold_in_cache', LRUCache(fold_in_cache_size))
+        object.__setattr__(self, 'rule_cache', LRUCache(64))
+        object.__setattr__(self, 'created_at', datetime.now())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Un instantané de modèle ne peut pas être modifié")
+
+
 class RecommendationEngine:
     """
     Moteur de recommandation intelligent pour l'e-commerce.
-    
+
     Ce moteur utilise plusieurs algorithmes de recommandation :
     - Filtrage collaboratif user-based
     - Filtrage collaboratif item-based
+    - Marche aléatoire sur le graphe utilisateurs-produits (P3-alpha)
+    - Autoencodeur linéaire produit-produit (EASE, solution fermée)
     - Factorisation matricielle (SVD)
+    - Segments d'utilisateurs (k-means dans l'espace SVD) pour les clients peu actifs
+    - Modèle séquentiel (transitions entre commandes successives)
     - Recommandations populaires
+
+    Les étapes d'entraînement travaillent sur les attributs du moteur ;
+    les recommandations ne lisent que l'instantané publié (`model`), remplacé
+    en bloc par `publish`. Les écritures sont sérialisées par un verrou,
+    les lectures n'en prennent aucun. Seuls les produits vendables (actifs
+    et en stock) et autorisés par les règles métier sont recommandés.
     """
     
-    def __init__(self, model_cache_dir: str = 'recommender/cache'):
+    def __init__(self, model_cache_dir: str = 'recommender/cache', n_components: int = 50,
+                 n_neighbors: int = 5, decay_half_life_days: Optional[float] = None,
+                 hybrid_weights: Optional[Dict[str, float]] = None, fold_in_cache_size: int = 1024,
+                 metrics: Optional[RecommenderMetrics] = None, sequence_order: int = 1,
+                 sequence_decay: float = 0.5, graph_alpha: float = 1.0, ease_lambda: float = 500.0,
+                 ease_max_products: int = 20000, n_segments: int = 20, segment_min_purchases: int = 3,
+                 segment_top_n: int = 50, svd_max_append_fraction: float = 0.2):
         """
         Initialise le moteur de recommandation.
         
         Args:
             model_cache_dir (str): Répertoire pour le cache des modèles
+            n_components (int): Rang par défaut de la factorisation SVD
+            n_neighbors (int): Nombre de voisins utilisés par les méthodes user/item
+            decay_half_life_days (Optional[float]): Demi-vie (jours) de la pondération
+                temporelle des interactions, None pour désactiver
+            hybrid_weights (Optional[Dict[str, float]]): Pondération des méthodes hybrides
+            fold_in_cache_size (int): Taille du cache LRU des utilisateurs projetés dans l'espace SVD
+            metrics (Optional[RecommenderMetrics]): Registre de métriques (un registre propre par défaut)
+            sequence_order (int): Nombre de commandes précédentes prises en compte par le modèle séquentiel
+            sequence_decay (float): Poids relatif de chaque commande plus ancienne (ordre > 1)
+            graph_alpha (float): Exposant des probabilités de transition de la marche aléatoire (P3-alpha)
+            ease_lambda (float): Régularisation L2 du modèle EASE
+            ease_max_products (int): Taille de catalogue au-delà de laquelle EASE n'est pas entraîné
+            n_segments (int): Nombre de segments d'utilisateurs
+            segment_min_purchases (int): En dessous de ce nombre de produits achetés, la méthode
+                hybride sert la liste du segment de l'utilisateur
+            segment_top_n (int): Nombre de produits précalculés par segment
+            svd_max_append_fraction (float): Part de nouveaux utilisateurs ou de nouveaux produits
+                au-delà de laquelle update_svd_model réentraîne la SVD (à chaud) au lieu de l'étendre
         """
         self.model_cache_dir = model_cache_dir
-        self.user_item_matrix = None
-        self.user_similarity_matrix = None
+        self.n_components = n_components
+        self.n_neighbors = n_neighbors
+        self.decay_half_life_days = decay_half_life_days
+        self.sequence_order = sequence_order
+        self.sequence_decay = sequence_decay
+        self.graph_alpha = graph_alpha
+        self.ease_lambda = ease_lambda
+        self.ease_max_products = ease_max_products
+        self.n_segments = n_segments
+        self.segment_min_purchases = segment_min_purchases
+        self.segment_top_n = segment_top_n
+        self.svd_max_append_fraction = svd_max_append_fraction
+        self.hybrid_weights = {**DEFAULT_HYBRID_WEIGHTS, **(hybrid_weights or {})}
+        self.metrics = metrics or RecommenderMetrics()
+        self.df = pd.DataFrame(columns=['user_id', 'product_id', 'quantity', 'rating'])
+        self.interaction_matrix = None
+        self.user_id_map = None
+        self.product_id_map = None
+        self.user_neighbors = None
         self.item_similarity_matrix = None
+        self.item_neighbors = None
+        self.graph_neighbors = None
+        self.ease_matrix = None
         self.svd_model = None
+        self.svd_matrix = None
+        self.user_segments = None
+        self.segment_centroids = None
+        self.segment_top_products = None
+        self.transition_matrix = None
+        self.recent_history = None
         self.product_popularity = None
+        self.fold_in_cache_size = fold_in_cache_size
+
+        # Instantané lu par les recommandations et verrou des écritures
+        self.model: Optional[ModelSnapshot] = None
+        self._write_lock = threading.RLock()
+
+        # Interactions reçues depuis la dernière publication du modèle, et leur
+        # journal numéroté (seules celles couvertes par les données d'entraînement sont oubliées)
+        self.fresh_interactions = {}
+        self._fresh_log: List[Tuple[int, object, object, int]] = []
+        self._interaction_sequence = 0
+        self._fresh_lock = threading.Lock()
+        
+        # Produits non vendables, conservés d'un instantané à l'autre
+        self.unavailable_products = set()
+        self._availability_lock = threading.Lock()
         
+        # Règles métier et attributs du catalogue sur lesquels elles portent
+        self.rules: Optional[RuleSet] = None
+        self.product_attributes: Optional[pd.DataFrame] = None
+
         # Création du répertoire de cache si nécessaire
         os.makedirs(model_cache_dir, exist_ok=True)
         
@@ -67,8 +397,8 @@ class RecommendationEngine:
             
             # Récupération des données
             purchases = db_session.query(Purchase).all()
-            users = db_session.query(User).all()
-            products = db_session.query(Product).all()
+            n_users = db_session.query(User).count()
+            n_products = db_session.query(Product).count()
             
             # Conversion en DataFrame
             purchase_data = []
@@ -77,71 +407,300 @@ class RecommendationEngine:
                     'user_id': purchase.user_id,
                     'product_id': purchase.product_id,
                     'quantity': purchase.quantity,
-                    'rating': min(purchase.quantity, 5)  # Rating basé sur la quantité
+                    'rating': min(purchase.quantity, 5),  # Rating basé sur la quantité
+                    'timestamp': purchase.purchase_date
                 })
             
             self.df = pd.DataFrame(purchase_data)
             
-            # Création des mappings
-            self.user_id_to_index = {user.id: idx for idx, user in enumerate(users)}
-            self.index_to_user_id = {idx: user.id for idx, user in enumerate(users)}
-            self.product_id_to_index = {product.id: idx for idx, product in enumerate(products)}
-            self.index_to_product_id = {idx: product.id for idx, product in enumerate(products)}
-            
-            logger.info(f"Données chargées: {len(self.df)} achats, {len(users)} utilisateurs, {len(products)} produits")
+            logger.info(f"Données chargées: {len(self.df)} achats, {n_users} utilisateurs, {n_products} produits")
             
         except Exception as e:
             logger.error(f"Erreur lors du chargement des données: {e}")
             raise
     
+    def load_data_from_mongo(self, mongo_db):
+        """
+        Charge les achats depuis MongoDB (collection 'purchases', un panier par document).
+        
+        Args:
+            mongo_db: Base MongoDB de l'application (mongo.db)
+        """
+        try:
+            # Un document par article acheté, projeté côté serveur
+            pipeline = [
+                {'$unwind': '$items'},
+                {'$project': {
+                    '_id': 0,
+                    'user_id': 1,
+                    'product_id': '$items.product_id',
+                    'quantity': {'$ifNull': ['$items.quantity', 1]},
+                    'timestamp': '$created_at'
+                }}
+            ]
+            rows = list(mongo_db.purchases.aggregate(pipeline))
+            
+            interactions = pd.DataFrame(rows, columns=['user_id', 'product_id', 'quantity', 'timestamp'])
+            interactions = interactions.dropna(subset=['user_id', 'product_id'])
+            interactions['user_id'] = interactions['user_id'].astype(str)
+            interactions['product_id'] = interactions['product_id'].astype(str)
+            interactions['quantity'] = interactions['quantity'].astype(int)
+            
+            self.load_interactions(interactions)
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des données MongoDB: {e}")
+            raise
+    
+    def load_availability_from_mongo(self, mongo_db):
+        """
+        Charge la disponibilité des produits depuis le catalogue MongoDB.
+        
+        Un produit est vendable s'il est actif et en stock ; un produit acheté
+        par le passé mais supprimé du catalogue ne l'est plus.
+        
+        Args:
+            mongo_db: Base MongoDB de l'application (mongo.db)
+        """
+        try:
+            catalog = {
+                str(product['_id']): bool(product.get('is_active')) and (product.get('stock_quantity') or 0) > 0
+                for product in mongo_db.product.find({}, {'is_active': 1, 'stock_quantity': 1})
+            }
+            unavailable = {product_id for product_id, available in catalog.items() if not available}
+            if not self.df.empty:
+                unavailable.update(set(self.df['product_id'].astype(str).unique()) - catalog.keys())
+            
+            with self._availability_lock:
+                self.unavailable_products = unavailable
+                model = self.model
+                if model is not None:
+                    model.availability.reset(unavailable)
+            
+            logger.info(f"Disponibilité chargée: {len(unavailable)} produits non vendables")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement de la disponibilité des produits: {e}")
+            raise
+    
+    def update_availability(self, availability: Dict):
+        """
+        Met à jour la disponibilité de produits (modification admin, checkout).
+        
+        Le masque de l'instantané courant est remplacé immédiatement, sans
+        réentraînement ni republication du modèle.
+        
+        Args:
+            availability (Dict): {product_id: True si actif et en stock}
+        """
+        with self._availability_lock:
+            unavailable = set(self.unavailable_products)
+            for product_id, available in availability.items():
+                if available:
+                    unavailable.discard(product_id)
+                else:
+                    unavailable.add(product_id)
+            self.unavailable_products = unavailable
+            
+            model = self.model
+            if model is not None:
+                model.availability.update(availability)
+    
+    def load_product_attributes(self, attributes: pd.DataFrame):
+        """
+        Charge les attributs du catalogue (catégorie, prix, marque) utilisés par les règles.
+        
+        Les attributs sont pris en compte à la prochaine publication du modèle.
+        
+        Args:
+            attributes (pd.DataFrame): Attributs indexés par ID produit
+        """
+        self.product_attributes = attributes
+        logger.info(f"Attributs du catalogue chargés: {len(attributes)} produits")
+    
+    def set_rules(self, rules: Optional[RuleSet]):
+        """
+        Remplace le jeu de règles métier (None pour les désactiver).
+        
+        Les règles sont compilées à la première requête de chaque page puis
+        mises en cache par version ; aucun réentraînement n'est nécessaire.
+        
+        Args:
+            rules (Optional[RuleSet]): Nouveau jeu de règles
+        """
+        self.rules = rules
+        if rules is not None:
+            logger.info(f"Règles métier version {rules.version} activées ({len(rules)} règles)")
+    
+    def _compiled_rules(self, model: ModelSnapshot, page: Optional[str]) -> Optional[CompiledRules]:
+        """
+        Retourne les règles compilées pour une page (None si aucune règle ne s'applique).
+        """
+        rules = self.rules
+        if rules is None or model.product_attributes is None:
+            return None
+        
+        key = (rules.version, page)
+        compiled = model.rule_cache.get(key)
+        if compiled is None:
+            compiled = rules.compile(model.product_attributes, page)
+            model.rule_cache.put(key, compiled)
+        return compiled
+    
+    def _allowed_products(self, model: ModelSnapshot, page: Optional[str]) -> np.ndarray:
+        """
+        Retourne le masque des produits recommandables : vendables et autorisés par les règles.
+        """
+        allowed = model.availability.mask
+        compiled = self._compiled_rules(model, page)
+        if compiled is not None and compiled.mask is not None:
+            allowed = allowed & compiled.mask
+        return allowed
+    
+    def filter_available(self, product_ids: List) -> List:
+        """
+        Retire d'une liste d'IDs les produits non vendables (ordre conservé).
+        """
+        unavailable = self.unavailable_products
+        return [product_id for product_id in product_ids if product_id not in unavailable]
+    
+    def load_interactions(self, interactions: pd.DataFrame):
+        """
+        Charge directement un DataFrame d'interactions (benchmarks, données synthétiques).
+        
+        Args:
+            interactions (pd.DataFrame): Colonnes 'user_id', 'product_id', 'quantity'
+                et optionnellement 'rating'
+        """
+        try:
+            df = interactions.copy()
+            if 'rating' not in df.columns:
+                df['rating'] = df['quantity'].clip(upper=5)
+            self.df = df
+            
+            logger.info(f"Interactions chargées: {len(df)} lignes, {df['user_id'].nunique()} utilisateurs, "
+                        f"{df['product_id'].nunique()} produits")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des interactions: {e}")
+            raise
+    
     def create_user_item_matrix(self):
         """
         Crée la matrice utilisateur-produit pour les calculs de similarité.
+        
+        La matrice creuse (CSR) est construite directement depuis les
+        interactions : une cellule par couple utilisateur-produit, égale
+        au rating moyen, pondéré par l'ancienneté si une demi-vie est configurée.
         """
         try:
             if self.df.empty:
                 logger.warning("Aucune donnée disponible pour créer la matrice")
                 return
             
-            # Création de la matrice utilisateur-produit
-            self.user_item_matrix = self.df.pivot_table(
-                index='user_id',
-                columns='product_id',
-                values='rating',
-                fill_value=0
-            )
+            aggregations = {'rating': ('rating', 'mean')}
+            use_decay = self.decay_half_life_days is not None and 'timestamp' in self.df.columns
+            if use_decay:
+                aggregations['timestamp'] = ('timestamp', 'max')
+            grouped = self.df.groupby(['user_id', 'product_id'], sort=True).agg(**aggregations)
             
-            # Normalisation des ratings par utilisateur (centrage)
-            user_means = self.user_item_matrix.mean(axis=1)
-            self.user_item_matrix_normalized = self.user_item_matrix.sub(user_means, axis=0)
-            self.user_item_matrix_normalized = self.user_item_matrix_normalized.fillna(0)
+            user_codes, user_ids = pd.factorize(grouped.index.get_level_values('user_id'), sort=True)
+            product_codes, product_ids = pd.factorize(grouped.index.get_level_values('product_id'), sort=True)
             
-            logger.info(f"Matrice utilisateur-produit créée: {self.user_item_matrix.shape}")
+            values = grouped['rating'].to_numpy(dtype=np.float64)
+            if use_decay:
+                timestamps = pd.to_datetime(grouped['timestamp'])
+                age_days = ((timestamps.max() - timestamps).dt.total_seconds() / 86400).to_numpy()
+                values = values * self.decay_weights(age_days)
+            
+            matrix = sparse.csr_matrix(
+                (values, (user_codes, product_codes)),
+                shape=(len(user_ids), len(product_ids))
+            )
+            self.load_interaction_matrix(matrix, np.asarray(user_ids), np.asarray(product_ids))
+            
+            logger.info(f"Matrice utilisateur-produit créée: {self.interaction_matrix.shape}")
             
         except Exception as e:
             logger.error(f"Erreur lors de la création de la matrice: {e}")
             raise
     
-    def compute_user_similarity(self):
+    def decay_weights(self, age_days: np.ndarray) -> np.ndarray:
+        """
+        Calcule les poids de décroissance temporelle des interactions.
+        
+        Args:
+            age_days (np.ndarray): Ancienneté des interactions en jours
+            
+        Returns:
+            np.ndarray: Poids dans ]0, 1] (1 si aucune demi-vie n'est configurée)
+        """
+        if self.decay_half_life_days is None:
+            return np.ones_like(age_days, dtype=np.float64)
+        return np.power(0.5, np.asarray(age_days, dtype=np.float64) / self.decay_half_life_days)
+    
+    def load_interaction_matrix(self, matrix, user_ids: np.ndarray, product_ids: np.ndarray):
+        """
+        Installe une matrice d'interactions déjà construite.
+        
+        Permet de partager une même matrice entre plusieurs moteurs
+        (balayage d'hyperparamètres) sans repasser par les interactions brutes.
+        
+        La matrice reste creuse : aucune vue dense utilisateurs x produits
+        n'est construite, les IDs sont résolus par les IdMap.
+        
+        Args:
+            matrix: Matrice creuse utilisateurs x produits
+            user_ids (np.ndarray): IDs des utilisateurs (lignes)
+            product_ids (np.ndarray): IDs des produits (colonnes)
+        """
+        self.interaction_matrix = sparse.csr_matrix(matrix)
+        self.user_id_map = IdMap(user_ids)
+        self.product_id_map = IdMap(product_ids)
+        
+        # Sans interactions brutes, on les reconstruit depuis la matrice
+        if self.df.empty:
+            self.df = self._interactions_from_matrix()
+    
+    def _interactions_from_matrix(self) -> pd.DataFrame:
+        """
+        Reconstruit les interactions (une ligne par cellule non nulle) depuis la matrice.
+        """
+        coo = self.interaction_matrix.tocoo()
+        return pd.DataFrame({
+            'user_id': self.user_id_map.ids[coo.row],
+            'product_id': self.product_id_map.ids[coo.col],
+            'quantity': coo.data,
+            'rating': coo.data
+        })
+    
+    def compute_user_similarity(self, block_size: int = 2048):
         """
-        Calcule la matrice de similarité entre utilisateurs.
+        Calcule la table des voisins des utilisateurs (similarité cosinus).
+        
+        La similarité est le produit creux des lignes normalisées de la
+        matrice d'interactions, calculé par blocs d'utilisateurs ; chaque bloc
+        est élagué aux n_neighbors meilleurs voisins avant le suivant. Aucune
+        matrice utilisateurs x utilisateurs complète n'est matérialisée.
+        
+        Args:
+            block_size (int): Nombre d'utilisateurs traités par bloc (borne la mémoire)
         """
         try:
-            if self.user_item_matrix_normalized is None:
+            if self.interaction_matrix is None:
                 self.create_user_item_matrix()
             
-            # Calcul de la similarité cosinus
-            self.user_similarity_matrix = cosine_similarity(self.user_item_matrix_normalized)
-            
-            # Conversion en DataFrame pour faciliter l'utilisation
-            user_ids = self.user_item_matrix.index
-            self.user_similarity_df = pd.DataFrame(
-                self.user_similarity_matrix,
-                index=user_ids,
-                columns=user_ids
-            )
+            rows = normalize(self.interaction_matrix, norm='l2', axis=1).tocsr()
+            columns = rows.T.tocsc()
             
-            logger.info("Matrice de similarité utilisateurs calculée")
+            n_users = rows.shape[0]
+            blocks = []
+            for start in range(0, n_users, block_size):
+                similarity = rows[start:start + block_size] @ columns
+                blocks.append(top_k_neighbors(similarity, self.n_neighbors, row_offset=start))
+            self.user_neighbors = sparse.vstack(blocks).tocsr() if blocks else sparse.csr_matrix((0, 0))
+            
+            logger.info("Table des voisins utilisateurs calculée")
             
         except Exception as e:
             logger.error(f"Erreur lors du calcul de la similarité utilisateurs: {e}")
@@ -150,24 +709,22 @@ class RecommendationEngine:
     def compute_item_similarity(self):
         """
         Calcule la matrice de similarité entre produits.
+        
+        La similarité cosinus est calculée et conservée au format creux :
+        seuls les couples de produits achetés par un même client y figurent.
         """
         try:
-            if self.user_item_matrix is None:
+            if self.interaction_matrix is None:
                 self.create_user_item_matrix()
             
             # Transposition pour avoir les produits en lignes
-            item_user_matrix = self.user_item_matrix.T
+            item_user_matrix = self.interaction_matrix.T.tocsr()
             
             # Calcul de la similarité cosinus
-            self.item_similarity_matrix = cosine_similarity(item_user_matrix)
+            self.item_similarity_matrix = cosine_similarity(item_user_matrix, dense_output=False).tocsr()
             
-            # Conversion en DataFrame
-            product_ids = self.user_item_matrix.columns
-            self.item_similarity_df = pd.DataFrame(
-                self.item_similarity_matrix,
-                index=product_ids,
-                columns=product_ids
-            )
+            # Table des voisins : les n_neighbors produits les plus similaires de chaque produit
+            self.item_neighbors = top_k_neighbors(self.item_similarity_matrix, self.n_neighbors)
             
             logger.info("Matrice de similarité produits calculée")
             
@@ -175,20 +732,141 @@ class RecommendationEngine:
             logger.error(f"Erreur lors du calcul de la similarité produits: {e}")
             raise
     
-    def train_svd_model(self, n_components: int = 50):
+    def similarity_sample(self, axis: str = 'user', size: int = 20) -> Optional[pd.DataFrame]:
+        """
+        Calcule la similarité cosinus entre les premiers utilisateurs ou produits (visualisation).
+        
+        Seul le bloc size x size est dense ; le moteur ne conserve que les
+        tables de voisins creuses.
+        
+        Args:
+            axis (str): 'user' (lignes de la matrice) ou 'item' (colonnes)
+            size (int): Nombre d'utilisateurs ou de produits comparés
+            
+        Returns:
+            Optional[pd.DataFrame]: Similarités indexées par ID, None sans matrice
+        """
+        if self.interaction_matrix is None:
+            return None
+        if axis == 'user':
+            vectors, id_map = self.interaction_matrix, self.user_id_map
+        elif axis == 'item':
+            vectors, id_map = self.interaction_matrix.T.tocsr(), self.product_id_map
+        else:
+            raise ValueError(f"Axe de similarité inconnu: {axis}")
+        
+        vectors = vectors[:size]
+        ids = id_map.ids[:vectors.shape[0]]
+        return pd.DataFrame(cosine_similarity(vectors), index=ids, columns=ids)
+    
+    def compute_graph_neighbors(self, block_size: int = 2048):
+        """
+        Calcule la table des voisins par marche aléatoire à 3 pas (P3-alpha).
+        
+        Sur le graphe biparti utilisateurs-produits, la probabilité d'aller
+        d'un produit i à un produit j en passant par un utilisateur est
+        W = P_iu^alpha @ P_ui^alpha, où P_ui et P_iu sont les matrices de
+        transition (lignes normalisées) de la matrice d'interactions binaire.
+        Le produit creux est calculé par blocs de lignes, chaque bloc étant
+        élagué aux n_neighbors meilleurs voisins avant le suivant.
+        
+        Args:
+            block_size (int): Nombre de produits traités par bloc (borne la mémoire)
+        """
+        try:
+            if self.interaction_matrix is None:
+                self.create_user_item_matrix()
+            
+            # Graphe biparti non pondéré
+            adjacency = self.interaction_matrix.copy().tocsr()
+            adjacency.data = np.ones_like(adjacency.data)
+            
+            user_to_item = _row_normalize(adjacency).power(self.graph_alpha).tocsr()
+            item_to_user = _row_normalize(adjacency.T.tocsr()).power(self.graph_alpha).tocsr()
+            
+            n_products = adjacency.shape[1]
+            blocks = []
+            for start in range(0, n_products, block_size):
+                walk = item_to_user[start:start + block_size] @ user_to_item
+                blocks.append(top_k_neighbors(walk, self.n_neighbors, row_offset=start))
+            self.graph_neighbors = sparse.vstack(blocks).tocsr() if blocks else sparse.csr_matrix((0, 0))
+            
+            logger.info(f"Table des voisins P3-alpha calculée (alpha={self.graph_alpha})")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul des voisins par marche aléatoire: {e}")
+            raise
+    
+    def compute_ease_model(self):
+        """
+        Entraîne le modèle EASE (autoencodeur linéaire produit-produit).
+        
+        Solution fermée : P = (XᵀX + λI)⁻¹ puis B = -P / diag(P), de
+        diagonale nulle. Une seule inversion de la matrice de Gram, en
+        float32 (produits² x 4 octets) ; au-delà de ease_max_products le
+        modèle n'est pas entraîné et la méthode se replie sur la popularité.
+        """
+        try:
+            if self.interaction_matrix is None:
+                self.create_user_item_matrix()
+            
+            n_products = self.interaction_matrix.shape[1]
+            if n_products > self.ease_max_products:
+                logger.warning(f"Catalogue trop grand pour EASE ({n_products} produits), modèle non entraîné")
+                self.ease_matrix = None
+                return
+            
+            # Matrice de Gram dense produits x produits, régularisée
+            interactions = self.interaction_matrix.astype(np.float32)
+            gram = (interactions.T @ interactions).toarray()
+            gram[np.diag_indices(n_products)] += self.ease_lambda
+            
+            precision = np.linalg.inv(gram)
+            weights = precision / -np.diag(precision)
+            weights[np.diag_indices(n_products)] = 0.0
+            self.ease_matrix = weights.astype(np.float32, copy=False)
+            
+            logger.info(f"Modèle EASE entraîné (lambda={self.ease_lambda})")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de l'entraînement du modèle EASE: {e}")
+            raise
+    
+    def train_svd_model(self, n_components: Optional[int] = None, warm_start: bool = True):
         """
         Entraîne un modèle SVD pour la factorisation matricielle.
         
+        La SVD randomisée travaille directement sur la matrice creuse ; si un
+        modèle existe déjà, ses composantes servent de point de départ.
+        
         Args:
-            n_components (int): Nombre de composantes pour la SVD
+            n_components (Optional[int]): Nombre de composantes pour la SVD
+                (par défaut celui du moteur, borné par le nombre de produits)
+            warm_start (bool): Démarrer depuis les composantes du modèle précédent
         """
         try:
-            if self.user_item_matrix is None:
+            if self.interaction_matrix is None:
                 self.create_user_item_matrix()
             
+            if n_components is None:
+                n_components = self.n_components
+            n_components = max(1, min(n_components, self.interaction_matrix.shape[1] - 1))
+            
+            user_ids = self.user_id_map.ids
+            product_ids = self.product_id_map.ids
+            
+            init_components = None
+            if warm_start and isinstance(self.svd_model, IncrementalSVD):
+                init_components = self.svd_model.warm_start_components(product_ids)
+            
             # Entraînement du modèle SVD
-            self.svd_model = TruncatedSVD(n_components=n_components, random_state=42)
-            self.svd_matrix = self.svd_model.fit_transform(self.user_item_matrix)
+            self.svd_model = IncrementalSVD(n_components=n_components, random_state=42)
+            self.svd_matrix = self.svd_model.fit_transform(
+                self.interaction_matrix,
+                row_ids=user_ids,
+                feature_ids=product_ids,
+                init_components=init_components
+            )
             
             logger.info(f"Modèle SVD entraîné avec {n_components} composantes")
             
@@ -196,6 +874,179 @@ class RecommendationEngine:
             logger.error(f"Erreur lors de l'entraînement du modèle SVD: {e}")
             raise
     
+    def update_svd_model(self):
+        """
+        Met à jour le modèle SVD de façon incrémentale après un rechargement des données.
+        
+        Les nouveaux produits (colonnes) puis les nouveaux utilisateurs (lignes)
+        sont intégrés par mises à jour de Brand par blocs, sans refactorisation
+        complète. Au-delà de svd_max_append_fraction de lignes ou de colonnes
+        ajoutées, un réentraînement à chaud coûte moins cher et est préféré.
+        Les nouveaux achats des utilisateurs déjà connus ne sont pas repris
+        (le fold-in les couvre) : un train_svd_model périodique reste nécessaire.
+        
+        Appelée par update_model(incremental_svd=True), qui recalcule ensuite
+        les segments et publie l'ensemble dans un même instantané.
+        """
+        try:
+            model = self.svd_model
+            if not isinstance(model, IncrementalSVD) or model.row_ids_ is None or model.feature_ids_ is None:
+                self.train_svd_model()
+                return
+            
+            # Le modèle courant peut appartenir à l'instantané publié : mise à jour sur une copie
+            model = copy.deepcopy(model)
+            
+            if self.interaction_matrix is None:
+                self.create_user_item_matrix()
+            
+            user_index = pd.Index(self.user_id_map.ids)
+            product_index = pd.Index(self.product_id_map.ids)
+            
+            # Un utilisateur ou produit disparu impose un réentraînement complet
+            if (user_index.get_indexer(model.row_ids_) < 0).any() or \
+                    (product_index.get_indexer(model.feature_ids_) < 0).any():
+                self.train_svd_model()
+                return
+            
+            matrix = self.interaction_matrix
+            new_products = product_index[~product_index.isin(model.feature_ids_)]
+            new_users = user_index[~user_index.isin(model.row_ids_)]
+            
+            # Trop d'ajouts : la SVD randomisée à chaud est plus rapide que les mises à jour de Brand
+            if len(new_users) > self.svd_max_append_fraction * len(model.row_ids_) or \
+                    len(new_products) > self.svd_max_append_fraction * len(model.feature_ids_):
+                logger.info(f"{len(new_users)} utilisateurs et {len(new_products)} produits ajoutés: "
+                            f"réentraînement SVD à chaud")
+                self.train_svd_model(warm_start=True)
+                return
+            
+            if len(new_products):
+                rows = user_index.get_indexer(model.row_ids_)
+                columns = product_index.get_indexer(new_products)
+                model.append_columns(matrix[rows][:, columns], feature_ids=new_products.to_numpy())
+            
+            if len(new_users):
+                rows = user_index.get_indexer(new_users)
+                columns = product_index.get_indexer(model.feature_ids_)
+                model.append_rows(matrix[rows][:, columns], row_ids=new_users.to_numpy())
+            
+            # Réalignement sur l'ordre des lignes et colonnes de la matrice courante
+            model.reindex(row_ids=user_index.to_numpy(), feature_ids=product_index.to_numpy())
+            self.svd_matrix = model.left_singular_vectors_ * model.singular_values_
+            self.svd_model = model
+            
+            logger.info(f"Modèle SVD mis à jour: {len(new_users)} utilisateurs et "
+                        f"{len(new_products)} produits ajoutés")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour du modèle SVD: {e}")
+            raise
+    
+    def compute_user_segments(self):
+        """
+        Regroupe les utilisateurs en segments par k-means mini-batch dans l'espace SVD.
+        
+        Les vecteurs latents sont normalisés (segments de goûts, indépendants du
+        volume d'achats). Les segment_top_n produits les plus achetés par les
+        membres de chaque segment sont précalculés : servir un segment coûte
+        une lecture de ligne.
+        """
+        try:
+            if self.svd_model is None:
+                self.train_svd_model()
+            
+            latents = _l2_normalize(np.asarray(self.svd_matrix, dtype=np.float64))
+            n_segments = max(1, min(self.n_segments, latents.shape[0]))
+            
+            kmeans = MiniBatchKMeans(n_clusters=n_segments, batch_size=1024, n_init=3, random_state=42)
+            labels = kmeans.fit_predict(latents)
+            
+            # Interactions cumulées des membres de chaque segment (segments x produits)
+            membership = sparse.csr_matrix(
+                (np.ones(len(labels)), (labels, np.arange(len(labels)))),
+                shape=(n_segments, len(labels))
+            )
+            segment_scores = (membership @ self.interaction_matrix).toarray()
+            
+            top_n = min(self.segment_top_n, segment_scores.shape[1])
+            order = np.argsort(-segment_scores, axis=1, kind='stable')[:, :top_n]
+            top_products = np.where(
+                np.take_along_axis(segment_scores, order, axis=1) > 0, order, -1
+            ).astype(np.int32)
+            
+            self.user_segments = labels.astype(np.int32)
+            self.segment_centroids = kmeans.cluster_centers_
+            self.segment_top_products = top_products
+            
+            logger.info(f"{n_segments} segments d'utilisateurs calculés")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul des segments d'utilisateurs: {e}")
+            raise
+    
+    def compute_transition_matrix(self):
+        """
+        Calcule le modèle séquentiel « ce que l'on achète ensuite ».
+        
+        Les achats sont regroupés en commandes (même horodatage) et ordonnés
+        par utilisateur ; chaque produit d'une commande est relié aux produits
+        de la commande suivante. Avec sequence_order > 1, les commandes plus
+        lointaines contribuent aussi, avec un poids sequence_decay^(écart - 1).
+        Les comptages sont normalisés par ligne en probabilités de transition.
+        """
+        try:
+            if self.interaction_matrix is None:
+                self.create_user_item_matrix()
+            
+            if self.df.empty or 'timestamp' not in self.df.columns:
+                logger.warning("Aucun horodatage disponible pour le modèle séquentiel")
+                return
+            
+            events = pd.DataFrame({
+                'user': self.user_id_map.get_indexer(self.df['user_id'].to_numpy()),
+                'product': self.product_id_map.get_indexer(self.df['product_id'].to_numpy()),
+                'timestamp': pd.to_datetime(self.df['timestamp'])
+            })
+            events = events[(events['user'] >= 0) & (events['product'] >= 0)].dropna().drop_duplicates()
+            
+            # Rang de la commande dans l'historique de l'utilisateur (0 = la plus récente)
+            events['order'] = events.groupby('user')['timestamp'].rank(method='dense', ascending=False)
+            events['order'] = events['order'].astype(np.int64) - 1
+            events = events[['user', 'order', 'product']]
+            
+            n_users, n_products = len(self.user_id_map), len(self.product_id_map)
+            rows, columns, weights = [], [], []
+            for gap in range(1, self.sequence_order + 1):
+                # Commande de rang r + gap (précédente) alignée sur la commande de rang r (suivante)
+                previous = events.rename(columns={'product': 'previous'})
+                previous['order'] -= gap
+                pairs = events.merge(previous, on=['user', 'order'])
+                pairs = pairs[pairs['previous'] != pairs['product']]
+                rows.append(pairs['previous'].to_numpy())
+                columns.append(pairs['product'].to_numpy())
+                weights.append(np.full(len(pairs), self.sequence_decay ** (gap - 1)))
+            
+            counts = sparse.csr_matrix(
+                (np.concatenate(weights), (np.concatenate(rows), np.concatenate(columns))),
+                shape=(n_products, n_products)
+            )
+            self.transition_matrix = _row_normalize(counts)
+            
+            # Dernières commandes de chaque utilisateur, point de départ des prédictions
+            recent = events[events['order'] < self.sequence_order]
+            self.recent_history = sparse.csr_matrix(
+                (self.sequence_decay ** recent['order'].to_numpy(dtype=np.float64),
+                 (recent['user'].to_numpy(), recent['product'].to_numpy())),
+                shape=(n_users, n_products)
+            )
+            
+            logger.info(f"Modèle séquentiel calculé: {self.transition_matrix.nnz} transitions")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul du modèle séquentiel: {e}")
+            raise
+    
     def compute_product_popularity(self):
         """
         Calcule la popularité des produits basée sur les ventes.
@@ -214,218 +1065,834 @@ class RecommendationEngine:
             logger.error(f"Erreur lors du calcul de la popularité: {e}")
             raise
     
-    def get_user_recommendations(self, user_id: int, limit: int = 5, method: str = 'hybrid') -> List[int]:
+    def publish(self, covered_sequence: Optional[int] = None) -> ModelSnapshot:
+        """
+        Publie l'état entraîné courant sous forme d'instantané immuable.
+        
+        Le remplacement de la référence `model` est atomique : les requêtes
+        en cours terminent sur l'ancien instantané, les suivantes lisent le
+        nouveau. Les achats récents couverts par les données du nouvel
+        instantané sont oubliés ; ceux enregistrés après le chargement de
+        ces données restent appliqués au nouvel instantané.
+        
+        Args:
+            covered_sequence (Optional[int]): Numéro de la dernière interaction
+                couverte par les données d'entraînement (interaction_sequence
+                relevé avant leur chargement) ; None = aucune
+        
+        Returns:
+            ModelSnapshot: Instantané publié
+        """
+        with self._write_lock, self._availability_lock:
+            user_ids = self.user_id_map if self.user_id_map is not None else IdMap([])
+            product_ids = self.product_id_map
+            if product_ids is None:
+                product_ids = IdMap(self.product_popularity.index if self.product_popularity is not None else [])
+            
+            # Attributs du catalogue alignés sur les positions produits
+            product_attributes = None
+            if self.product_attributes is not None:
+                product_attributes = self.product_attributes.reindex(product_ids.ids)
+            
+            popular_products = None
+            if self.product_popularity is not None:
+                popular_products = product_ids.get_indexer(self.product_popularity.index.to_numpy())
+                popular_products = popular_products[popular_products >= 0]
+            
+            snapshot = ModelSnapshot(
+                fold_in_cache_size=self.fold_in_cache_size,
+                interaction_matrix=self.interaction_matrix,
+                user_ids=user_ids,
+                product_ids=product_ids,
+                user_neighbors=self.user_neighbors,
+                item_similarity=self.item_similarity_matrix,
+                item_neighbors=self.item_neighbors,
+                graph_neighbors=self.graph_neighbors,
+                ease_matrix=self.ease_matrix,
+                svd_components=self.svd_model.components_ if self.svd_model is not None else None,
+                svd_matrix=self.svd_matrix,
+                user_segments=self.user_segments,
+                segment_centroids=self.segment_centroids,
+                segment_top_products=self.segment_top_products,
+                transition_matrix=self.transition_matrix,
+                recent_history=self.recent_history,
+                popular_products=popular_products,
+                availability=AvailabilityMask(product_ids, self.unavailable_products),
+                product_attributes=product_attributes
+            )
+            self.model = snapshot
+            if covered_sequence is not None:
+                self._forget_interactions(covered_sequence)
+            
+            logger.info("Instantané du modèle de recommandation publié")
+            return snapshot
+    
+    def _snapshot(self) -> Optional[ModelSnapshot]:
+        """
+        Retourne l'instantané courant.
+        
+        Si aucun n'a encore été publié (étapes d'entraînement appelées une à une),
+        l'état entraîné est publié à la première lecture, sauf si une écriture
+        est en cours : la lecture ne bloque jamais.
+        """
+        model = self.model
+        if model is None and (self.interaction_matrix is not None or self.product_popularity is not None):
+            if self._write_lock.acquire(blocking=False):
+                try:
+                    model = self.model or self.publish()
+                finally:
+                    self._write_lock.release()
+        return model
+    
+    def get_user_recommendations(self, user_id: int, limit: int = 5, method: str = 'hybrid',
+                                 page: Optional[str] = None) -> List[int]:
         """
         Génère des recommandations pour un utilisateur donné.
         
         Args:
             user_id (int): ID de l'utilisateur
             limit (int): Nombre de recommandations à retourner
-            method (str): Méthode de recommandation ('user', 'item', 'svd', 'popular', 'hybrid')
+            method (str): Méthode de recommandation ('user', 'item', 'graph', 'ease', 'svd',
+                'segment', 'sequential', 'popular', 'hybrid')
+            page (Optional[str]): Page affichant les recommandations (sélection des règles métier)
             
         Returns:
             List[int]: Liste des IDs des produits recommandés
         """
+        start = time.perf_counter()
         try:
+            model = self._snapshot()
+            if model is None:
+                logger.warning("Aucun modèle de recommandation publié")
+                return []
+            
             if method == 'user':
-                return self._get_user_based_recommendations(user_id, limit)
+                return self._get_user_based_recommendations(model, user_id, limit, page)
             elif method == 'item':
-                return self._get_item_based_recommendations(user_id, limit)
+                return self._get_item_based_recommendations(model, user_id, limit, page)
+            elif method == 'graph':
+                return self._get_batch_neighbor_recommendations(model, 'graph', [user_id], limit, page)[0]
+            elif method == 'ease':
+                return self._get_batch_ease_recommendations(model, [user_id], limit, page)[0]
             elif method == 'svd':
-                return self._get_svd_recommendations(user_id, limit)
+                return self._get_svd_recommendations(model, user_id, limit, page)
+            elif method == 'segment':
+                return self._get_segment_recommendations(model, user_id, limit, page)
+            elif method == 'sequential':
+                return self._get_sequential_recommendations(model, user_id, limit, page)
             elif method == 'popular':
-                return self._get_popular_recommendations(user_id, limit)
+                return self._get_popular_recommendations(model, user_id, limit, page)
             elif method == 'hybrid':
-                return self._get_hybrid_recommendations(user_id, limit)
+                return self._get_hybrid_recommendations(model, user_id, limit, page)
             else:
                 raise ValueError(f"Méthode de recommandation inconnue: {method}")
                 
         except Exception as e:
+            self.metrics.record_error(method)
             logger.error(f"Erreur lors de la génération des recommandations: {e}")
             return []
+        
+        finally:
+            self.metrics.observe_request(method, time.perf_counter() - start)
     
-    def _get_user_based_recommendations(self, user_id: int, limit: int) -> List[int]:
+    def _fallback_to_popular(self, model: ModelSnapshot, method: str, user_id: int, limit: int,
+                             page: Optional[str] = None) -> List[int]:
+        """
+        Replie une méthode personnalisée sur les recommandations populaires.
+        """
+        self.metrics.record_fallback(method)
+        return self._get_popular_recommendations(model, user_id, limit, page)
+    
+    def _get_user_based_recommendations(self, model: ModelSnapshot, user_id: int, limit: int,
+                                        page: Optional[str] = None) -> List[int]:
         """
         Recommandations basées sur la similarité utilisateur.
         """
-        if self.user_similarity_df is None:
-            self.compute_user_similarity()
+        position = model.user_ids.get_loc(user_id)
+        if model.user_neighbors is None or position < 0:
+            return self._fallback_to_popular(model, 'user', user_id, limit, page)
         
-        if user_id not in self.user_similarity_df.index:
-            return self._get_popular_recommendations(user_id, limit)
+        timer = self.metrics.stage_timer('user')
         
-        # Utilisateurs similaires
-        similar_users = self.user_similarity_df[user_id].sort_values(ascending=False)[1:6]
+        # Utilisateurs similaires, du plus proche au moins proche (l'utilisateur lui-même exclu)
+        neighbors = model.user_neighbors
+        start, end = neighbors.indptr[position], neighbors.indptr[position + 1]
+        order = np.lexsort((neighbors.indices[start:end], -neighbors.data[start:end]))
+        similar_users = neighbors.indices[start:end][order]
+        timer.mark('lookup')
         
         # Produits achetés par les utilisateurs similaires
-        recommendations = []
-        for similar_user_id, similarity in similar_users.items():
-            user_purchases = self.df[self.df['user_id'] == similar_user_id]['product_id'].unique()
-            recommendations.extend(user_purchases)
+        matrix = model.interaction_matrix
+        recommendations = np.concatenate(
+            [matrix.indices[matrix.indptr[u]:matrix.indptr[u + 1]] for u in similar_users]
+        ) if len(similar_users) else np.empty(0, dtype=np.int64)
+        timer.mark('scoring')
         
         # Filtrage des produits déjà achetés par l'utilisateur
-        user_purchases = self.df[self.df['user_id'] == user_id]['product_id'].unique()
-        recommendations = [p for p in recommendations if p not in user_purchases]
+        user_purchases = self._get_user_purchases(model, user_id)
+        recommendations = recommendations[~np.isin(recommendations, user_purchases)]
+        recommendations = recommendations[self._allowed_products(model, page)[recommendations]]
+        timer.mark('filtering')
+        
+        # Déduplication (ordre conservé) et limitation
+        _, first = np.unique(recommendations, return_index=True)
+        unique_recommendations = model.product_ids.take(recommendations[np.sort(first)][:limit])
+        timer.mark('top_n')
         
-        # Déduplication et limitation
-        unique_recommendations = list(dict.fromkeys(recommendations))[:limit]
+        # Voisins trop peu nombreux : liste complétée par les produits populaires
+        if len(unique_recommendations) < limit:
+            seen = set(unique_recommendations)
+            popular = self._fallback_to_popular(model, 'user', user_id, limit, page)
+            unique_recommendations = unique_recommendations + [
+                product_id for product_id in popular if product_id not in seen
+            ][:limit - len(unique_recommendations)]
         
         return unique_recommendations
     
-    def _get_item_based_recommendations(self, user_id: int, limit: int) -> List[int]:
+    def _get_item_based_recommendations(self, model: ModelSnapshot, user_id: int, limit: int,
+                                        page: Optional[str] = None) -> List[int]:
         """
         Recommandations basées sur la similarité produit.
         """
-        if self.item_similarity_df is None:
-            self.compute_item_similarity()
+        return self._get_batch_neighbor_recommendations(model, 'item', [user_id], limit, page)[0]
+    
+    def record_interaction(self, user_id, product_id, quantity: int = 1):
+        """
+        Enregistre un achat survenu depuis le dernier entraînement.
         
-        if user_id not in self.user_item_matrix.index:
-            return self._get_popular_recommendations(user_id, limit)
+        L'utilisateur est alors projeté à la volée dans l'espace SVD
+        (fold-in) sans attendre le prochain update_model.
         
-        # Produits achetés par l'utilisateur
-        user_purchases = self.df[self.df['user_id'] == user_id]['product_id'].unique()
+        Args:
+            user_id: ID de l'utilisateur
+            product_id: ID du produit acheté
+            quantity (int): Quantité achetée
+        """
+        with self._fresh_lock:
+            self._interaction_sequence += 1
+            self._fresh_log.append((self._interaction_sequence, user_id, product_id, quantity))
+            
+            # Copie puis remplacement : les lecteurs ne voient jamais un dictionnaire en cours de modification
+            user_interactions = dict(self.fresh_interactions.get(user_id, {}))
+            user_interactions[product_id] = user_interactions.get(product_id, 0) + quantity
+            self.fresh_interactions[user_id] = user_interactions
         
-        if not user_purchases:
-            return self._get_popular_recommendations(user_id, limit)
+        model = self.model
+        if model is not None:
+            model.fold_in_cache.invalidate(user_id)
+    
+    def interaction_sequence(self) -> int:
+        """
+        Retourne le numéro de la dernière interaction enregistrée.
         
-        # Calcul des scores de similarité
-        scores = {}
-        for purchased_product in user_purchases:
-            if purchased_product in self.item_similarity_df.index:
-                similar_products = self.item_similarity_df[purchased_product].sort_values(ascending=False)[1:6]
-                for product_id, similarity in similar_products.items():
-                    if product_id not in user_purchases:
-                        scores[product_id] = scores.get(product_id, 0) + similarity
+        À relever avant de charger les données d'entraînement, puis à passer
+        à update_model : les interactions suivantes survivent à la publication.
         
-        # Tri par score et limitation
-        recommendations = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]
-        return [product_id for product_id, _ in recommendations]
+        Returns:
+            int: Numéro de séquence (0 si aucune interaction)
+        """
+        with self._fresh_lock:
+            return self._interaction_sequence
     
-    def _get_svd_recommendations(self, user_id: int, limit: int) -> List[int]:
+    def _forget_interactions(self, covered_sequence: int):
+        """
+        Oublie les interactions couvertes par les données d'entraînement et rejoue les suivantes.
+        """
+        with self._fresh_lock:
+            self._fresh_log = [entry for entry in self._fresh_log if entry[0] > covered_sequence]
+            fresh_interactions = {}
+            for _, user_id, product_id, quantity in self._fresh_log:
+                user_interactions = fresh_interactions.setdefault(user_id, {})
+                user_interactions[product_id] = user_interactions.get(product_id, 0) + quantity
+            self.fresh_interactions = fresh_interactions
+    
+    def _get_user_purchases(self, model: ModelSnapshot, user_id) -> np.ndarray:
+        """
+        Retourne les positions des produits achetés par l'utilisateur (historique et achats récents).
+        """
+        position = model.user_ids.get_loc(user_id)
+        if position >= 0 and model.interaction_matrix is not None:
+            matrix = model.interaction_matrix
+            user_purchases = matrix.indices[matrix.indptr[position]:matrix.indptr[position + 1]]
+        else:
+            user_purchases = np.empty(0, dtype=np.int64)
+        
+        fresh = self.fresh_interactions.get(user_id)
+        if fresh:
+            fresh_positions = model.product_ids.get_indexer(list(fresh))
+            user_purchases = np.union1d(user_purchases, fresh_positions[fresh_positions >= 0])
+        return user_purchases
+    
+    def _build_user_vector(self, model: ModelSnapshot, user_id) -> Optional[np.ndarray]:
+        """
+        Construit le vecteur d'interactions courant d'un utilisateur sur les produits du modèle.
+        
+        Les achats récents sont moyennés avec le rating déjà connu du produit.
+        
+        Returns:
+            Optional[np.ndarray]: Vecteur dense (un rating par produit), None si
+                l'utilisateur n'a acheté aucun produit connu du modèle
+        """
+        vector = np.zeros(len(model.product_ids), dtype=np.float64)
+        position = model.user_ids.get_loc(user_id)
+        if position >= 0:
+            matrix = model.interaction_matrix
+            start, end = matrix.indptr[position], matrix.indptr[position + 1]
+            vector[matrix.indices[start:end]] = matrix.data[start:end]
+        
+        fresh = self.fresh_interactions.get(user_id)
+        if fresh:
+            columns = model.product_ids.get_indexer(list(fresh))
+            ratings = np.minimum(np.fromiter(fresh.values(), dtype=np.float64, count=len(fresh)), 5)
+            known = columns >= 0
+            columns, ratings = columns[known], ratings[known]
+            current = vector[columns]
+            vector[columns] = np.where(current > 0, (current + ratings) / 2, ratings)
+        
+        if not vector.any():
+            return None
+        return vector
+    
+    def fold_in_user(self, user_id, model: Optional[ModelSnapshot] = None) -> Optional[np.ndarray]:
+        """
+        Projette un utilisateur dans l'espace latent SVD sans réentraînement.
+        
+        Le vecteur d'interactions courant est multiplié par les composantes
+        du modèle (un seul produit matrice-vecteur) ; le résultat est mis
+        en cache LRU jusqu'au prochain achat de l'utilisateur.
+        
+        Args:
+            user_id: ID de l'utilisateur
+            model (Optional[ModelSnapshot]): Instantané utilisé (le courant par défaut)
+            
+        Returns:
+            Optional[np.ndarray]: Vecteur latent, None si aucune interaction exploitable
+        """
+        model = model or self._snapshot()
+        if model is None or model.svd_components is None:
+            return None
+        
+        latent = model.fold_in_cache.get(user_id)
+        self.metrics.record_cache('fold_in', latent is not None)
+        if latent is not None:
+            return latent
+        
+        vector = self._build_user_vector(model, user_id)
+        if vector is None:
+            return None
+        
+        latent = model.svd_components @ vector
+        model.fold_in_cache.put(user_id, latent)
+        return latent
+    
+    def _get_svd_recommendations(self, model: ModelSnapshot, user_id: int, limit: int,
+                                 page: Optional[str] = None) -> List[int]:
         """
         Recommandations basées sur la factorisation matricielle SVD.
+        
+        Les utilisateurs absents de l'entraînement, ou ayant acheté depuis,
+        sont projetés à la volée (fold-in) dans l'espace latent.
         """
-        if self.svd_model is None:
-            self.train_svd_model()
+        return self._get_batch_svd_recommendations(model, [user_id], limit, page)[0]
+    
+    def _user_segment(self, model: ModelSnapshot, user_id) -> int:
+        """
+        Retourne le segment d'un utilisateur, -1 s'il n'a aucune interaction exploitable.
+        
+        Les utilisateurs absents de l'entraînement, ou ayant acheté depuis, sont
+        projetés dans l'espace SVD (fold-in) puis rattachés au centre le plus proche.
+        """
+        position = model.user_ids.get_loc(user_id)
+        if position >= 0 and user_id not in self.fresh_interactions:
+            return int(model.user_segments[position])
         
-        if user_id not in self.user_item_matrix.index:
-            return self._get_popular_recommendations(user_id, limit)
+        latent = self.fold_in_user(user_id, model)
+        if latent is None:
+            return -1
+        distances = ((model.segment_centroids - _l2_normalize(latent)) ** 2).sum(axis=1)
+        return int(np.argmin(distances))
+    
+    def _get_segment_recommendations(self, model: ModelSnapshot, user_id: int, limit: int,
+                                     page: Optional[str] = None) -> List[int]:
+        """
+        Recommandations du segment de l'utilisateur (liste précalculée).
+        """
+        if model.segment_top_products is None:
+            return self._fallback_to_popular(model, 'segment', user_id, limit, page)
         
-        # Index de l'utilisateur dans la matrice
-        user_index = self.user_item_matrix.index.get_loc(user_id)
+        timer = self.metrics.stage_timer('segment')
         
-        # Prédiction des scores pour tous les produits
-        user_svd = self.svd_matrix[user_index]
-        predicted_scores = self.svd_model.inverse_transform([user_svd])[0]
+        segment = self._user_segment(model, user_id)
+        if segment < 0:
+            return self._fallback_to_popular(model, 'segment', user_id, limit, page)
+        candidates = model.segment_top_products[segment]
+        candidates = candidates[candidates >= 0]
+        timer.mark('lookup')
         
-        # Création d'un DataFrame avec les scores prédits
-        scores_df = pd.DataFrame({
-            'product_id': self.user_item_matrix.columns,
-            'predicted_score': predicted_scores
-        })
+        # Filtrage des produits déjà achetés et des produits non recommandables
+        candidates = candidates[~np.isin(candidates, self._get_user_purchases(model, user_id))]
+        candidates = candidates[self._allowed_products(model, page)[candidates]]
+        timer.mark('filtering')
+        
+        if len(candidates) == 0:
+            return self._fallback_to_popular(model, 'segment', user_id, limit, page)
+        recommendations = model.product_ids.take(candidates[:limit])
+        timer.mark('top_n')
+        return recommendations
+    
+    def _get_sequential_recommendations(self, model: ModelSnapshot, user_id: int, limit: int,
+                                        page: Optional[str] = None) -> List[int]:
+        """
+        Recommandations séquentielles : produits achetés ensuite par les autres clients.
+        
+        Le score est la ligne d'historique récent de l'utilisateur multipliée
+        par la matrice de transition (lecture de lignes creuses), puis top-N.
+        Des achats récents non encore intégrés deviennent la dernière commande.
+        """
+        if model.transition_matrix is None:
+            return self._fallback_to_popular(model, 'sequential', user_id, limit, page)
+        
+        timer = self.metrics.stage_timer('sequential')
+        
+        n_products = model.transition_matrix.shape[0]
+        position = model.user_ids.get_loc(user_id)
+        if position >= 0 and model.recent_history is not None:
+            history = model.recent_history[position]
+        else:
+            history = sparse.csr_matrix((1, n_products))
+        
+        fresh = self.fresh_interactions.get(user_id)
+        if fresh:
+            columns = model.product_ids.get_indexer(list(fresh))
+            columns = columns[columns >= 0]
+            latest = sparse.csr_matrix(
+                (np.ones(len(columns)), (np.zeros(len(columns), dtype=np.int64), columns)),
+                shape=(1, n_products)
+            )
+            history = latest + history * self.sequence_decay
+        
+        if history.nnz == 0:
+            return self._fallback_to_popular(model, 'sequential', user_id, limit, page)
+        timer.mark('lookup')
+        
+        # Probabilité pondérée d'acheter chaque produit ensuite
+        scores = (history @ model.transition_matrix).toarray()
+        scores[scores <= 0] = -np.inf
+        timer.mark('scoring')
         
         # Filtrage des produits déjà achetés
-        user_purchases = self.df[self.df['user_id'] == user_id]['product_id'].unique()
-        scores_df = scores_df[~scores_df['product_id'].isin(user_purchases)]
+        scores[0, self._get_user_purchases(model, user_id)] = -np.inf
+        timer.mark('filtering')
         
-        # Tri par score prédit et limitation
-        recommendations = scores_df.nlargest(limit, 'predicted_score')['product_id'].tolist()
+        recommendations = self._top_n(model, scores, limit, page)[0]
+        timer.mark('top_n')
         
+        if not recommendations:
+            return self._fallback_to_popular(model, 'sequential', user_id, limit, page)
         return recommendations
     
-    def _get_popular_recommendations(self, user_id: int, limit: int) -> List[int]:
+    def get_batch_recommendations(self, user_ids: List, limit: int = 5, method: str = 'hybrid',
+                                  page: Optional[str] = None) -> List[List]:
         """
-        Recommandations basées sur la popularité des produits.
+        Génère des recommandations pour un lot d'utilisateurs.
+        
+        Les méthodes 'svd', 'item', 'graph', 'ease' et 'hybrid' scorent tout le lot en une
+        seule passe matricielle ; les autres méthodes traitent les utilisateurs un par un.
+        
+        Args:
+            user_ids (List): IDs des utilisateurs
+            limit (int): Nombre de recommandations par utilisateur
+            method (str): Méthode de recommandation
+            page (Optional[str]): Page affichant les recommandations (sélection des règles métier)
+            
+        Returns:
+            List[List]: Recommandations de chaque utilisateur, dans l'ordre de user_ids
         """
-        if self.product_popularity is None:
-            self.compute_product_popularity()
+        if method not in ('svd', 'item', 'graph', 'ease', 'hybrid'):
+            return [self.get_user_recommendations(user_id, limit, method, page) for user_id in user_ids]
         
-        if self.product_popularity is None or self.product_popularity.empty:
-            return []
+        start = time.perf_counter()
+        try:
+            model = self._snapshot()
+            if model is None:
+                logger.warning("Aucun modèle de recommandation publié")
+                return [[] for _ in user_ids]
+            
+            if method == 'svd':
+                return self._get_batch_svd_recommendations(model, user_ids, limit, page)
+            if method == 'ease':
+                return self._get_batch_ease_recommendations(model, user_ids, limit, page)
+            if method == 'hybrid':
+                return self._get_batch_hybrid_recommendations(model, user_ids, limit, page)
+            return self._get_batch_neighbor_recommendations(model, method, user_ids, limit, page)
+            
+        except Exception as e:
+            self.metrics.record_error(method)
+            logger.error(f"Erreur lors de la génération des recommandations par lot: {e}")
+            return [[] for _ in user_ids]
         
-        # Filtrage des produits déjà achetés par l'utilisateur
-        user_purchases = self.df[self.df['user_id'] == user_id]['product_id'].unique()
-        popular_products = self.product_popularity[~self.product_popularity.index.isin(user_purchases)]
+        finally:
+            self.metrics.observe_request(f'{method}_batch', time.perf_counter() - start)
+    
+    def _get_batch_user_rows(self, model: ModelSnapshot, user_ids: List):
+        """
+        Construit les lignes d'interactions courantes d'un lot d'utilisateurs.
+        
+        Returns:
+            Tuple: (matrice creuse lot x produits, masque des utilisateurs sans interaction connue)
+        """
+        n_products = model.interaction_matrix.shape[1]
+        positions = model.user_ids.get_indexer(user_ids)
+        trained = np.array([
+            position >= 0 and user_id not in self.fresh_interactions
+            for user_id, position in zip(user_ids, positions)
+        ], dtype=bool)
         
-        return popular_products.head(limit).index.tolist()
+        rows = model.interaction_matrix[np.where(trained, positions, 0)]
+        rows = sparse.diags(trained.astype(np.float64)) @ rows
+        
+        # Utilisateurs non entraînés ou ayant acheté depuis : vecteur reconstruit
+        extra = sparse.lil_matrix((len(user_ids), n_products))
+        empty = np.zeros(len(user_ids), dtype=bool)
+        for i in np.flatnonzero(~trained):
+            vector = self._build_user_vector(model, user_ids[i])
+            if vector is None:
+                empty[i] = True
+            else:
+                extra[i] = vector
+        
+        return sparse.csr_matrix(rows + extra.tocsr()), empty
     
-    def _get_hybrid_recommendations(self, user_id: int, limit: int) -> List[int]:
+    def _top_n(self, model: ModelSnapshot, scores: np.ndarray, limit: int,
+               page: Optional[str] = None) -> List[List]:
         """
-        Recommandations hybrides combinant plusieurs méthodes.
+        Sélectionne les meilleurs produits recommandables de chaque ligne de scores (-inf = exclu).
+        """
+        # Coefficients des règles métier sur les scores positifs
+        compiled = self._compiled_rules(model, page)
+        if compiled is not None and compiled.boost is not None:
+            scores = np.where(scores > 0, scores * compiled.boost, scores)
+        
+        # Produits indisponibles ou exclus par les règles retirés avant la sélection, pour tout le lot
+        allowed = self._allowed_products(model, page)
+        if len(allowed) == scores.shape[1] and not allowed.all():
+            scores[:, ~allowed] = -np.inf
+        
+        results = []
+        for row in scores:
+            k = min(limit, len(row))
+            if k == 0:
+                results.append([])
+                continue
+            candidates = np.argpartition(-row, k - 1)[:k]
+            candidates = candidates[np.argsort(-row[candidates], kind='stable')]
+            candidates = candidates[np.isfinite(row[candidates])]
+            results.append(model.product_ids.take(candidates))
+        return results
+    
+    def _get_batch_svd_recommendations(self, model: ModelSnapshot, user_ids: List, limit: int,
+                                       page: Optional[str] = None) -> List[List]:
+        """
+        Recommandations SVD d'un lot : une seule multiplication latents x composantes.
+        """
+        if model.svd_components is None:
+            return [self._fallback_to_popular(model, 'svd', user_id, limit, page) for user_id in user_ids]
+        
+        timer = self.metrics.stage_timer('svd')
+        
+        positions = model.user_ids.get_indexer(user_ids)
+        latents = np.zeros((len(user_ids), model.svd_components.shape[0]))
+        fallback = np.zeros(len(user_ids), dtype=bool)
+        for i, (user_id, position) in enumerate(zip(user_ids, positions)):
+            if position >= 0 and user_id not in self.fresh_interactions:
+                latents[i] = model.svd_matrix[position]
+            else:
+                latent = self.fold_in_user(user_id, model)
+                if latent is None:
+                    fallback[i] = True
+                else:
+                    latents[i] = latent
+        rows, _ = self._get_batch_user_rows(model, user_ids)
+        timer.mark('lookup')
+        
+        # Prédiction des scores pour tous les produits
+        scores = latents @ model.svd_components
+        timer.mark('scoring')
+        
+        # Filtrage des produits déjà achetés
+        purchased_rows, purchased_columns = rows.nonzero()
+        scores[purchased_rows, purchased_columns] = -np.inf
+        timer.mark('filtering')
+        
+        # Tri par score prédit et limitation
+        results = self._top_n(model, scores, limit, page)
+        timer.mark('top_n')
+        
+        for i in np.flatnonzero(fallback):
+            results[i] = self._fallback_to_popular(model, 'svd', user_ids[i], limit, page)
+        return results
+    
+    def _get_batch_neighbor_recommendations(self, model: ModelSnapshot, method: str, user_ids: List,
+                                            limit: int, page: Optional[str] = None) -> List[List]:
+        """
+        Recommandations d'un lot par table de voisins : produits achetés x table des voisins.
+        
+        Args:
+            model (ModelSnapshot): Instantané utilisé
+            method (str): 'item' (similarité cosinus) ou 'graph' (marche aléatoire P3-alpha)
+            user_ids (List): IDs des utilisateurs
+            limit (int): Nombre de recommandations par utilisateur
+            page (Optional[str]): Page affichant les recommandations
         """
-        # Récupération des recommandations de chaque méthode
-        user_recs = self._get_user_based_recommendations(user_id, limit * 2)
-        item_recs = self._get_item_based_recommendations(user_id, limit * 2)
-        popular_recs = self._get_popular_recommendations(user_id, limit * 2)
+        neighbors = model.graph_neighbors if method == 'graph' else model.item_neighbors
+        if neighbors is None:
+            return [self._fallback_to_popular(model, method, user_id, limit, page) for user_id in user_ids]
         
-        # Combinaison avec pondération
-        all_recommendations = []
+        timer = self.metrics.stage_timer(method)
         
-        # Pondération des méthodes
-        weights = {'user': 0.4, 'item': 0.4, 'popular': 0.2}
+        # Produits achetés par les utilisateurs
+        rows, empty = self._get_batch_user_rows(model, user_ids)
+        purchased = rows.copy()
+        purchased.data = np.ones_like(purchased.data)
+        timer.mark('lookup')
         
-        # Ajout des recommandations avec pondération
-        for rec in user_recs:
-            all_recommendations.append((rec, weights['user']))
+        # Somme des similarités des voisins de chaque produit acheté
+        scores = (purchased @ neighbors).toarray()
+        scores[scores <= 0] = -np.inf
+        timer.mark('scoring')
         
-        for rec in item_recs:
-            all_recommendations.append((rec, weights['item']))
+        # Filtrage des produits déjà achetés
+        purchased_rows, purchased_columns = purchased.nonzero()
+        scores[purchased_rows, purchased_columns] = -np.inf
+        timer.mark('filtering')
         
-        for rec in popular_recs:
-            all_recommendations.append((rec, weights['popular']))
+        # Tri par score et limitation
+        results = self._top_n(model, scores, limit, page)
+        timer.mark('top_n')
         
-        # Agrégation des scores
-        scores = {}
-        for product_id, weight in all_recommendations:
-            scores[product_id] = scores.get(product_id, 0) + weight
+        for i in np.flatnonzero(empty):
+            results[i] = self._fallback_to_popular(model, method, user_ids[i], limit, page)
+        return results
+    
+    def _get_batch_ease_recommendations(self, model: ModelSnapshot, user_ids: List, limit: int,
+                                        page: Optional[str] = None) -> List[List]:
+        """
+        Recommandations EASE d'un lot : lignes creuses d'interactions x matrice EASE dense.
+        """
+        if model.ease_matrix is None:
+            return [self._fallback_to_popular(model, 'ease', user_id, limit, page) for user_id in user_ids]
+        
+        timer = self.metrics.stage_timer('ease')
+        
+        rows, empty = self._get_batch_user_rows(model, user_ids)
+        rows = rows.astype(np.float32)
+        timer.mark('lookup')
+        
+        # Scores reconstruits pour tous les produits
+        scores = np.asarray(rows @ model.ease_matrix)
+        timer.mark('scoring')
+        
+        # Filtrage des produits déjà achetés
+        purchased_rows, purchased_columns = rows.nonzero()
+        scores[purchased_rows, purchased_columns] = -np.inf
+        timer.mark('filtering')
         
         # Tri par score et limitation
-        recommendations = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]
-        return [product_id for product_id, _ in recommendations]
+        results = self._top_n(model, scores, limit, page)
+        timer.mark('top_n')
+        
+        for i in np.flatnonzero(empty):
+            results[i] = self._fallback_to_popular(model, 'ease', user_ids[i], limit, page)
+        return results
+    
+    def _get_popular_recommendations(self, model: ModelSnapshot, user_id: int, limit: int,
+                                     page: Optional[str] = None) -> List[int]:
+        """
+        Recommandations basées sur la popularité des produits.
+        """
+        if model.popular_products is None or len(model.popular_products) == 0:
+            return []
+        
+        timer = self.metrics.stage_timer('popular')
+        
+        # Filtrage des produits déjà achetés par l'utilisateur
+        user_purchases = self._get_user_purchases(model, user_id)
+        timer.mark('lookup')
+        popular_products = model.popular_products
+        popular_products = popular_products[self._allowed_products(model, page)[popular_products]]
+        if len(user_purchases):
+            # Seuls les limit + nb_achats premiers produits peuvent être retenus
+            head = popular_products[:limit + len(user_purchases)]
+            popular_products = head[~np.isin(head, user_purchases)]
+        timer.mark('filtering')
+        
+        recommendations = model.product_ids.take(popular_products[:limit])
+        timer.mark('top_n')
+        return recommendations
     
-    def get_similar_products(self, product_id: int, limit: int = 5) -> List[int]:
+    def _get_hybrid_recommendations(self, model: ModelSnapshot, user_id: int, limit: int,
+                                    page: Optional[str] = None) -> List[int]:
+        """
+        Recommandations hybrides combinant plusieurs méthodes.
+        """
+        return self._get_batch_hybrid_recommendations(model, [user_id], limit, page)[0]
+    
+    def _get_batch_hybrid_recommendations(self, model: ModelSnapshot, user_ids: List, limit: int,
+                                          page: Optional[str] = None) -> List[List]:
+        """
+        Recommandations hybrides d'un lot : une matrice de scores utilisateur et une
+        matrice de scores produit pour tout le lot, mélangées avec hybrid_weights.
+        
+        Chaque composante est ramenée à [0, 1] par son maximum sur la ligne ; la
+        popularité contribue selon le rang du produit. Les utilisateurs peu actifs
+        (moins de segment_min_purchases produits achetés) reçoivent directement la
+        liste de leur segment.
+        
+        Args:
+            model (ModelSnapshot): Instantané utilisé
+            user_ids (List): IDs des utilisateurs
+            limit (int): Nombre de recommandations par utilisateur
+            page (Optional[str]): Page affichant les recommandations
+        """
+        timer = self.metrics.stage_timer('hybrid')
+        
+        # Produits achetés par les utilisateurs
+        rows, empty = self._get_batch_user_rows(model, user_ids)
+        purchased = rows.copy()
+        purchased.data = np.ones_like(purchased.data)
+        n_purchases = purchased.getnnz(axis=1)
+        segment = np.zeros(len(user_ids), dtype=bool)
+        if model.segment_top_products is not None:
+            segment = (n_purchases > 0) & (n_purchases < self.segment_min_purchases)
+        timer.mark('lookup')
+        
+        results = [[] for _ in user_ids]
+        scored = np.flatnonzero(~segment & ~empty)
+        if len(scored):
+            weights = self.hybrid_weights
+            n_products = purchased.shape[1]
+            scores = np.zeros((len(scored), n_products))
+            
+            # Scores utilisateur : similarité des voisins ayant acheté chaque produit
+            if model.user_neighbors is not None:
+                positions = model.user_ids.get_indexer([user_ids[i] for i in scored])
+                known = positions >= 0
+                neighbor_rows = sparse.csr_matrix(
+                    sparse.diags(known.astype(np.float64)) @ model.user_neighbors[np.where(known, positions, 0)]
+                )
+                neighbor_rows.eliminate_zeros()
+                similar_users = np.unique(neighbor_rows.indices)
+                bought = model.interaction_matrix[similar_users]
+                bought.data = np.ones_like(bought.data)
+                user_scores = (neighbor_rows[:, similar_users] @ bought).toarray()
+                scores += weights['user'] * _max_normalize_rows(user_scores)
+            
+            # Scores produit : somme des similarités des voisins des produits achetés
+            if model.item_neighbors is not None:
+                item_scores = (purchased[scored] @ model.item_neighbors).toarray()
+                scores += weights['item'] * _max_normalize_rows(item_scores)
+            
+            # Popularité : score décroissant avec le rang du produit
+            if model.popular_products is not None and len(model.popular_products):
+                popularity = np.zeros(n_products)
+                ranks = np.arange(len(model.popular_products), dtype=np.float64)
+                popularity[model.popular_products] = 1.0 - ranks / len(model.popular_products)
+                scores += weights['popular'] * popularity
+            
+            scores[scores <= 0] = -np.inf
+            timer.mark('scoring')
+            
+            # Filtrage des produits déjà achetés
+            purchased_rows, purchased_columns = purchased[scored].nonzero()
+            scores[purchased_rows, purchased_columns] = -np.inf
+            timer.mark('filtering')
+            
+            # Tri par score et limitation
+            for i, recommendations in zip(scored, self._top_n(model, scores, limit, page)):
+                results[i] = recommendations
+            timer.mark('top_n')
+        
+        for i in np.flatnonzero(segment):
+            results[i] = self._get_segment_recommendations(model, user_ids[i], limit, page)
+        for i in np.flatnonzero(empty):
+            results[i] = self._fallback_to_popular(model, 'hybrid', user_ids[i], limit, page)
+        return results
+    
+    def get_similar_products(self, product_id: int, limit: int = 5, page: Optional[str] = None) -> List[int]:
         """
         Trouve des produits similaires à un produit donné.
         
         Args:
             product_id (int): ID du produit de référence
             limit (int): Nombre de produits similaires à retourner
+            page (Optional[str]): Page affichant les produits (sélection des règles métier)
             
         Returns:
             List[int]: Liste des IDs des produits similaires
         """
         try:
-            if self.item_similarity_df is None:
-                self.compute_item_similarity()
+            model = self._snapshot()
+            if model is None or model.item_similarity is None:
+                return []
             
-            if product_id not in self.item_similarity_df.index:
+            position = model.product_ids.get_loc(product_id)
+            if position < 0:
                 return []
             
-            # Produits similaires
-            similar_products = self.item_similarity_df[product_id].sort_values(ascending=False)[1:limit+1]
+            # Produits similaires (le produit lui-même et les produits non autorisés exclus)
+            similarity = model.item_similarity
+            start, end = similarity.indptr[position], similarity.indptr[position + 1]
+            candidates, values = similarity.indices[start:end], similarity.data[start:end]
+            keep = (candidates != position) & (values > 0) & self._allowed_products(model, page)[candidates]
+            candidates, values = candidates[keep], values[keep]
+            similar_products = candidates[np.lexsort((candidates, -values))][:limit]
             
-            return similar_products.index.tolist()
+            return model.product_ids.take(similar_products)
             
         except Exception as e:
             logger.error(f"Erreur lors de la recherche de produits similaires: {e}")
             return []
     
-    def update_model(self):
+    def update_model(self, incremental_svd: bool = False, covered_sequence: Optional[int] = None):
         """
         Met à jour le modèle de recommandation avec les nouvelles données.
+        
+        Les recommandations continuent d'être servies par l'instantané
+        précédent pendant tout l'entraînement, puis basculent en une fois.
+        
+        Args:
+            incremental_svd (bool): Mettre à jour la SVD par ajout des nouveaux
+                utilisateurs et produits (update_svd_model) au lieu de la réentraîner ;
+                les segments, calculés dans l'espace SVD, sont recalculés dans les deux cas
+            covered_sequence (Optional[int]): Dernière interaction couverte par les
+                données chargées (interaction_sequence relevé avant le chargement) ;
+                par défaut, toutes celles enregistrées avant l'appel
         """
         try:
             logger.info("Mise à jour du modèle de recommandation")
+            if covered_sequence is None:
+                covered_sequence = self.interaction_sequence()
             
-            # Recalcul de toutes les matrices
-            self.create_user_item_matrix()
-            self.compute_user_similarity()
-            self.compute_item_similarity()
-            self.train_svd_model()
-            self.compute_product_popularity()
-            
-            # Sauvegarde du modèle mis à jour
-            self.save_model()
+            with self._write_lock:
+                # Recalcul de toutes les matrices
+                self.create_user_item_matrix()
+                self.compute_user_similarity()
+                self.compute_item_similarity()
+                self.compute_graph_neighbors()
+                self.compute_ease_model()
+                if incremental_svd:
+                    self.update_svd_model()
+                else:
+                    self.train_svd_model()
+                self.compute_user_segments()
+                self.compute_transition_matrix()
+                self.compute_product_popularity()
+                
+                # Publication du nouvel instantané
+                self.publish(covered_sequence)
+                
+                # Sauvegarde du modèle mis à jour
+                self.save_model()
             
             logger.info("Modèle de recommandation mis à jour avec succès")
             
@@ -439,12 +1906,22 @@ class RecommendationEngine:
         """
         try:
             model_data = {
-                'user_item_matrix': self.user_item_matrix,
-                'user_similarity_df': self.user_similarity_df,
-                'item_similarity_df': self.item_similarity_df,
+                'interaction_matrix': self.interaction_matrix,
+                'user_ids': self.user_id_map.ids if self.user_id_map is not None else None,
+                'product_ids': self.product_id_map.ids if self.product_id_map is not None else None,
+                'user_neighbors': self.user_neighbors,
+                'item_similarity': self.item_similarity_matrix,
+                'item_neighbors': self.item_neighbors,
+                'graph_neighbors': self.graph_neighbors,
+                'ease_matrix': self.ease_matrix,
                 'product_popularity': self.product_popularity,
                 'svd_model': self.svd_model,
                 'svd_matrix': self.svd_matrix,
+                'user_segments': self.user_segments,
+                'segment_centroids': self.segment_centroids,
+                'segment_top_products': self.segment_top_products,
+                'transition_matrix': self.transition_matrix,
+                'recent_history': self.recent_history,
                 'timestamp': datetime.now()
             }
             
@@ -471,13 +1948,32 @@ class RecommendationEngine:
             with open(cache_file, 'rb') as f:
                 model_data = pickle.load(f)
             
-            # Restauration des attributs
-            self.user_item_matrix = model_data.get('user_item_matrix')
-            self.user_similarity_df = model_data.get('user_similarity_df')
-            self.item_similarity_df = model_data.get('item_similarity_df')
-            self.product_popularity = model_data.get('product_popularity')
-            self.svd_model = model_data.get('svd_model')
-            self.svd_matrix = model_data.get('svd_matrix')
+            with self._write_lock:
+                # Restauration des attributs
+                self.interaction_matrix = model_data.get('interaction_matrix')
+                self.user_neighbors = model_data.get('user_neighbors')
+                self.item_similarity_matrix = model_data.get('item_similarity')
+                self.item_neighbors = model_data.get('item_neighbors')
+                self.graph_neighbors = model_data.get('graph_neighbors')
+                self.ease_matrix = model_data.get('ease_matrix')
+                self.product_popularity = model_data.get('product_popularity')
+                self.svd_model = model_data.get('svd_model')
+                self.svd_matrix = model_data.get('svd_matrix')
+                self.user_segments = model_data.get('user_segments')
+                self.segment_centroids = model_data.get('segment_centroids')
+                self.segment_top_products = model_data.get('segment_top_products')
+                self.transition_matrix = model_data.get('transition_matrix')
+                self.recent_history = model_data.get('recent_history')
+                
+                # Interactions reconstruites depuis la matrice (non sauvegardées)
+                if self.interaction_matrix is not None and model_data.get('user_ids') is not None:
+                    self.user_id_map = IdMap(model_data['user_ids'])
+                    self.product_id_map = IdMap(model_data['product_ids'])
+                    self.df = self._interactions_from_matrix()
+                if self.item_neighbors is None and self.item_similarity_matrix is not None:
+                    self.item_neighbors = top_k_neighbors(self.item_similarity_matrix, self.n_neighbors)
+                
+                self.publish()
             
             logger.info("Modèle chargé depuis le cache")
             return True
@@ -0,0 +1,196 @@
+"""
+Règles métier de merchandising appliquées aux recommandations.
+
+Une règle porte sur les attributs du catalogue (catégorie, prix, marque...)
+et, optionnellement, sur les pages où elle s'applique. Un jeu de règles est
+compilé une seule fois par page en un masque booléen (produits autorisés)
+et un vecteur de coefficients (produits mis en avant), alignés sur les
+positions produits du modèle ; le moteur les applique aux scores avant la
+sélection des meilleurs produits, sans aucune boucle Python par requête.
+
+Types de règles :
+- exclude       : {"type": "exclude", "field": "category", "values": [...]}
+- include_only  : {"type": "include_only", "field": "brand", "values": [...]}
+- price_band    : {"type": "price_band", "min": 10, "max": 500}
+- boost         : {"type": "boost", "field": "category", "values": [...], "weight": 1.5}
+
+Chaque règle accepte une clé "pages" (liste de pages concernées, toutes par défaut).
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import json
+import hashlib
+import logging
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Types de règles reconnus
+RULE_TYPES = ('exclude', 'include_only', 'price_band', 'boost')
+
+# Attributs du catalogue utilisés par les règles
+CATALOG_FIELDS = ('category', 'price', 'brand')
+
+
+class CompiledRules:
+    """
+    Règles compilées pour une page, alignées sur les positions produits d'un instantané.
+
+    Attributs:
+        mask (Optional[np.ndarray]): Produits autorisés (None si aucune exclusion)
+        boost (Optional[np.ndarray]): Coefficients des scores positifs (None si aucun boost)
+    """
+
+    __slots__ = ('mask', 'boost')
+
+    def __init__(self, mask: Optional[np.ndarray] = None, boost: Optional[np.ndarray] = None):
+        self.mask = mask
+        self.boost = boost
+
+
+class RuleSet:
+    """
+    Jeu de règles versionné.
+
+    La version identifie le contenu des règles : les compilations sont mises
+    en cache par (version, page) et invalidées dès que les règles changent.
+    """
+
+    def __init__(self, rules: List[Dict], version: Optional[str] = None):
+        """
+        Valide les règles.
+
+        Args:
+            rules (List[Dict]): Règles de merchandising
+            version (Optional[str]): Version du jeu de règles (empreinte du contenu par défaut)
+        """
+        for rule in rules:
+            if rule.get('type') not in RULE_TYPES:
+                raise ValueError(f"Type de règle inconnu: {rule.get('type')}")
+            if rule['type'] != 'price_band' and ('field' not in rule or 'values' not in rule):
+                raise ValueError(f"Règle incomplète (field et values requis): {rule}")
+
+        self.rules = list(rules)
+        self.version = version or hashlib.sha1(
+            json.dumps(self.rules, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def compile(self, attributes: pd.DataFrame, page: Optional[str] = None) -> CompiledRules:
+        """
+        Compile les règles applicables à une page.
+
+        Args:
+            attributes (pd.DataFrame): Attributs des produits, une ligne par position produit
+            page (Optional[str]): Page affichant les recommandations (None = toutes les pages)
+
+        Returns:
+            CompiledRules: Masque et coefficients
+        """
+        n_products = len(attributes)
+        mask = None
+        boost = None
+
+        for rule in self.rules:
+            pages = rule.get('pages')
+            if pages is not None and page not in pages:
+                continue
+
+            if rule['type'] == 'price_band':
+                prices = attributes.get('price', pd.Series(np.nan, index=attributes.index)).to_numpy(dtype=float)
+                matched = np.ones(n_products, dtype=bool)
+                if rule.get('min') is not None:
+                    matched &= prices >= float(rule['min'])
+                if rule.get('max') is not None:
+                    matched &= prices <= float(rule['max'])
+                allowed = matched
+            else:
+                field = rule['field']
+                if field in attributes.columns:
+                    matched = attributes[field].isin(rule['values']).to_numpy()
+                else:
+                    matched = np.zeros(n_products, dtype=bool)
+
+                if rule['type'] == 'boost':
+                    if boost is None:
+                        boost = np.ones(n_products, dtype=np.float64)
+                    boost[matched] *= float(rule.get('weight', 1.0))
+                    continue
+                allowed = ~matched if rule['type'] == 'exclude' else matched
+
+            mask = allowed if mask is None else mask & allowed
+
+        return CompiledRules(mask, boost)
+
+
+def load_rules(path: str) -> RuleSet:
+    """
+    Charge un jeu de règles depuis un fichier JSON ({"version": ..., "rules": [...]} ou liste de règles).
+
+    Args:
+        path (str): Chemin du fichier
+
+    Returns:
+        RuleSet: Jeu de règles
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return RuleSet(data)
+        return RuleSet(data.get('rules', []), data.get('version'))
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement des règles {path}: {e}")
+        raise
+
+
+def load_catalog_from_mongo(mongo_db) -> pd.DataFrame:
+    """
+    Lit les attributs du catalogue MongoDB utilisés par les règles.
+
+    Args:
+        mongo_db: Base MongoDB de l'application (mongo.db)
+
+    Returns:
+        pd.DataFrame: Attributs indexés par ID produit (chaîne)
+    """
+    try:
+        projection = {field: 1 for field in CATALOG_FIELDS}
+        rows = [
+            {'product_id': str(product['_id']), **{field: product.get(field) for field in CATALOG_FIELDS}}
+            for product in mongo_db.product.find({}, projection)
+        ]
+        return pd.DataFrame(rows, columns=['product_id', *CATALOG_FIELDS]).set_index('product_id')
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture du catalogue MongoDB: {e}")
+        raise
+
+
+def load_catalog_from_database(db_session) -> pd.DataFrame:
+    """
+    Lit les attributs du catalogue SQL (modèle Product) utilisés par les règles.
+
+    Args:
+        db_session: Session SQLAlchemy
+
+    Returns:
+        pd.DataFrame: Attributs indexés par ID produit
+    """
+    try:
+        from database.models import Product
+
+        rows = db_session.query(Product.id, Product.category, Product.price).all()
+        catalog = pd.DataFrame(rows, columns=['product_id', 'category', 'price']).set_index('product_id')
+        catalog['brand'] = None
+        return catalog
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture du catalogue: {e}")
+        raise
@@ -0,0 +1,504 @@
+"""
+Serveur local de recommandations avec micro-batching des requêtes.
+
+Le modèle (pandas, scikit-learn, matrices) n'est chargé qu'une fois, dans
+ce processus, au lieu de l'être dans chaque worker Flask. Les requêtes
+concurrentes sont regroupées pendant une courte fenêtre (2 ms par défaut)
+puis scorées en un seul produit matriciel par RecommendationEngine.
+
+Points d'accès (JSON) :
+- GET  /recommendations?user_id=...&limit=...&method=...&page=...
+- GET  /bought-together?product_id=...&limit=...
+- POST /interactions   {"user_id": ..., "items": [{"product_id": ..., "quantity": ...}]}
+- POST /availability   {"products": [{"product_id": ..., "available": true|false}]}
+- POST /rules          {"version": ..., "rules": [...]} (voir recommender/rules.py)
+- POST /reload         Recharge le modèle (cache ou MongoDB)
+- GET  /health
+- GET  /metrics        Métriques au format Prometheus (/metrics.json en JSON)
+
+Usage:
+    python -m recommender.server --port 5001
+    python -m recommender.server --socket /tmp/recommender.sock --mongo-uri mongodb://localhost:27017/ecommerce-python
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+# Ajout du répertoire parent au path pour les imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.recommender import RecommendationEngine
+from recommender.copurchase import CoPurchaseIndex, load_baskets_from_mongo
+from recommender.rules import RuleSet, load_rules, load_catalog_from_mongo
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Méthodes acceptées par le serveur
+SERVED_METHODS = ('user', 'item', 'graph', 'ease', 'svd', 'segment', 'sequential', 'popular', 'hybrid')
+
+
+def _json_default(value):
+    """
+    Sérialise les types NumPy renvoyés par le moteur.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type non sérialisable: {type(value)}")
+
+
+class _PendingRequest:
+    """
+    Requête de recommandation en attente dans un micro-lot.
+    """
+
+    __slots__ = ('user_id', 'limit', 'method', 'page', 'result', 'done')
+
+    def __init__(self, user_id, limit: int, method: str, page: Optional[str] = None):
+        self.user_id = user_id
+        self.limit = limit
+        self.method = method
+        self.page = page
+        self.result = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Regroupe les requêtes concurrentes en micro-lots scorés ensemble.
+
+    Un thread dédié attend la première requête, collecte les suivantes
+    pendant `window` secondes (ou jusqu'à `max_batch`), puis appelle
+    get_batch_recommendations une fois par méthode (et page) présente dans le lot.
+    """
+
+    def __init__(self, server: 'RecommendationServer', window: float = 0.002, max_batch: int = 64):
+        """
+        Initialise le regroupeur.
+
+        Args:
+            server (RecommendationServer): Serveur détenant le moteur courant
+            window (float): Fenêtre de regroupement en secondes
+            max_batch (int): Taille maximale d'un lot
+        """
+        self.server = server
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='recommendation-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, limit: int, method: str, timeout: float,
+               page: Optional[str] = None) -> Optional[List]:
+        """
+        Soumet une requête et attend son résultat.
+
+        Args:
+            user_id: ID de l'utilisateur
+            limit (int): Nombre de recommandations
+            method (str): Méthode de recommandation
+            timeout (float): Attente maximale en secondes
+            page (Optional[str]): Page affichant les recommandations (règles métier)
+
+        Returns:
+            Optional[List]: Recommandations, None si le délai est dépassé
+        """
+        request = _PendingRequest(user_id, limit, method, page)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            return None
+        return request.result
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingRequest]):
+        engine = self.server.engine
+        by_method: Dict[tuple, List[_PendingRequest]] = {}
+        for request in batch:
+            by_method.setdefault((request.method, request.page), []).append(request)
+
+        for (method, page), requests in by_method.items():
+            limit = max(request.limit for request in requests)
+            try:
+                results = engine.get_batch_recommendations([r.user_id for r in requests], limit, method, page)
+            except Exception as e:
+                logger.error(f"Erreur lors du traitement d'un lot {method}: {e}")
+                results = [[] for _ in requests]
+            for request, result in zip(requests, results):
+                request.result = list(result)[:request.limit]
+                request.done.set()
+
+
+class RecommendationRequestHandler(BaseHTTPRequestHandler):
+    """
+    Gestionnaire HTTP des requêtes du serveur de recommandations.
+    """
+
+    server_version = 'RecommendationServer/1.0'
+
+    def address_string(self):
+        # Les sockets Unix n'ont pas d'adresse cliente
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, body, content_type: str = 'application/json'):
+        payload = body if isinstance(body, bytes) else json.dumps(body, default=_json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        app = self.server.app
+
+        try:
+            if url.path == '/recommendations':
+                params = parse_qs(url.query)
+                if 'user_id' not in params:
+                    self._send(400, {'error': 'user_id requis'})
+                    return
+                method = params.get('method', ['hybrid'])[0]
+                if method not in SERVED_METHODS:
+                    self._send(400, {'error': f'Méthode inconnue: {method}'})
+                    return
+                limit = min(int(params.get('limit', ['5'])[0]), app.max_limit)
+                user_id = app.parse_user_id(params['user_id'][0])
+                page = params.get('page', [None])[0]
+
+                recommendations = app.batcher.submit(user_id, limit, method, app.request_timeout, page)
+                if recommendations is None:
+                    self._send(503, {'error': 'Délai de traitement dépassé'})
+                    return
+                self._send(200, {'user_id': user_id, 'method': method, 'recommendations': recommendations})
+
+            elif url.path == '/bought-together':
+                params = parse_qs(url.query)
+                if 'product_id' not in params:
+                    self._send(400, {'error': 'product_id requis'})
+                    return
+                limit = min(int(params.get('limit', ['5'])[0]), app.max_limit)
+                product_id = app.parse_product_id(params['product_id'][0])
+                # Voisins supplémentaires demandés pour compenser les produits indisponibles
+                products = app.engine.filter_available(app.copurchase.bought_together(product_id, app.max_limit))
+                self._send(200, {'product_id': product_id, 'products': products[:limit]})
+
+            elif url.path == '/health':
+                self._send(200, {'status': 'ok', 'model_loaded': app.model_loaded,
+                                 'loaded_at': app.loaded_at})
+
+            elif url.path == '/metrics':
+                self._send(200, app.engine.metrics.to_prometheus().encode('utf-8'),
+                           content_type='text/plain; version=0.0.4')
+
+            elif url.path == '/metrics.json':
+                self._send(200, app.engine.metrics.to_dict())
+
+            else:
+                self._send(404, {'error': 'Ressource inconnue'})
+
+        except (KeyError, ValueError) as e:
+            self._send(400, {'error': f'Requête invalide: {e}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        app = self.server.app
+
+        try:
+            if url.path == '/interactions':
+                data = self._read_json()
+                user_id = app.parse_user_id(data['user_id'])
+                items = [
+                    (app.parse_product_id(item['product_id']), int(item.get('quantity', 1)))
+                    for item in data.get('items', [])
+                ]
+                app.record_purchase(user_id, items)
+                self._send(200, {'status': 'ok'})
+
+            elif url.path == '/availability':
+                data = self._read_json()
+                app.engine.update_availability({
+                    app.parse_product_id(product['product_id']): bool(product['available'])
+                    for product in data.get('products', [])
+                })
+                self._send(200, {'status': 'ok'})
+
+            elif url.path == '/rules':
+                data = self._read_json()
+                rules = RuleSet(data.get('rules', []), data.get('version'))
+                app.engine.set_rules(rules)
+                self._send(200, {'status': 'ok', 'version': rules.version})
+
+            elif url.path == '/reload':
+                app.reload()
+                self._send(200, {'status': 'ok', 'loaded_at': app.loaded_at})
+
+            else:
+                self._send(404, {'error': 'Ressource inconnue'})
+
+        except (KeyError, ValueError) as e:
+            self._send(400, {'error': f'Requête invalide: {e}'})
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serveur HTTP multi-thread sur socket Unix.
+    """
+    daemon_threads = True
+
+
+class RecommendationServer:
+    """
+    Processus de service des recommandations.
+
+    Attributs:
+        engine (RecommendationEngine): Moteur servi ; chaque rechargement publie un
+            nouvel instantané sans interrompre les requêtes en cours
+    """
+
+    def __init__(self, model_cache_dir: str = 'recommender/cache', mongo_uri: Optional[str] = None,
+                 batch_window: float = 0.002, max_batch: int = 64, request_timeout: float = 1.0,
+                 max_limit: int = 50, retrain_interval: Optional[int] = None, rules_path: Optional[str] = None,
+                 full_retrain_every: int = 10, id_type: type = str):
+        """
+        Initialise le serveur et charge le modèle.
+
+        Args:
+            model_cache_dir (str): Répertoire du modèle en cache
+            mongo_uri (Optional[str]): URI MongoDB ; si fourni, le modèle est entraîné depuis MongoDB
+            batch_window (float): Fenêtre de micro-batching en secondes
+            max_batch (int): Taille maximale d'un micro-lot
+            request_timeout (float): Attente maximale d'une requête dans le lot
+            max_limit (int): Nombre maximal de recommandations par requête
+            retrain_interval (Optional[int]): Intervalle de réentraînement en secondes
+            rules_path (Optional[str]): Fichier JSON des règles métier
+            full_retrain_every (int): Un réentraînement périodique sur full_retrain_every
+                réentraîne la SVD, les autres la mettent à jour de façon incrémentale
+            id_type (type): Type des IDs du modèle (str pour les ObjectId MongoDB
+                envoyés par l'application, int pour un modèle entraîné sur des IDs entiers)
+        """
+        self.model_cache_dir = model_cache_dir
+        self.mongo_uri = mongo_uri
+        self.request_timeout = request_timeout
+        self.max_limit = max_limit
+        self.retrain_interval = retrain_interval
+        self.full_retrain_every = max(1, full_retrain_every)
+        self.model_loaded = False
+        self.loaded_at = None
+        self.id_type = id_type
+        self._reload_lock = threading.Lock()
+
+        # Paniers reçus depuis le dernier chargement, rejoués dans l'index reconstruit
+        self._basket_log: List[Tuple[int, List]] = []
+        self._basket_sequence = 0
+        self._basket_lock = threading.Lock()
+
+        self.engine = RecommendationEngine(model_cache_dir=model_cache_dir)
+        if rules_path:
+            self.engine.set_rules(load_rules(rules_path))
+        self.copurchase = CoPurchaseIndex()
+        self.reload()
+        self.batcher = MicroBatcher(self, window=batch_window, max_batch=max_batch)
+
+        if retrain_interval:
+            threading.Thread(target=self._retrain_loop, name='recommendation-retrain', daemon=True).start()
+
+    def parse_user_id(self, value):
+        """
+        Convertit un ID utilisateur reçu en paramètre vers le type du modèle.
+        """
+        return self.id_type(value)
+
+    def parse_product_id(self, value):
+        """
+        Convertit un ID produit reçu en paramètre vers le type du modèle.
+        """
+        return self.id_type(value)
+
+    def record_purchase(self, user_id, items: List[Tuple]):
+        """
+        Applique un panier validé au profil de l'utilisateur et à l'index des achats groupés.
+
+        Args:
+            user_id: ID de l'utilisateur
+            items (List[Tuple]): Couples (ID produit, quantité)
+        """
+        for product_id, quantity in items:
+            self.engine.record_interaction(user_id, product_id, quantity)
+
+        basket = [product_id for product_id, _ in items]
+        with self._basket_lock:
+            self._basket_sequence += 1
+            if self.mongo_uri:
+                # Sans MongoDB l'index n'est jamais reconstruit : aucun rejeu à prévoir
+                self._basket_log.append((self._basket_sequence, basket))
+            self.copurchase.add_basket(basket)
+
+    def _swap_copurchase(self, copurchase: CoPurchaseIndex, covered_sequence: int):
+        """
+        Remplace l'index des achats groupés en y rejouant les paniers reçus après le chargement.
+        """
+        with self._basket_lock:
+            self._basket_log = [entry for entry in self._basket_log if entry[0] > covered_sequence]
+            for _, basket in self._basket_log:
+                copurchase.add_basket(basket)
+            self.copurchase = copurchase
+
+    def reload(self, incremental: bool = False):
+        """
+        Réentraîne (ou recharge) le modèle puis publie le nouvel instantané.
+
+        Les requêtes continuent d'être servies par l'instantané précédent
+        pendant l'entraînement. Les achats reçus pendant le rechargement,
+        absents des données chargées, sont rejoués dans le nouveau modèle
+        et le nouvel index des achats groupés.
+
+        Args:
+            incremental (bool): Mettre à jour la SVD au lieu de la réentraîner (MongoDB uniquement)
+        """
+        with self._reload_lock:
+            engine = self.engine
+
+            if self.mongo_uri:
+                from pymongo import MongoClient
+
+                # Dernières interactions couvertes par les données chargées ci-dessous
+                covered_interactions = engine.interaction_sequence()
+                with self._basket_lock:
+                    covered_baskets = self._basket_sequence
+
+                client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=2000)
+                try:
+                    mongo_db = client.get_default_database()
+                    engine.load_data_from_mongo(mongo_db)
+                    engine.load_availability_from_mongo(mongo_db)
+                    engine.load_product_attributes(load_catalog_from_mongo(mongo_db))
+                    baskets = load_baskets_from_mongo(mongo_db)
+                finally:
+                    client.close()
+                self._swap_copurchase(CoPurchaseIndex().fit(baskets), covered_baskets)
+                loaded = not engine.df.empty
+                if loaded:
+                    engine.update_model(incremental_svd=incremental, covered_sequence=covered_interactions)
+            else:
+                loaded = engine.load_model()
+
+            if loaded:
+                self.model_loaded = True
+                self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+                logger.info("Modèle de recommandation chargé")
+            else:
+                logger.warning("Aucun nouveau modèle disponible, l'instantané courant est conservé")
+
+    def _retrain_loop(self):
+        retrains = 0
+        while True:
+            time.sleep(self.retrain_interval)
+            retrains += 1
+            try:
+                self.reload(incremental=retrains % self.full_retrain_every != 0)
+            except Exception as e:
+                logger.error(f"Erreur lors du réentraînement périodique: {e}")
+
+    def serve(self, host: str = '127.0.0.1', port: int = 5001, socket_path: Optional[str] = None):
+        """
+        Démarre le serveur HTTP (localhost ou socket Unix) et bloque.
+
+        Args:
+            host (str): Adresse d'écoute (localhost uniquement recommandé)
+            port (int): Port d'écoute
+            socket_path (Optional[str]): Chemin de socket Unix (prioritaire sur host/port)
+        """
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            httpd = _UnixHTTPServer(socket_path, RecommendationRequestHandler)
+            location = f"unix:{socket_path}"
+        else:
+            httpd = ThreadingHTTPServer((host, port), RecommendationRequestHandler)
+            location = f"http://{host}:{port}"
+        httpd.app = self
+
+        logger.info(f"Serveur de recommandations à l'écoute sur {location}")
+        try:
+            httpd.serve_forever()
+        finally:
+            httpd.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Point d'entrée en ligne de commande du serveur.
+    """
+    parser = argparse.ArgumentParser(description='Serveur local de recommandations')
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse d'écoute")
+    parser.add_argument('--port', type=int, default=5001, help="Port d'écoute")
+    parser.add_argument('--socket', default=None, help='Chemin de socket Unix')
+    parser.add_argument('--cache-dir', default='recommender/cache', help='Répertoire du modèle en cache')
+    parser.add_argument('--mongo-uri', default=None, help="URI MongoDB pour entraîner depuis les commandes")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0, help='Fenêtre de micro-batching (ms)')
+    parser.add_argument('--max-batch', type=int, default=64, help="Taille maximale d'un micro-lot")
+    parser.add_argument('--retrain-interval', type=int, default=None, help='Réentraînement périodique (s)')
+    parser.add_argument('--rules', default=None, help='Fichier JSON des règles métier')
+    parser.add_argument('--id-type', choices=['str', 'int'], default='str',
+                        help='Type des IDs utilisateurs et produits du modèle')
+    parser.add_argument('--full-retrain-every', type=int, default=10,
+                        help='Réentraînement complet de la SVD tous les N réentraînements périodiques')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    server = RecommendationServer(
+        model_cache_dir=args.cache_dir,
+        mongo_uri=args.mongo_uri,
+        batch_window=args.batch_window_ms / 1000,
+        max_batch=args.max_batch,
+        retrain_interval=args.retrain_interval,
+        rules_path=args.rules,
+        full_retrain_every=args.full_retrain_every,
+        id_type=int if args.id_type == 'int' else str
+    )
+    server.serve(host=args.host, port=args.port, socket_path=args.socket)
+
+
+if __name__ == '__main__':
+    main()
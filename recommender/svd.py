@@ -0,0 +1,339 @@
+"""
+Factorisation SVD randomisée et incrémentale pour le moteur de recommandation.
+
+Ce module remplace l'appel à TruncatedSVD sur la matrice dense par :
+- Une SVD randomisée (recherche d'espace image) directement sur la matrice creuse
+- Un démarrage à chaud depuis les composantes du modèle précédent
+- Des mises à jour incrémentales (méthode de Brand), par blocs bornés, lors
+  de l'ajout de lignes (utilisateurs) ou de colonnes (produits)
+
+L'interface reprend celle de TruncatedSVD (components_, singular_values_,
+fit_transform, transform, inverse_transform) pour rester interchangeable
+dans le moteur.
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import logging
+import numpy as np
+from scipy import sparse
+from typing import Optional, Tuple
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+
+def _to_dense(matrix) -> np.ndarray:
+    """
+    Convertit une matrice (creuse ou dense) en tableau NumPy dense.
+    """
+    if sparse.issparse(matrix):
+        return matrix.toarray()
+    return np.asarray(matrix, dtype=np.float64)
+
+
+def _as_float(matrix):
+    """
+    Convertit une matrice en float64 en conservant son format creux.
+    """
+    if sparse.issparse(matrix):
+        return sparse.csr_matrix(matrix, dtype=np.float64)
+    return np.asarray(matrix, dtype=np.float64)
+
+
+def _svd_flip(u: np.ndarray, vt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fixe le signe des vecteurs singuliers pour des résultats déterministes.
+
+    Le coefficient de plus grande valeur absolue de chaque vecteur droit est rendu positif.
+    """
+    max_abs = np.argmax(np.abs(vt), axis=1)
+    signs = np.sign(vt[np.arange(vt.shape[0]), max_abs])
+    signs[signs == 0] = 1
+    return u * signs, vt * signs[:, np.newaxis]
+
+
+class IncrementalSVD:
+    """
+    SVD tronquée randomisée, avec démarrage à chaud et mises à jour incrémentales.
+
+    Attributs:
+        n_components (int): Rang de la factorisation
+        components_ (np.ndarray): Vecteurs singuliers droits (n_components x n_produits)
+        singular_values_ (np.ndarray): Valeurs singulières
+        left_singular_vectors_ (np.ndarray): Vecteurs singuliers gauches (n_utilisateurs x n_components)
+        row_ids_ (np.ndarray): IDs des lignes (utilisateurs) dans l'ordre du modèle
+        feature_ids_ (np.ndarray): IDs des colonnes (produits) dans l'ordre du modèle
+    """
+
+    # Valeur par défaut des modèles sérialisés avant l'introduction des blocs
+    chunk_size = 128
+
+    def __init__(self, n_components: int = 50, n_oversamples: int = 10, n_iter: int = 4,
+                 n_iter_warm: int = 1, random_state: Optional[int] = 42, chunk_size: int = 128):
+        """
+        Initialise le modèle.
+
+        Args:
+            n_components (int): Rang de la factorisation
+            n_oversamples (int): Vecteurs supplémentaires de la recherche d'espace image
+            n_iter (int): Itérations de puissance lors d'un démarrage à froid
+            n_iter_warm (int): Itérations de puissance lors d'un démarrage à chaud
+            random_state (Optional[int]): Graine aléatoire
+            chunk_size (int): Nombre de lignes ou colonnes intégrées par mise à jour de Brand
+        """
+        self.n_components = n_components
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.n_iter_warm = n_iter_warm
+        self.random_state = random_state
+        self.chunk_size = max(1, chunk_size)
+
+        self.components_ = None
+        self.singular_values_ = None
+        self.left_singular_vectors_ = None
+        self.row_ids_ = None
+        self.feature_ids_ = None
+
+    def fit(self, X, row_ids: Optional[np.ndarray] = None, feature_ids: Optional[np.ndarray] = None,
+            init_components: Optional[np.ndarray] = None) -> 'IncrementalSVD':
+        """
+        Entraîne la factorisation par SVD randomisée.
+
+        Args:
+            X: Matrice utilisateurs x produits (creuse de préférence)
+            row_ids (Optional[np.ndarray]): IDs des lignes
+            feature_ids (Optional[np.ndarray]): IDs des colonnes
+            init_components (Optional[np.ndarray]): Composantes d'un modèle précédent
+                alignées sur les colonnes de X (démarrage à chaud)
+
+        Returns:
+            IncrementalSVD: Le modèle entraîné
+        """
+        if sparse.issparse(X):
+            X = sparse.csr_matrix(X, dtype=np.float64)
+        else:
+            X = np.asarray(X, dtype=np.float64)
+
+        n_rows, n_features = X.shape
+        rank = min(self.n_components, n_rows, n_features)
+        sketch_size = min(rank + self.n_oversamples, n_rows, n_features)
+        rng = np.random.default_rng(self.random_state)
+
+        # Matrice de test : composantes précédentes complétées par du bruit gaussien
+        if init_components is not None and init_components.shape[1] == n_features:
+            warm = np.asarray(init_components, dtype=np.float64)[:sketch_size].T
+            extra = sketch_size - warm.shape[1]
+            omega = np.hstack([warm, rng.standard_normal((n_features, extra))]) if extra > 0 else warm
+            n_iter = self.n_iter_warm
+            warm_started = True
+        else:
+            omega = rng.standard_normal((n_features, sketch_size))
+            n_iter = self.n_iter
+            warm_started = False
+
+        # Recherche de l'espace image avec itérations de puissance
+        Q, _ = np.linalg.qr(X @ omega)
+        for _ in range(n_iter):
+            Z, _ = np.linalg.qr(X.T @ Q)
+            Q, _ = np.linalg.qr(X @ Z)
+
+        # SVD exacte de la petite matrice projetée
+        B = (X.T @ Q).T
+        u_small, singular_values, vt = np.linalg.svd(B, full_matrices=False)
+        u = Q @ u_small
+        u, vt = _svd_flip(u, vt)
+
+        self.left_singular_vectors_ = u[:, :rank]
+        self.singular_values_ = singular_values[:rank]
+        self.components_ = vt[:rank]
+        self.row_ids_ = np.asarray(row_ids) if row_ids is not None else None
+        self.feature_ids_ = np.asarray(feature_ids) if feature_ids is not None else None
+
+        logger.info(f"SVD randomisée entraînée: rang {rank}, {n_iter} itérations de puissance"
+                    f"{' (démarrage à chaud)' if warm_started else ''}")
+        return self
+
+    def fit_transform(self, X, row_ids: Optional[np.ndarray] = None, feature_ids: Optional[np.ndarray] = None,
+                      init_components: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Entraîne la factorisation et retourne la représentation latente des lignes.
+
+        Returns:
+            np.ndarray: U * Sigma (n_utilisateurs x n_components)
+        """
+        self.fit(X, row_ids=row_ids, feature_ids=feature_ids, init_components=init_components)
+        return self.left_singular_vectors_ * self.singular_values_
+
+    def transform(self, X) -> np.ndarray:
+        """
+        Projette des lignes dans l'espace latent.
+        """
+        return np.asarray(X @ self.components_.T)
+
+    def inverse_transform(self, Z) -> np.ndarray:
+        """
+        Reconstruit des lignes depuis l'espace latent.
+        """
+        return np.asarray(Z) @ self.components_
+
+    def warm_start_components(self, feature_ids: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Réaligne les composantes du modèle sur un nouvel ensemble de colonnes.
+
+        Les produits apparus depuis l'entraînement reçoivent un poids nul,
+        ceux qui ont disparu sont ignorés.
+
+        Args:
+            feature_ids (np.ndarray): IDs des colonnes de la nouvelle matrice
+
+        Returns:
+            Optional[np.ndarray]: Composantes alignées, None si le modèle n'a pas d'IDs
+        """
+        if self.components_ is None or self.feature_ids_ is None:
+            return None
+
+        feature_ids = np.asarray(feature_ids)
+        order = np.argsort(self.feature_ids_)
+        sorted_ids = self.feature_ids_[order]
+        positions = np.clip(np.searchsorted(sorted_ids, feature_ids), 0, len(sorted_ids) - 1)
+        found = sorted_ids[positions] == feature_ids
+
+        aligned = np.zeros((self.components_.shape[0], len(feature_ids)), dtype=np.float64)
+        aligned[:, found] = self.components_[:, order[positions[found]]]
+        return aligned
+
+    def append_rows(self, X_rows, row_ids: Optional[np.ndarray] = None,
+                    n_components: Optional[int] = None) -> np.ndarray:
+        """
+        Ajoute des lignes (nouveaux utilisateurs) par mises à jour de Brand successives.
+
+        Les lignes sont intégrées par blocs de chunk_size : seul le résidu d'un bloc
+        (chunk_size x n_produits) et une SVD (rang + chunk_size)² sont denses.
+
+        Args:
+            X_rows: Nouvelles lignes, colonnes dans l'ordre du modèle
+            row_ids (Optional[np.ndarray]): IDs des nouvelles lignes
+            n_components (Optional[int]): Nouveau rang (peut augmenter d'au plus le nombre de lignes)
+
+        Returns:
+            np.ndarray: Représentation latente (U * Sigma) des nouvelles lignes
+        """
+        X_rows = _as_float(X_rows)
+        n_new = X_rows.shape[0]
+        if n_new == 0:
+            return np.empty((0, len(self.singular_values_)))
+
+        for start in range(0, n_new, self.chunk_size):
+            self._append_row_block(X_rows[start:start + self.chunk_size], n_components)
+        if self.row_ids_ is not None and row_ids is not None:
+            self.row_ids_ = np.concatenate([self.row_ids_, np.asarray(row_ids)])
+
+        return self.left_singular_vectors_[-n_new:] * self.singular_values_
+
+    def _append_row_block(self, C, n_components: Optional[int] = None):
+        """
+        Mise à jour de Brand pour un bloc de lignes.
+        """
+        n_new = C.shape[0]
+        U, S, V = self.left_singular_vectors_, self.singular_values_, self.components_.T
+        rank = len(S)
+        target = min(n_components or self.n_components, rank + n_new, V.shape[0])
+
+        # Décomposition des nouvelles lignes : partie dans l'espace courant + résidu orthogonal
+        L = np.asarray(C @ V)
+        H = _to_dense(C) - L @ V.T
+        J, K = np.linalg.qr(H.T)
+
+        middle = np.zeros((rank + n_new, rank + n_new))
+        middle[:rank, :rank] = np.diag(S)
+        middle[rank:, :rank] = L
+        middle[rank:, rank:] = K.T
+        u_mid, s_mid, vt_mid = np.linalg.svd(middle)
+
+        new_u = np.vstack([U @ u_mid[:rank, :target], u_mid[rank:, :target]])
+        new_v = np.hstack([V, J]) @ vt_mid.T[:, :target]
+        new_u, new_vt = _svd_flip(new_u, new_v.T)
+
+        self.left_singular_vectors_ = new_u
+        self.singular_values_ = s_mid[:target]
+        self.components_ = new_vt
+        self.n_components = max(self.n_components, target)
+
+    def append_columns(self, X_columns, feature_ids: Optional[np.ndarray] = None,
+                       n_components: Optional[int] = None):
+        """
+        Ajoute des colonnes (nouveaux produits) par mises à jour de Brand successives.
+
+        Les colonnes sont intégrées par blocs de chunk_size : seul le résidu d'un bloc
+        (n_utilisateurs x chunk_size) et une SVD (rang + chunk_size)² sont denses.
+
+        Args:
+            X_columns: Nouvelles colonnes, lignes dans l'ordre du modèle
+            feature_ids (Optional[np.ndarray]): IDs des nouvelles colonnes
+            n_components (Optional[int]): Nouveau rang (peut augmenter d'au plus le nombre de colonnes)
+        """
+        X_columns = _as_float(X_columns)
+        if sparse.issparse(X_columns):
+            X_columns = sparse.csc_matrix(X_columns)
+        n_new = X_columns.shape[1]
+        if n_new == 0:
+            return
+
+        for start in range(0, n_new, self.chunk_size):
+            self._append_column_block(X_columns[:, start:start + self.chunk_size], n_components)
+        if self.feature_ids_ is not None and feature_ids is not None:
+            self.feature_ids_ = np.concatenate([self.feature_ids_, np.asarray(feature_ids)])
+
+    def _append_column_block(self, D, n_components: Optional[int] = None):
+        """
+        Mise à jour de Brand pour un bloc de colonnes.
+        """
+        n_new = D.shape[1]
+        U, S, V = self.left_singular_vectors_, self.singular_values_, self.components_.T
+        rank = len(S)
+        target = min(n_components or self.n_components, rank + n_new, U.shape[0])
+
+        # Décomposition des nouvelles colonnes : partie dans l'espace courant + résidu orthogonal
+        P = np.asarray(D.T @ U).T
+        R = _to_dense(D) - U @ P
+        Q, K = np.linalg.qr(R)
+
+        middle = np.zeros((rank + n_new, rank + n_new))
+        middle[:rank, :rank] = np.diag(S)
+        middle[:rank, rank:] = P
+        middle[rank:, rank:] = K
+        u_mid, s_mid, vt_mid = np.linalg.svd(middle)
+
+        new_u = np.hstack([U, Q]) @ u_mid[:, :target]
+        new_v = np.vstack([V @ vt_mid.T[:rank, :target], vt_mid.T[rank:, :target]])
+        new_u, new_vt = _svd_flip(new_u, new_v.T)
+
+        self.left_singular_vectors_ = new_u
+        self.singular_values_ = s_mid[:target]
+        self.components_ = new_vt
+        self.n_components = max(self.n_components, target)
+
+    def reindex(self, row_ids: Optional[np.ndarray] = None, feature_ids: Optional[np.ndarray] = None):
+        """
+        Réordonne les lignes et colonnes du modèle selon de nouveaux IDs.
+
+        Les ensembles d'IDs doivent être identiques à ceux du modèle.
+
+        Args:
+            row_ids (Optional[np.ndarray]): Nouvel ordre des lignes
+            feature_ids (Optional[np.ndarray]): Nouvel ordre des colonnes
+        """
+        if row_ids is not None:
+            row_ids = np.asarray(row_ids)
+            order = np.argsort(self.row_ids_)
+            positions = order[np.searchsorted(self.row_ids_[order], row_ids)]
+            self.left_singular_vectors_ = self.left_singular_vectors_[positions]
+            self.row_ids_ = row_ids
+        if feature_ids is not None:
+            feature_ids = np.asarray(feature_ids)
+            order = np.argsort(self.feature_ids_)
+            positions = order[np.searchsorted(self.feature_ids_[order], feature_ids)]
+            self.components_ = self.components_[:, positions]
+            self.feature_ids_ = feature_ids
@@ -0,0 +1,476 @@
+"""
+Balayage parallèle des hyperparamètres du moteur de recommandation.
+
+La matrice d'interactions (et le jeu de validation) est construite une
+seule fois puis placée en mémoire partagée : chaque processus du pool
+l'attache en lecture seule, entraîne une configuration (rang SVD,
+nombre de voisins, demi-vie de décroissance, pondération hybride) et
+mesure :
+- La qualité (hit rate@N sur le dernier achat de chaque utilisateur)
+- La latence p50/p99 des recommandations
+- La mémoire (taille du modèle sérialisé et pic RSS du processus)
+
+Le résultat est une table de Pareto qualité / latence / mémoire pour
+choisir les réglages de production.
+
+Usage:
+    python -m recommender.sweep --users 5000 --products 1000 --density 0.005 --workers 4
+
+Auteur: Développeur Senior Python Full Stack
+Date: 2024
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import logging
+import argparse
+import tempfile
+import itertools
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Ajout du répertoire parent au path pour les imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender.recommender import RecommendationEngine
+from recommender.benchmark import generate_synthetic_interactions, get_peak_rss_mb
+
+# Configuration du logging
+logger = logging.getLogger(__name__)
+
+# Étapes d'entraînement nécessaires à chaque méthode
+METHOD_STAGES = {
+    'user': ['compute_user_similarity'],
+    'item': ['compute_item_similarity'],
+    'graph': ['compute_graph_neighbors'],
+    'ease': ['compute_ease_model'],
+    'svd': ['train_svd_model'],
+    'segment': ['train_svd_model', 'compute_user_segments', 'compute_product_popularity'],
+    'popular': ['compute_product_popularity'],
+    'hybrid': ['compute_user_similarity', 'compute_item_similarity', 'compute_product_popularity']
+}
+
+# Tableaux partagés attachés dans chaque processus du pool
+_SHARED_ARRAYS: Dict[str, np.ndarray] = {}
+_SHARED_BLOCKS: List[shared_memory.SharedMemory] = []
+
+
+class SharedArrays:
+    """
+    Ensemble de tableaux NumPy placés en mémoire partagée.
+
+    Le processus parent crée les blocs ; les processus du pool les
+    attachent sans copie à partir de la description retournée par `spec`.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Copie les tableaux en mémoire partagée.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): Tableaux à partager, par nom
+        """
+        self.blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.dtype.str, array.shape)
+
+    def close(self):
+        """
+        Libère les blocs de mémoire partagée.
+        """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_shared_arrays(spec: Dict[str, Tuple[str, str, Tuple[int, ...]]]) -> Dict[str, np.ndarray]:
+    """
+    Attache les tableaux partagés dans le processus courant (lecture seule).
+
+    Args:
+        spec (Dict): Description produite par SharedArrays.spec
+
+    Returns:
+        Dict[str, np.ndarray]: Vues en lecture seule sur les blocs partagés
+    """
+    arrays = {}
+    for name, (block_name, dtype, shape) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _SHARED_BLOCKS.append(block)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    return arrays
+
+
+def _init_worker(spec: Dict):
+    """
+    Initialise un processus du pool en attachant les données partagées.
+    """
+    _SHARED_ARRAYS.update(attach_shared_arrays(spec))
+
+
+def build_shared_dataset(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Construit la matrice d'entraînement et le jeu de validation.
+
+    Le dernier produit acheté par chaque utilisateur ayant au moins deux
+    produits distincts est retiré de l'entraînement et sert de cible.
+    L'ancienneté de chaque cellule est conservée pour appliquer la
+    décroissance temporelle de chaque configuration sans reconstruire la matrice.
+
+    Args:
+        df (pd.DataFrame): Interactions ('user_id', 'product_id', 'rating', 'timestamp')
+
+    Returns:
+        Dict[str, np.ndarray]: Tableaux CSR, ids, ancienneté et cibles de validation
+    """
+    if 'timestamp' not in df.columns:
+        df = df.assign(timestamp=pd.Timestamp.utcnow().tz_localize(None))
+    grouped = df.groupby(['user_id', 'product_id'], sort=True).agg(
+        rating=('rating', 'mean'),
+        timestamp=('timestamp', 'max')
+    ).reset_index()
+
+    # Dernier achat de chaque utilisateur actif comme cible de validation
+    grouped['n_products'] = grouped.groupby('user_id')['product_id'].transform('size')
+    candidates = grouped[grouped['n_products'] >= 2]
+    holdout_rows = candidates.sort_values('timestamp').groupby('user_id').tail(1).index
+    holdout = grouped.loc[holdout_rows]
+    train = grouped.drop(index=holdout_rows)
+
+    user_codes, user_ids = pd.factorize(train['user_id'], sort=True)
+    product_ids = np.sort(grouped['product_id'].unique())
+    product_codes = np.searchsorted(product_ids, train['product_id'].to_numpy())
+
+    timestamps = pd.to_datetime(train['timestamp'])
+    age_days = ((timestamps.max() - timestamps).dt.total_seconds() / 86400).to_numpy()
+
+    matrix = sparse.csr_matrix(
+        (train['rating'].to_numpy(dtype=np.float64), (user_codes, product_codes)),
+        shape=(len(user_ids), len(product_ids))
+    )
+    # Ancienneté alignée sur l'ordre des valeurs CSR
+    age_matrix = sparse.csr_matrix(
+        (age_days + 1e-9, (user_codes, product_codes)),
+        shape=matrix.shape
+    )
+
+    holdout = holdout[holdout['user_id'].isin(user_ids)]
+    return {
+        'data': matrix.data,
+        'indices': matrix.indices,
+        'indptr': matrix.indptr,
+        'age_days': age_matrix.data - 1e-9,
+        'user_ids': np.asarray(user_ids),
+        'product_ids': product_ids,
+        'holdout_user_ids': holdout['user_id'].to_numpy(),
+        'holdout_product_ids': holdout['product_id'].to_numpy()
+    }
+
+
+def build_grid(methods: List[str], ranks: List[int], neighbors: List[int],
+               decays: List[Optional[float]], weight_sets: List[Dict[str, float]]) -> List[Dict]:
+    """
+    Construit la liste des configurations à évaluer.
+
+    Seuls les paramètres qui influencent une méthode sont croisés pour
+    celle-ci (le rang SVD n'est pas balayé pour la méthode 'item', etc.).
+
+    Args:
+        methods (List[str]): Méthodes évaluées
+        ranks (List[int]): Rangs SVD
+        neighbors (List[int]): Nombres de voisins
+        decays (List[Optional[float]]): Demi-vies en jours (None = sans décroissance)
+        weight_sets (List[Dict[str, float]]): Pondérations hybrides
+
+    Returns:
+        List[Dict]: Configurations
+    """
+    grid = []
+    for method in methods:
+        if method in ('svd', 'segment'):
+            combos = itertools.product(ranks, [None], decays, [None])
+        elif method in ('user', 'item', 'graph'):
+            combos = itertools.product([None], neighbors, decays, [None])
+        elif method == 'hybrid':
+            combos = itertools.product([None], neighbors, decays, weight_sets)
+        elif method == 'ease':
+            combos = itertools.product([None], [None], decays, [None])
+        elif method == 'popular':
+            combos = itertools.product([None], [None], decays, [None])
+        else:
+            raise ValueError(f"Méthode de recommandation inconnue: {method}")
+
+        for rank, k, decay, weights in combos:
+            grid.append({
+                'method': method,
+                'n_components': rank,
+                'n_neighbors': k,
+                'decay_half_life_days': decay,
+                'hybrid_weights': weights
+            })
+    return grid
+
+
+def evaluate_config(task: Tuple[int, Dict, int, int, int]) -> Dict:
+    """
+    Entraîne et évalue une configuration dans un processus du pool.
+
+    Args:
+        task (Tuple): (identifiant, configuration, limite, nombre d'utilisateurs évalués, graine)
+
+    Returns:
+        Dict: Configuration et métriques mesurées
+    """
+    config_id, config, limit, n_eval, seed = task
+    arrays = _SHARED_ARRAYS
+    result = {'id': config_id, **config}
+
+    try:
+        engine = RecommendationEngine(
+            model_cache_dir=os.path.join(tempfile.gettempdir(), 'reco_sweep'),
+            n_components=config['n_components'] or 50,
+            n_neighbors=config['n_neighbors'] or 5,
+            decay_half_life_days=config['decay_half_life_days'],
+            hybrid_weights=config['hybrid_weights']
+        )
+
+        # Décroissance appliquée sur une copie des valeurs, la structure reste partagée
+        data = arrays['data'] * engine.decay_weights(arrays['age_days'])
+        matrix = sparse.csr_matrix(
+            (data, arrays['indices'], arrays['indptr']),
+            shape=(len(arrays['user_ids']), len(arrays['product_ids']))
+        )
+
+        start = time.perf_counter()
+        engine.load_interaction_matrix(matrix, arrays['user_ids'], arrays['product_ids'])
+        for stage in METHOD_STAGES[config['method']]:
+            getattr(engine, stage)()
+        # Publication avant la mesure : sinon la première requête chronométrée publie l'instantané
+        engine.publish()
+        result['train_seconds'] = round(time.perf_counter() - start, 6)
+
+        # Évaluation sur un échantillon fixe d'utilisateurs de validation
+        rng = np.random.default_rng(seed)
+        n_holdout = len(arrays['holdout_user_ids'])
+        sample = rng.choice(n_holdout, size=min(n_eval, n_holdout), replace=False)
+
+        hits = 0
+        latencies = np.empty(len(sample), dtype=np.float64)
+        for i, row in enumerate(sample):
+            user_id = arrays['holdout_user_ids'][row]
+            start = time.perf_counter()
+            recommendations = engine.get_user_recommendations(user_id, limit=limit, method=config['method'])
+            latencies[i] = (time.perf_counter() - start) * 1000
+            if arrays['holdout_product_ids'][row] in recommendations:
+                hits += 1
+
+        model_data = {
+            'user_neighbors': engine.user_neighbors,
+            'item_similarity': engine.item_similarity_matrix,
+            'graph_neighbors': engine.graph_neighbors,
+            'ease_matrix': engine.ease_matrix,
+            'product_popularity': engine.product_popularity,
+            'svd_model': engine.svd_model,
+            'svd_matrix': engine.svd_matrix,
+            'segment_top_products': engine.segment_top_products
+        }
+
+        result.update({
+            'status': 'ok',
+            'evaluated_users': int(len(sample)),
+            'hit_rate': round(hits / len(sample), 6) if len(sample) else 0.0,
+            'p50_ms': round(float(np.percentile(latencies, 50)), 4) if len(sample) else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)), 4) if len(sample) else None,
+            'model_size_bytes': len(pickle.dumps(model_data, protocol=pickle.HIGHEST_PROTOCOL)),
+            'peak_rss_mb': get_peak_rss_mb()
+        })
+
+    except Exception as e:
+        logger.error(f"Configuration {config_id} en échec: {e}")
+        result.update({'status': 'error', 'error': str(e)})
+
+    return result
+
+
+def pareto_front(results: List[Dict]) -> List[Dict]:
+    """
+    Marque les configurations non dominées (qualité max, latence et mémoire min).
+
+    Args:
+        results (List[Dict]): Résultats des configurations
+
+    Returns:
+        List[Dict]: Résultats avec la clé 'pareto' renseignée
+    """
+    valid = [r for r in results if r.get('status') == 'ok']
+
+    def dominates(a: Dict, b: Dict) -> bool:
+        no_worse = (a['hit_rate'] >= b['hit_rate'] and a['p50_ms'] <= b['p50_ms']
+                    and a['model_size_bytes'] <= b['model_size_bytes'])
+        better = (a['hit_rate'] > b['hit_rate'] or a['p50_ms'] < b['p50_ms']
+                  or a['model_size_bytes'] < b['model_size_bytes'])
+        return no_worse and better
+
+    for result in results:
+        result['pareto'] = (result.get('status') == 'ok'
+                            and not any(dominates(other, result) for other in valid if other is not result))
+    return results
+
+
+def format_pareto_table(results: List[Dict]) -> str:
+    """
+    Formate la table des résultats (front de Pareto en tête).
+
+    Args:
+        results (List[Dict]): Résultats annotés par pareto_front
+
+    Returns:
+        str: Table texte
+    """
+    columns = ['id', 'pareto', 'method', 'n_components', 'n_neighbors', 'decay_half_life_days',
+               'hybrid_weights', 'hit_rate', 'p50_ms', 'p99_ms', 'model_size_bytes', 'peak_rss_mb',
+               'train_seconds']
+    table = pd.DataFrame([r for r in results if r.get('status') == 'ok'], columns=columns)
+    if table.empty:
+        return "Aucune configuration évaluée avec succès"
+    table = table.sort_values(['pareto', 'hit_rate', 'p50_ms'], ascending=[False, False, True])
+    return table.to_string(index=False)
+
+
+def run_sweep(df: pd.DataFrame, grid: List[Dict], workers: Optional[int] = None,
+              limit: int = 10, n_eval: int = 500, seed: int = 42) -> List[Dict]:
+    """
+    Évalue toutes les configurations en parallèle sur une matrice partagée.
+
+    Args:
+        df (pd.DataFrame): Interactions brutes
+        grid (List[Dict]): Configurations à évaluer
+        workers (Optional[int]): Nombre de processus (par défaut le nombre de CPU)
+        limit (int): Nombre de recommandations évaluées (N du hit rate@N)
+        n_eval (int): Nombre d'utilisateurs de validation par configuration
+        seed (int): Graine de l'échantillonnage
+
+    Returns:
+        List[Dict]: Résultats annotés du front de Pareto
+    """
+    dataset = build_shared_dataset(df)
+    logger.info(f"Matrice partagée: {len(dataset['user_ids'])} utilisateurs x "
+                f"{len(dataset['product_ids'])} produits, {len(dataset['data'])} interactions, "
+                f"{len(dataset['holdout_user_ids'])} cibles de validation")
+
+    shared = SharedArrays(dataset)
+    del dataset
+    try:
+        tasks = [(i, config, limit, n_eval, seed) for i, config in enumerate(grid)]
+        # Un processus par configuration : le pic RSS mesuré est propre à chacune
+        with multiprocessing.Pool(processes=workers, initializer=_init_worker,
+                                  initargs=(shared.spec,), maxtasksperchild=1) as pool:
+            results = []
+            for result in pool.imap_unordered(evaluate_config, tasks):
+                logger.info(f"Configuration {result['id']} ({result['method']}): {result['status']}")
+                results.append(result)
+    finally:
+        shared.close()
+
+    results.sort(key=lambda r: r['id'])
+    return pareto_front(results)
+
+
+def load_database_interactions() -> pd.DataFrame:
+    """
+    Charge les interactions depuis la base MongoDB de l'application (commandes).
+
+    Returns:
+        pd.DataFrame: Interactions du moteur de recommandation
+    """
+    from app import mongo
+
+    engine = RecommendationEngine()
+    engine.load_data_from_mongo(mongo.db)
+    return engine.df
+
+
+def _parse_decay(value: str) -> Optional[float]:
+    """
+    Convertit une demi-vie passée en ligne de commande ('none' = sans décroissance).
+    """
+    return None if value.lower() == 'none' else float(value)
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    """
+    Convertit une pondération 'user,item,popular' (ex: 0.4,0.4,0.2).
+    """
+    user, item, popular = (float(w) for w in value.split(','))
+    return {'user': user, 'item': item, 'popular': popular}
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Point d'entrée en ligne de commande du balayage.
+    """
+    parser = argparse.ArgumentParser(description='Balayage des hyperparamètres du moteur de recommandation')
+    parser.add_argument('--source', choices=['synthetic', 'database'], default='synthetic',
+                        help='Origine des interactions')
+    parser.add_argument('--users', type=int, default=5000, help="Nombre d'utilisateurs synthétiques")
+    parser.add_argument('--products', type=int, default=1000, help='Nombre de produits synthétiques')
+    parser.add_argument('--density', type=float, default=0.005, help='Densité des interactions synthétiques')
+    parser.add_argument('--methods', nargs='+', default=['user', 'item', 'svd', 'hybrid'],
+                        help='Méthodes évaluées')
+    parser.add_argument('--ranks', nargs='+', type=int, default=[10, 20, 50], help='Rangs SVD')
+    parser.add_argument('--neighbors', nargs='+', type=int, default=[5, 10, 20], help='Nombres de voisins')
+    parser.add_argument('--decays', nargs='+', type=_parse_decay, default=[None, 30.0, 90.0],
+                        help="Demi-vies en jours ('none' pour désactiver)")
+    parser.add_argument('--weights', nargs='+', type=_parse_weights,
+                        default=[{'user': 0.4, 'item': 0.4, 'popular': 0.2},
+                                 {'user': 0.2, 'item': 0.6, 'popular': 0.2}],
+                        help="Pondérations hybrides 'user,item,popular'")
+    parser.add_argument('--workers', type=int, default=None, help='Nombre de processus')
+    parser.add_argument('--limit', type=int, default=10, help='N du hit rate@N')
+    parser.add_argument('--eval-users', type=int, default=500, help='Utilisateurs de validation par configuration')
+    parser.add_argument('--seed', type=int, default=42, help='Graine aléatoire')
+    parser.add_argument('--output', default='sweep_results.json', help='Fichier JSON de sortie')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    if args.source == 'database':
+        df = load_database_interactions()
+    else:
+        df = generate_synthetic_interactions(args.users, args.products, args.density, seed=args.seed)
+
+    grid = build_grid(args.methods, args.ranks, args.neighbors, args.decays, args.weights)
+    logger.info(f"{len(grid)} configurations à évaluer")
+
+    results = run_sweep(df, grid, workers=args.workers, limit=args.limit,
+                        n_eval=args.eval_users, seed=args.seed)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(format_pareto_table(results))
+    logger.info(f"Résultats du balayage écrits dans {args.output}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
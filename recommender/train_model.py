@@ -59,7 +59,7 @@ def train_recommendation_model():
         
         # Entraînement du modèle SVD
         logger.info("Entraînement du modèle SVD...")
-        engine.train_svd_model(n_components=min(50, engine.user_item_matrix.shape[1] - 1))
+        engine.train_svd_model(n_components=min(50, engine.interaction_matrix.shape[1] - 1))
         
         # Calcul de la popularité des produits
         logger.info("Calcul de la popularité des produits...")
@@ -71,8 +71,8 @@ def train_recommendation_model():
         
         # Affichage des statistiques
         logger.info("Statistiques du modèle entraîné:")
-        logger.info(f"- Nombre d'utilisateurs: {engine.user_item_matrix.shape[0]}")
-        logger.info(f"- Nombre de produits: {engine.user_item_matrix.shape[1]}")
+        logger.info(f"- Nombre d'utilisateurs: {engine.interaction_matrix.shape[0]}")
+        logger.info(f"- Nombre de produits: {engine.interaction_matrix.shape[1]}")
         logger.info(f"- Nombre d'interactions: {len(engine.df)}")
         
         # Test des recommandations pour quelques utilisateurs
@@ -110,8 +110,8 @@ def evaluate_model():
         engine.create_user_item_matrix()
         
         # Calcul des métriques de base
-        total_users = engine.user_item_matrix.shape[0]
-        total_products = engine.user_item_matrix.shape[1]
+        total_users = engine.interaction_matrix.shape[0]
+        total_products = engine.interaction_matrix.shape[1]
         total_interactions = len(engine.df)
         
         # Calcul de la densité de la matrice
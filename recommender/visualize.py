@@ -78,7 +78,9 @@ class RecommendationVisualizer:
             figsize (Tuple[int, int]): Taille de la figure
         """
         try:
-            if self.engine.user_similarity_df is None:
+            # Limitation à 20 utilisateurs pour la lisibilité
+            similarity_subset = self.engine.similarity_sample('user', 20)
+            if similarity_subset is None:
                 logger.warning("Matrice de similarité utilisateurs non disponible")
                 return
             
@@ -86,7 +88,7 @@ class RecommendationVisualizer:
             
             # Création de la heatmap
             sns.heatmap(
-                self.engine.user_similarity_df,
+                similarity_subset,
                 annot=True,
                 fmt='.2f',
                 cmap='coolwarm',
@@ -122,13 +124,12 @@ class RecommendationVisualizer:
             figsize (Tuple[int, int]): Taille de la figure
         """
         try:
-            if self.engine.item_similarity_df is None:
+            # Limitation à 20 produits pour la lisibilité
+            similarity_subset = self.engine.similarity_sample('item', 20)
+            if similarity_subset is None:
                 logger.warning("Matrice de similarité produits non disponible")
                 return
             
-            # Limitation à 20 produits pour la lisibilité
-            similarity_subset = self.engine.item_similarity_df.iloc[:20, :20]
-            
             fig, ax = plt.subplots(figsize=figsize)
             
             # Création de la heatmap
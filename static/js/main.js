@@ -112,19 +112,18 @@ const CartManager = {
      * Met à jour le compteur du panier
      */
     updateCartCount() {
-        fetch('/cart')
-            .then(response => response.text())
-            .then(html => {
-                const parser = new DOMParser();
-                const doc = parser.parseFromString(html, 'text/html');
-                const cartItems = doc.querySelectorAll('.cart-item');
+        // Résumé JSON du panier (revalidé par ETag, 304 si inchangé)
+        fetch('/api/cart/summary')
+            .then(response => response.json())
+            .then(summary => {
                 const cartCount = document.getElementById('cart-count');
                 
                 if (cartCount) {
-                    cartCount.textContent = cartItems.length;
+                    cartCount.textContent = summary.count;
+                    cartCount.style.display = summary.count > 0 ? 'inline' : 'none';
                     
                     // Animation du compteur
-                    if (cartItems.length > 0) {
+                    if (summary.count > 0) {
                         cartCount.classList.add('pulse');
                         setTimeout(() => cartCount.classList.remove('pulse'), 300);
                     }